@@ -1,4 +1,10 @@
 import random
+import mancala_engine as engine
+from search_state import TranspositionTable, HistoryTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when its stop event is set (used to cut pondering short)."""
 
 
 class RandomAgent:
@@ -22,10 +28,8 @@ class MediumAgent:
         valid_moves = game.get_valid_moves('2')
         # loop through the valid moves:
         for move in valid_moves:
-            # simulate the move and get the last pit where a seed was placed:
-            last_pit = game.simulate_move(move)
-            # if the last pit is the AI agent's Mancala/Score, choose this move:
-            if last_pit == '2':
+            # look up whether the last seed lands in the AI agent's Mancala/Score, and if so choose this move:
+            if engine.lands_in_store('2', engine.PIT_INDEX[move], game.board[move]):
                 return move
         # if no moves result in the last seed in the Mancala/Score, choose a random valid move:
         return random.choice(valid_moves)
@@ -37,17 +41,52 @@ class MinimaxAgent:
     """
     # set the default search depth for the minimax algorithm:
     depth = 3
+    # an optional threading.Event; when it is set, the running search stops with SearchAborted:
+    stop_event = None
+
+    def __init__(self, table_size=1000000):
+        # the transposition table and history heuristic are kept (and aged) between moves, so that
+        # consecutive searches (and pondering) reuse each other's work; a table size of 0 disables them:
+        self.table = TranspositionTable(table_size) if table_size else None
+        self.history = HistoryTable()
 
     def make_move(self, game):
         """
         Choose a move for Player 2 (AI agent) using the minimax algorithm with
         alpha-beta pruning.
         """
+        self.new_search()
+        return self.search(game)
+
+    def new_search(self):
+        """
+        Age the transposition table and history scores from the previous searches: once per AI move,
+        however many searches it takes (pondering searches several positions for one move).
+        """
+        if self.table is not None:
+            self.table.new_search()
+            self.history.new_search()
+
+    def search(self, game):
+        """Search a position without aging the tables (see new_search); returns the best move."""
         # call the minimax function with the current game state, search depth, and initial alpha and beta values:
         _, best_move = self.minimax(game, self.depth, float('-inf'), float('inf'), True)
         # return the best move found by the minimax algorithm:
         return best_move
 
+    def get_state(self):
+        """Get the search state, to save it between runs (see search_state.save_states)."""
+        if self.table is None:
+            return {}
+        return {'table': self.table.entries, 'generation': self.table.generation, 'history': self.history.scores}
+
+    def set_state(self, state):
+        """Restore a search state returned by get_state."""
+        if self.table is not None and state:
+            self.table.entries = state['table']
+            self.table.generation = state['generation']
+            self.history.scores = state['history']
+
     def minimax(self, game, depth, alpha, beta, maximizing_player):
         """
         Minimax algorithm with alpha-beta pruning.
@@ -63,10 +102,48 @@ class MinimaxAgent:
         float: The evaluation score of the best move.
         str: The chosen pit label for the AI agent's move.
         """
+        # stop if the search was cancelled (e.g. the human played a move that was not pondered):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted()
+
         # depth is 0 or the game is over:
         if depth == 0 or game.check_game_over():
             return game.board['2'] - game.board['1'], None
 
+        # the player to move, and the sign that turns the AI's evaluation into theirs:
+        player = '2' if maximizing_player else '1'
+        sign = 1 if maximizing_player else -1
+
+        # look the position up in the transposition table. It is keyed by the canonical form of the
+        # position (the board seen from the side to move), so values are stored for the side to move
+        # and Player 2's moves are stored mirrored:
+        key = table_move = None
+        if self.table is not None:
+            key = engine.canonical_key(engine.board_from_dict(game.board), player)
+            entry = self.table.lookup(key)
+            if entry is not None:
+                entry_depth, flag, value, table_move, _ = entry
+                if player == '2':
+                    table_move = engine.MIRROR_LABEL[table_move]
+                value *= sign
+                if entry_depth >= depth:
+                    if flag == EXACT:
+                        return value, table_move
+                    # a lower bound for the side to move is an upper bound for the other player:
+                    if (flag == LOWER_BOUND) == maximizing_player:
+                        if value >= beta:
+                            return value, table_move
+                    elif value <= alpha:
+                        return value, table_move
+        alpha_orig, beta_orig = alpha, beta
+
+        # get the valid moves, trying the move from the table first, then the extra turns and captures
+        # (looked up in the engine's move tables), then the others by history score:
+        valid_moves = game.get_valid_moves(player)
+        if self.table is not None:
+            tactical = [engine.PIT_LABELS[pit] for pit in engine.tactical_moves(engine.board_from_dict(game.board), player)]
+            valid_moves = self.history.order(player, valid_moves, table_move, tactical)
+
         # initialize the best_move variable to None:
         best_move = None
 
@@ -74,13 +151,12 @@ class MinimaxAgent:
         if maximizing_player:
             # initialize the max_eval variable to negative infinity:
             max_eval = float('-inf')
-            # get a list of valid moves for the AI agent:
-            valid_moves = game.get_valid_moves('2')
 
             # loop through the valid moves:
             for move in valid_moves:
-                # create a copy of the game to simulate the move:
+                # create a copy of the game to simulate the move (sowing depends on whose turn it is):
                 new_game = game.copy()
+                new_game.player_turn = '2'
                 # make the move and get the last pit where a seed was placed:
                 last_pit = new_game.make_move(move)
                 # check for captures:
@@ -99,31 +175,30 @@ class MinimaxAgent:
                 # update the alpha value and check for pruning:
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.history.add(player, move, depth)
                     break
 
-            # return the maximum evaluation score and the best move:
-            return max_eval, best_move
+            best_eval = max_eval
 
         # if it's the human player's turn (minimizing player):
         else:
             # initialize the min_eval variable to positive infinity:
             min_eval = float('inf')
-            # get a list of valid moves for the human player:
-            valid_moves = game.get_valid_moves('1')
 
             # loop through the valid moves:
             for move in valid_moves:
                 # create a copy of the game to simulate the move
                 new_game = game.copy()
+                new_game.player_turn = '1'
                 # make the move and get the last pit where a seed was placed
                 last_pit = new_game.make_move(move)
                 # check for captures:
                 new_game.check_capture(last_pit)
 
-                # if the last pit is the human player's score, they get an extra turn
+                # if the last pit is the human player's score, they get an extra turn (and the AI does not move):
                 extra_turn = last_pit == '1'
                 # recursively call the minimax function for the next depth and player
-                eval, _ = self.minimax(new_game, depth - 1, alpha, beta, extra_turn)
+                eval, _ = self.minimax(new_game, depth - 1, alpha, beta, not extra_turn)
 
                 # update the min_eval and best_move if the current evaluation is better:
                 if eval < min_eval:
@@ -132,6 +207,20 @@ class MinimaxAgent:
 
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.history.add(player, move, depth)
                     break
 
-            return min_eval, best_move
+            best_eval = min_eval
+
+        # store the result in the transposition table, with the kind of bound it is:
+        if key is not None:
+            if best_eval <= alpha_orig:
+                flag = UPPER_BOUND if maximizing_player else LOWER_BOUND
+            elif best_eval >= beta_orig:
+                flag = LOWER_BOUND if maximizing_player else UPPER_BOUND
+            else:
+                flag = EXACT
+            self.table.store(key, depth, flag, best_eval * sign,
+                             engine.MIRROR_LABEL[best_move] if player == '2' else best_move)
+
+        return best_eval, best_move
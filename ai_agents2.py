@@ -1,4 +1,91 @@
+import os
+import math
+import time
 import random
+import mancala_engine as engine
+from search_state import TranspositionTable, HistoryTable, EXACT, LOWER_BOUND, UPPER_BOUND
+# json, value_network, time_control, shared_table and mancala_kernel (with numpy and numba) are only
+# imported where they are needed (a file to load, a game clock, a shared table, a search that can
+# use the kernel), so creating an agent and playing a move in a new worker process stays cheap (see
+# headless.py).
+
+# the file with the tuned evaluation weights (written by tune_evaluation.py):
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'evaluation_weights.json')
+
+# the file with the ProbCut parameters (written by probcut.py):
+PROBCUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'probcut_parameters.json')
+
+# late move reductions: below the root, at nodes with at least LMR_MIN_DEPTH plies to go, the quiet
+# moves (no extra turn, no capture) after the first LMR_FULL_MOVES moves are searched LMR_REDUCTION
+# plies shallower, and searched again at full depth if they turn out better than the best so far:
+LMR_MIN_DEPTH = 3
+LMR_FULL_MOVES = 2
+LMR_REDUCTION = 1
+
+# ProbCut: below the root, a node whose shallow search predicts (with this many standard deviations
+# of confidence) a deep value outside the window is cut without the deep search:
+PROBCUT_CONFIDENCE = 1.5
+
+# the deepest iteration of a search on the game clock:
+MAX_CLOCK_DEPTH = 40
+
+# the depth stored in the transposition table for positions searched to the end of the game in
+# every line: their values are exact at any depth:
+SOLVED_DEPTH = 1000
+
+# a search on the game clock stops early once the best move has stayed the same for this many
+# iterations, and at least this share of the soft time limit is used:
+STABLE_ITERATIONS = 4
+STABLE_SHARE = 0.3
+
+# the number of MCTS simulations run between two looks at the game clock:
+CLOCK_SIMULATIONS = 16
+
+# with a table shared between processes (see shared_table.py), only the nodes at least this many
+# plies from the leaves use it: they are the ones worth a lookup that is slower than the local table's:
+SHARED_MIN_DEPTH = 3
+
+# the pits of each player in the order of their labels (the order of Mancala.get_valid_moves):
+MOVE_ORDER = {player: sorted(engine.PITS[player], key=lambda pit: engine.PIT_LABELS[pit]) for player in '12'}
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search on the game clock when the hard time limit of the move is reached."""
+
+
+def load_probcut(weights, path=PROBCUT_FILE):
+    """
+    Load ProbCut parameters fitted by probcut.py for an evaluation.
+
+    Returns:
+    dict: (shallow depth, slope, intercept, standard deviation) by deep depth, or None if the file
+          does not exist or was fitted with other evaluation weights.
+    """
+    if not os.path.exists(path):
+        return None
+    import json
+    with open(path) as file:
+        config = json.load(file)
+    if config['weights'] != weights:
+        return None
+    return {int(depth): tuple(parameters) for depth, parameters in config['parameters'].items()}
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """
+    Load evaluation weights exported by tune_evaluation.py.
+
+    Returns:
+    list: One weight per feature in engine.FEATURE_NAMES, or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    import json
+    with open(path) as file:
+        config = json.load(file)
+    # features missing from the file (e.g. from an older export) get a weight of 0:
+    weights = dict(zip(config['features'], config['weights']))
+    return [weights.get(name, 0.0) for name in engine.FEATURE_NAMES]
 
 
 class RandomAgent:
@@ -29,48 +116,275 @@ class MediumAgent:
         valid_moves = game.get_valid_moves(self.player)
         # loop through the valid moves:
         for move in valid_moves:
-            # simulate the move and get the last pit where a seed was placed:
-            last_pit = game.simulate_move(move)
-            # if the last pit is the AI agent's Mancala/Score, choose this move:
-            if last_pit == self.player:
+            # look up whether the last seed lands in the AI agent's Mancala/Score, and if so choose this move:
+            if engine.lands_in_store(self.player, engine.PIT_INDEX[move], game.board[move]):
                 return move
         # if no moves result in the last seed in the Mancala/Score, choose a random valid move:
         return random.choice(valid_moves)
 
 
 class MinimaxAgent:
-    def __init__(self, player, depth=3):
+    def __init__(self, player, depth=3, weights=True, batch_evaluator=None, quiescence_nodes=0,
+                 table_size=1000000, use_kernel=None, clock=None, reductions=False, probcut=False,
+                 probcut_confidence=PROBCUT_CONFIDENCE, incremental=True, keep_tables=False):
         self.player = player
         self.depth = depth
         self.opponent = '1' if self.player == '2' else '2'
+        # evaluation weights (see engine.FEATURE_NAMES), or None for the store difference; by default
+        # (True) the tuned weights are loaded from WEIGHTS_FILE, and without that file the evaluation
+        # is the store difference:
+        self.weights = load_weights() if weights is True else weights
+        # an optional batch evaluator (see LeafQueue): the leaves below each depth-1 node, and the
+        # positions after the forcing moves of each quiescence node, are then evaluated together. Its
+        # values must be in the same units as evaluate (seeds):
+        self.batch_evaluator = batch_evaluator
+        # the node budget of the quiescence search that follows forcing moves (extra turns and
+        # captures) past depth 0, for each leaf of the main search (0 disables it); the budget left
+        # for the current leaf:
+        self.quiescence_nodes = quiescence_nodes
+        self.quiescence_left = 0
+        # the number of leaves whose quiescence search used up its budget: the nodes above them are
+        # not stored in the transposition table, since a cut-off search may give a value that the
+        # stored bounds do not hold for in another window:
+        self.quiescence_cuts = 0
+        # the transposition table and history heuristic, kept (and aged) between moves; a table
+        # size of 0 disables both. They are cleared at the start of every game (see new_game), so a
+        # game only depends on its seed, unless keep_tables is set (e.g. to reuse a saved state):
+        self.table = TranspositionTable(table_size) if table_size else None
+        self.history = HistoryTable()
+        self.keep_tables = keep_tables
+        # the subtrees below the root can be searched by the compiled kernel (mancala_kernel), which
+        # gives the same values as minimax with the store difference evaluation. By default it is
+        # used when numba is installed and the search needs nothing else (weights, batches, quiescence,
+        # selective search):
+        self.use_kernel = bool((use_kernel or use_kernel is None) and self.weights is None and batch_evaluator is None
+                               and not quiescence_nodes and not reductions and not probcut)
+        if self.use_kernel:
+            import mancala_kernel
+            if use_kernel is None:
+                self.use_kernel = mancala_kernel.JIT
+            if self.use_kernel:
+                mancala_kernel.warm_up()
+        # (the kernel player number, see mancala_kernel.PLAYER_NUMBER):
+        self.kernel_player = 0 if player == '1' else 1
+        # optional selective search (both off by default): late move reductions, and ProbCut with
+        # the parameters fitted by probcut.py (given as a dict, or True to load PROBCUT_FILE; without
+        # parameters for the evaluation, ProbCut stays off):
+        self.reductions = reductions
+        if probcut is True:
+            probcut = load_probcut(self.weights)
+        self.probcut = probcut or None
+        self.probcut_confidence = probcut_confidence
+        # the subtrees below the root are otherwise searched on an engine.Position, which makes and
+        # undoes moves in place and keeps the evaluation features up to date as it goes, so a leaf is
+        # evaluated with one dot product. It gives the same values as minimax, and is used by default
+        # when the search needs nothing else (batches, quiescence, selective search), and instead of
+        # the kernel when the search has a deadline:
+        self.incremental = (incremental and batch_evaluator is None and not quiescence_nodes
+                            and not reductions and not probcut)
+        # an optional game clock (see time_control.py): with a clock, every move is searched with
+        # iterative deepening for as long as the clock allows, instead of to a fixed depth:
+        self.clock = clock
+        self.deadline = None
+        # an optional transposition table shared with other worker processes (see share_table):
+        self.shared_table = None
+        self.shared_namespace = 0
+        # search statistics of the last move (see reset_stats):
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        # nodes: minimax nodes searched; quiescence_nodes: forcing moves followed past depth 0;
+        # extensions: depth-0 nodes where at least one forcing move was followed;
+        # max_extension: the longest chain of forcing moves followed past depth 0;
+        # horizon: leaves evaluated before the end of the game (none means the value is exact);
+        # depth: the depth of the search (the deepest completed iteration on the game clock);
+        # reductions: late moves searched at reduced depth; researches: reduced moves searched again;
+        # probcuts: nodes cut by ProbCut:
+        self.stats = {'nodes': 0, 'quiescence_nodes': 0, 'extensions': 0, 'max_extension': 0, 'horizon': 0,
+                      'depth': self.depth, 'reductions': 0, 'researches': 0, 'probcuts': 0}
+
+    def new_game(self):
+        # forget the positions and move scores of the previous games (see keep_tables):
+        if self.table is not None and not self.keep_tables:
+            self.table.entries = {}
+            self.history.scores = {}
 
     def make_move(self, game):
+        self.reset_stats()
+        if self.table is not None:
+            self.table.new_search()
+            self.history.new_search()
+        if self.clock is not None:
+            return self.timed_search(game)
         _, best_move = self.minimax(game, self.depth, float('-inf'), float('inf'), True)
         return best_move
 
+    def timed_search(self, game):
+        """
+        Search with iterative deepening on the game clock: one ply deeper at a time, within the time
+        budget of the move (see time_control.allocate). A single legal move is played at once, and
+        the search stops early when the position is solved (no leaf before the end of the game) or
+        the best move has been stable for STABLE_ITERATIONS iterations (once STABLE_SHARE of the
+        soft limit is used); when the best move changes,
+        the iteration gets more time. An iteration is not started if it is not expected to finish
+        before the hard limit, and it is abandoned at the hard limit.
+
+        Returns:
+        str: The best move of the deepest completed iteration.
+        """
+        started = time.perf_counter()
+        moves = game.get_valid_moves(self.player)
+        self.stats['depth'] = 0
+        if len(moves) == 1:
+            return moves[0]
+        import time_control
+        budget = time_control.allocate(self.clock, self.player, engine.board_from_dict(game.board), len(moves))
+        self.deadline = started + budget.hard
+
+        # the kernel searches below the root depth (self.depth), which follows the iterations:
+        fixed_depth = self.depth
+        best_move, stable, durations = moves[0], 0, []
+        try:
+            for depth in range(1, MAX_CLOCK_DEPTH + 1):
+                iteration_started = time.perf_counter()
+                self.depth = depth
+                self.stats['horizon'] = 0
+                _, move = self.minimax(game, depth, float('-inf'), float('inf'), True)
+                durations.append(time.perf_counter() - iteration_started)
+                stable = stable + 1 if move == best_move else 0
+                best_move = move
+                self.stats['depth'] = depth
+                elapsed = time.perf_counter() - started
+                if self.stats['horizon'] == 0 or (stable >= STABLE_ITERATIONS and elapsed >= STABLE_SHARE * budget.soft):
+                    break
+
+                # the next iteration takes about as much longer as the last one did than the one before:
+                growth = min(8.0, max(2.0, durations[-1] / durations[-2])) if len(durations) > 1 and durations[-2] else 4.0
+                soft = budget.soft * (1.5 if stable == 0 and depth > 1 else 1.0)
+                if elapsed >= soft or elapsed + durations[-1] * growth > budget.hard:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.depth = fixed_depth
+            self.deadline = None
+        return best_move
+
+    def share_table(self, table):
+        """
+        Use a shared_table.SharedTable besides the agent's own table, for the nodes at least
+        SHARED_MIN_DEPTH plies from the leaves. Entries are only shared with agents that evaluate
+        and prune the same way (see shared_table.namespace): the same weights, selective search,
+        quiescence budget and batch evaluator (identified by its parameters, or else its name).
+
+        The results of a search with a shared table depend on what the other workers have stored
+        so far, so games played with one are not reproducible from their seeds.
+        """
+        import shared_table
+        evaluator = self.batch_evaluator
+        if evaluator is not None:
+            evaluator = getattr(evaluator, 'params', None) or getattr(evaluator, '__qualname__',
+                                                                     type(evaluator).__qualname__)
+        self.shared_table = table
+        self.shared_namespace = shared_table.namespace(self.weights, self.reductions, self.probcut,
+                                                       self.probcut_confidence, self.quiescence_nodes, evaluator)
+
+    def get_state(self):
+        # the search state saved between runs (see search_state.save_states):
+        return {'weights': self.weights, 'table': self.table.entries if self.table is not None else {},
+                'generation': self.table.generation if self.table is not None else 0,
+                'history': self.history.scores}
+
+    def set_state(self, state):
+        # the stored values depend on the evaluation, so a state saved with other weights is ignored:
+        if state['weights'] != self.weights or self.table is None:
+            return
+        self.table.entries = state['table']
+        self.table.generation = state['generation']
+        self.history.scores = state['history']
+
     def evaluate(self, game):
-        return game.board[self.player] - game.board[self.opponent]
+        if self.weights is None:
+            return game.board[self.player] - game.board[self.opponent]
+        values = engine.features(engine.board_from_dict(game.board), self.player)
+        return sum(weight * value for weight, value in zip(self.weights, values))
 
     def minimax(self, game, depth, alpha, beta, maximizing_player):
+        # a search on the game clock is abandoned at the hard time limit of the move:
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if self.use_kernel and depth < self.depth and self.deadline is None:
+            # below the root, the whole subtree is searched by the kernel (but not on a deadline, since
+            # a compiled search cannot be stopped before it returns):
+            import mancala_kernel
+            board = mancala_kernel.to_kernel_board(engine.board_from_dict(game.board))
+            # (the window is always passed as floats, so that the compiled kernel is only compiled once):
+            eval, nodes = mancala_kernel.search(board, self.kernel_player, depth, float(alpha), float(beta),
+                                                maximizing_player)
+            self.stats['nodes'] += nodes
+            # (the kernel does not tell whether it reached the end of the game in every line):
+            self.stats['horizon'] += 1
+            return eval, None
+        if self.incremental and depth < self.depth:
+            return self.search_position(engine.Position(engine.board_from_dict(game.board)), depth, alpha, beta,
+                                        maximizing_player)
+
+        self.stats['nodes'] += 1
+        if depth == 0:
+            self.stats['horizon'] += 1
+        if depth == 0 and self.quiescence_nodes:
+            return self.leaf_quiescence(game, alpha, beta, maximizing_player), None
+
         if depth == 0 or game.check_game_over():
             return self.evaluate(game), None
 
-        best_move = None
+        # look the position up in the transposition table:
+        player = self.player if maximizing_player else self.opponent
+        key = table_move = None
+        if self.table is not None:
+            key = engine.canonical_key(engine.board_from_dict(game.board), player)
+            value, table_move = self.probe(key, player, depth, alpha, beta, maximizing_player)
+            if value is not None:
+                return value, table_move
+        if self.probcut is not None and depth in self.probcut and depth < self.depth:
+            cut = self.probcut_cut(game, depth, alpha, beta, maximizing_player)
+            if cut is not None:
+                return cut, table_move
+        alpha_orig, beta_orig = alpha, beta
+        horizon_orig = self.stats['horizon']
+        cuts_orig = self.quiescence_cuts
 
-        if maximizing_player:
+        if depth == 1 and self.batch_evaluator is not None:
+            best_eval, best_move = self.minimax_frontier(game, alpha, beta, maximizing_player, table_move)
+
+        elif maximizing_player:
             max_eval = float('-inf')
-            valid_moves = game.get_valid_moves(self.player)
+            best_move = None
+            valid_moves = self.order_moves(game, self.player, game.get_valid_moves(self.player), table_move)
 
-            for move in valid_moves:
+            for index, move in enumerate(valid_moves):
                 new_game = game.copy()
+                new_game.player_turn = self.player
                 prev_seeds = new_game.board[self.player]
                 last_pit = new_game.make_move(move)
                 new_game.check_capture(last_pit)
                 seeds_captured = new_game.board[self.player] - prev_seeds
 
+                # the child's window is shifted by the seeds captured, which are added to its value:
                 extra_turn = last_pit == self.player
-                eval, _ = self.minimax(new_game, depth - 1, alpha, beta, extra_turn)
+                child_depth = depth - 1
+                if self.reduce(depth, index, extra_turn, new_game.board[last_pit]):
+                    child_depth -= LMR_REDUCTION
+                eval, _ = self.minimax(new_game, child_depth, alpha - seeds_captured, beta - seeds_captured, extra_turn)
                 eval += seeds_captured
+                # a reduced move that beats the best move so far is searched again at full depth:
+                if child_depth < depth - 1 and eval > alpha:
+                    self.stats['researches'] += 1
+                    eval, _ = self.minimax(new_game, depth - 1, alpha - seeds_captured, beta - seeds_captured,
+                                           extra_turn)
+                    eval += seeds_captured
 
                 if eval > max_eval:
                     max_eval = eval
@@ -78,24 +392,36 @@ class MinimaxAgent:
 
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.history.add(self.player, move, depth)
                     break
 
-            return max_eval, best_move
+            best_eval = max_eval
 
         else:
             min_eval = float('inf')
-            valid_moves = game.get_valid_moves(self.opponent)
+            best_move = None
+            valid_moves = self.order_moves(game, self.opponent, game.get_valid_moves(self.opponent), table_move)
 
-            for move in valid_moves:
+            for index, move in enumerate(valid_moves):
                 new_game = game.copy()
+                new_game.player_turn = self.opponent
                 prev_seeds = new_game.board[self.opponent]
                 last_pit = new_game.make_move(move)
                 new_game.check_capture(last_pit)
                 seeds_captured = new_game.board[self.opponent] - prev_seeds
 
                 extra_turn = last_pit == self.opponent
-                eval, _ = self.minimax(new_game, depth - 1, alpha, beta, extra_turn)
+                child_depth = depth - 1
+                if self.reduce(depth, index, extra_turn, new_game.board[last_pit]):
+                    child_depth -= LMR_REDUCTION
+                eval, _ = self.minimax(new_game, child_depth, alpha + seeds_captured, beta + seeds_captured,
+                                       not extra_turn)
                 eval -= seeds_captured
+                if child_depth < depth - 1 and eval < beta:
+                    self.stats['researches'] += 1
+                    eval, _ = self.minimax(new_game, depth - 1, alpha + seeds_captured, beta + seeds_captured,
+                                           not extra_turn)
+                    eval -= seeds_captured
 
                 if eval < min_eval:
                     min_eval = eval
@@ -103,6 +429,589 @@ class MinimaxAgent:
 
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.history.add(self.opponent, move, depth)
+                    break
+
+            best_eval = min_eval
+
+        if key is not None and self.quiescence_cuts == cuts_orig:
+            self.store(key, player, depth, best_eval, best_move, alpha_orig, beta_orig, maximizing_player,
+                       horizon_orig)
+
+        return best_eval, best_move
+
+    def search_position(self, position, depth, alpha, beta, maximizing_player):
+        """
+        Search a subtree like minimax, on an engine.Position: every move is made and undone in place,
+        and the leaves are evaluated from the features the position keeps up to date.
+
+        Parameters:
+        position (engine.Position): The position to search (left as it was).
+        depth (int): The remaining depth.
+        alpha (float): The best value the maximizing player is assured of.
+        beta (float): The best value the minimizing player is assured of.
+        maximizing_player (bool): Whether this agent is to move.
+
+        Returns:
+        tuple: (value, best move label), as returned by minimax.
+        """
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        self.stats['nodes'] += 1
+        if depth == 0:
+            self.stats['horizon'] += 1
+            return self.evaluate_position(position), None
+        if position.finish():
+            eval = self.evaluate_position(position)
+            position.undo()
+            return eval, None
+
+        board = position.board
+        player = self.player if maximizing_player else self.opponent
+        key = table_move = None
+        if self.table is not None:
+            key = engine.canonical_key(board, player)
+            value, table_move = self.probe(key, player, depth, alpha, beta, maximizing_player)
+            if value is not None:
+                return value, table_move
+        alpha_orig, beta_orig = alpha, beta
+        horizon_orig = self.stats['horizon']
+
+        # the moves in the same order as Mancala.get_valid_moves, then ordered like order_moves (the
+        # position already knows which moves give an extra turn or capture):
+        store = engine.STORE[player]
+        moves = [engine.PIT_LABELS[pit] for pit in MOVE_ORDER[player] if board[pit]]
+        if self.table is not None:
+            tactical = [engine.PIT_LABELS[pit] for pit in position.tactical_moves(player)]
+            moves = self.history.order(player, moves, table_move, tactical)
+
+        best_eval = float('-inf') if maximizing_player else float('inf')
+        best_move = None
+        for move in moves:
+            prev_seeds = board[store]
+            last_pit, _ = position.play(player, engine.PIT_INDEX[move])
+            seeds_captured = board[store] - prev_seeds
+            extra_turn = last_pit == store
+            # the child's window is shifted by the seeds captured, which are added to its value:
+            if maximizing_player:
+                eval, _ = self.search_position(position, depth - 1, alpha - seeds_captured, beta - seeds_captured,
+                                               extra_turn)
+                eval += seeds_captured
+            else:
+                eval, _ = self.search_position(position, depth - 1, alpha + seeds_captured, beta + seeds_captured,
+                                               not extra_turn)
+                eval -= seeds_captured
+            position.undo()
+
+            if maximizing_player:
+                if eval > best_eval:
+                    best_eval, best_move = eval, move
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval:
+                    best_eval, best_move = eval, move
+                beta = min(beta, eval)
+            if beta <= alpha:
+                self.history.add(player, move, depth)
+                break
+
+        if key is not None:
+            self.store(key, player, depth, best_eval, best_move, alpha_orig, beta_orig, maximizing_player,
+                       horizon_orig)
+        return best_eval, best_move
+
+    def evaluate_position(self, position):
+        # the same value as evaluate, for an engine.Position:
+        if self.weights is None:
+            return position.board[engine.STORE[self.player]] - position.board[engine.STORE[self.opponent]]
+        return position.evaluate(self.weights, self.player)
+
+    def probe(self, key, player, depth, alpha, beta, maximizing_player):
+        """
+        Look a position up in the transposition table. The table is keyed by the canonical form, so
+        values are stored from the point of view of the side to move (negated for the opponent's
+        positions) and moves are stored as canonical moves (mirrored for Player 2).
+
+        Returns:
+        tuple: (the value of the node, or None if the entry does not decide it, the stored move).
+        """
+        entry = self.table.lookup(key)
+        # the shared table may have a deeper search of the position, by another process:
+        if self.shared_table is not None and depth >= SHARED_MIN_DEPTH and (entry is None or entry[0] < depth):
+            shared = self.shared_table.lookup(key, self.shared_namespace)
+            if shared is not None and shared[3] is not None and (entry is None or shared[0] > entry[0]):
+                entry = shared
+        if entry is None:
+            return None, None
+        entry_depth, flag, value, table_move, _ = entry
+        if player == '2':
+            table_move = engine.MIRROR_LABEL[table_move]
+        value *= 1 if maximizing_player else -1
+        if entry_depth >= depth:
+            # a stored value counts as a leaf before the end of the game, unless it is solved:
+            horizon = entry_depth < SOLVED_DEPTH
+            if flag == EXACT:
+                self.stats['horizon'] += horizon
+                return value, table_move
+            # a lower bound for the side to move is an upper bound for the opponent:
+            if (flag == LOWER_BOUND) == maximizing_player:
+                if value >= beta:
+                    self.stats['horizon'] += horizon
+                    return value, table_move
+            elif value <= alpha:
+                self.stats['horizon'] += horizon
+                return value, table_move
+        return None, table_move
+
+    def store(self, key, player, depth, best_eval, best_move, alpha_orig, beta_orig, maximizing_player,
+              horizon_orig):
+        # store the result of a node searched with the window (alpha_orig, beta_orig) in the
+        # transposition table (see probe):
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND if maximizing_player else LOWER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND if maximizing_player else UPPER_BOUND
+        else:
+            flag = EXACT
+        shared = self.shared_table is not None and depth >= SHARED_MIN_DEPTH
+        # a subtree searched to the end of the game in every line is solved:
+        if self.stats['horizon'] == horizon_orig:
+            depth = SOLVED_DEPTH
+        value = best_eval * (1 if maximizing_player else -1)
+        move = engine.MIRROR_LABEL[best_move] if player == '2' else best_move
+        self.table.store(key, depth, flag, value, move)
+        if shared:
+            self.shared_table.store(key, self.shared_namespace, depth, flag, value, move)
+
+    def reduce(self, depth, index, extra_turn, last_pit_seeds):
+        # whether to search a move at reduced depth (see LMR_MIN_DEPTH): never at the root, for the
+        # first moves in the search order, or for forcing moves (a capture leaves the last pit empty):
+        if not self.reductions or depth < LMR_MIN_DEPTH or depth >= self.depth or index < LMR_FULL_MOVES:
+            return False
+        if extra_turn or last_pit_seeds == 0:
+            return False
+        self.stats['reductions'] += 1
+        return True
+
+    def probcut_cut(self, game, depth, alpha, beta, maximizing_player):
+        """
+        ProbCut: predict the value of a deep search from a shallow one, with the regression fitted
+        by probcut.py (deep = slope * shallow + intercept, for the side to move, with a standard
+        deviation). If the prediction is above beta (for the maximizing player) or below alpha (for
+        the minimizing player) with enough confidence, the node is cut.
+
+        Returns:
+        float: The bound to return (beta or alpha), or None to search the node normally.
+        """
+        # (there is nothing to cut against an infinite bound):
+        if math.isinf(beta if maximizing_player else alpha):
+            return None
+        shallow, slope, intercept, deviation = self.probcut[depth]
+        # the regression is for the side to move; the values of minimax are for this agent:
+        intercept = intercept if maximizing_player else -intercept
+        margin = self.probcut_confidence * deviation
+        if maximizing_player:
+            bound = (beta + margin - intercept) / slope
+            value, _ = self.minimax(game, shallow, bound - 1, bound, True)
+            if value >= bound:
+                self.stats['probcuts'] += 1
+                self.stats['horizon'] += 1
+                return beta
+        else:
+            bound = (alpha - margin - intercept) / slope
+            value, _ = self.minimax(game, shallow, bound, bound + 1, False)
+            if value <= bound:
+                self.stats['probcuts'] += 1
+                self.stats['horizon'] += 1
+                return alpha
+        return None
+
+    def order_moves(self, game, player, moves, table_move):
+        # search the move from the transposition table first, then the extra turns and captures
+        # (looked up in the engine's move tables), then the others by history score:
+        if self.table is None:
+            return moves
+        board = engine.board_from_dict(game.board)
+        tactical = [engine.PIT_LABELS[pit] for pit in engine.tactical_moves(board, player)]
+        return self.history.order(player, moves, table_move, tactical)
+
+    def minimax_frontier(self, game, alpha, beta, maximizing_player, table_move):
+        # a depth-1 node: play every move, then evaluate all the resulting leaves in one batch
+        # (like the depth-0 case of minimax, the leaves are evaluated as they are, without checking
+        # for the end of the game, unless the quiescence search follows them; their evaluations are
+        # then its stand-pat values):
+        player = self.player if maximizing_player else self.opponent
+        moves = self.order_moves(game, player, game.get_valid_moves(player), table_move)
+        captures, children, leaves = [], [], []
+        for move in moves:
+            new_game = game.copy()
+            new_game.player_turn = player
+            prev_seeds = new_game.board[player]
+            last_pit = new_game.make_move(move)
+            new_game.check_capture(last_pit)
+            captures.append(new_game.board[player] - prev_seeds)
+            # (the agent is to move in the child after its own extra turn or the opponent's move):
+            children.append((new_game, (last_pit == player) == maximizing_player))
+            if self.quiescence_nodes:
+                new_game.check_game_over()
+            leaves.append((engine.board_from_dict(new_game.board), self.player))
+        self.stats['horizon'] += len(leaves)
+
+        # go through the values in the same order and with the same cutoffs as minimax, so that the
+        # result is exactly the same as without batching:
+        best_eval = float('-inf') if maximizing_player else float('inf')
+        best_move = None
+        for move, seeds_captured, (child, child_maximizing), eval in zip(moves, captures, children,
+                                                                          self.batch_evaluator(leaves)):
+            if maximizing_player:
+                if self.quiescence_nodes:
+                    eval = self.leaf_quiescence(child, alpha - seeds_captured, beta - seeds_captured,
+                                                child_maximizing, eval)
+                eval += seeds_captured
+                if eval > best_eval:
+                    best_eval, best_move = eval, move
+                alpha = max(alpha, eval)
+            else:
+                if self.quiescence_nodes:
+                    eval = self.leaf_quiescence(child, alpha + seeds_captured, beta + seeds_captured,
+                                                child_maximizing, eval)
+                eval -= seeds_captured
+                if eval < best_eval:
+                    best_eval, best_move = eval, move
+                beta = min(beta, eval)
+            if beta <= alpha:
+                self.history.add(player, move, 1)
+                break
+
+        return best_eval, best_move
+
+    def leaf_quiescence(self, game, alpha, beta, maximizing_player, stand_pat=None):
+        # a leaf of the main search, followed by the quiescence search with a budget of its own, so
+        # that its value depends only on the position and the window, not on how much of the budget
+        # the other leaves used (the values stored in the transposition table above it stay valid):
+        self.quiescence_left = self.quiescence_nodes
+        eval = self.quiescence(game, alpha, beta, maximizing_player, 0, stand_pat)
+        if self.quiescence_left < self.quiescence_nodes:
+            self.stats['extensions'] += 1
+        if self.quiescence_left <= 0:
+            self.quiescence_cuts += 1
+        return eval
+
+    def forcing_values(self, game, player, moves):
+        # the static evaluations of the positions after the forcing moves of a quiescence node, in
+        # one batch (for the batch evaluator), by move:
+        forcing, leaves = [], []
+        for move in moves:
+            new_game = game.copy()
+            new_game.player_turn = player
+            last_pit = new_game.make_move(move)
+            new_game.check_capture(last_pit)
+            if last_pit != player and new_game.board[last_pit] != 0:
+                continue
+            new_game.check_game_over()
+            forcing.append(move)
+            leaves.append((engine.board_from_dict(new_game.board), self.player))
+        return dict(zip(forcing, self.batch_evaluator(leaves))) if leaves else {}
+
+    def quiescence(self, game, alpha, beta, maximizing_player, ply, stand_pat=None):
+        # past depth 0, keep following forcing moves (moves that end in the player's own store or
+        # capture) until the position is quiet or the node budget runs out. Like in chess, the side
+        # to move may also "stand pat" and take the static evaluation instead of a forcing move (the
+        # evaluation is given when it was computed in a batch, see forcing_values):
+        if game.check_game_over():
+            return self.evaluate(game) if stand_pat is None else stand_pat
+        self.stats['max_extension'] = max(self.stats['max_extension'], ply)
+
+        best_eval = self.evaluate(game) if stand_pat is None else stand_pat
+        if maximizing_player:
+            alpha = max(alpha, best_eval)
+        else:
+            beta = min(beta, best_eval)
+        player = self.player if maximizing_player else self.opponent
+
+        moves = game.get_valid_moves(player)
+        stand_pats = {}
+        if self.batch_evaluator is not None and beta > alpha and self.quiescence_left > 0:
+            stand_pats = self.forcing_values(game, player, moves)
+        for move in moves:
+            if beta <= alpha or self.quiescence_left <= 0:
+                break
+            new_game = game.copy()
+            new_game.player_turn = player
+            prev_seeds = new_game.board[player]
+            last_pit = new_game.make_move(move)
+            new_game.check_capture(last_pit)
+
+            # a capture leaves the last pit empty (it always gets a seed otherwise):
+            extra_turn = last_pit == player
+            if not extra_turn and new_game.board[last_pit] != 0:
+                continue
+            self.quiescence_left -= 1
+            self.stats['quiescence_nodes'] += 1
+            seeds_captured = new_game.board[player] - prev_seeds
+
+            if maximizing_player:
+                eval = self.quiescence(new_game, alpha - seeds_captured, beta - seeds_captured, extra_turn,
+                                       ply + 1, stand_pats.get(move)) + seeds_captured
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                eval = self.quiescence(new_game, alpha + seeds_captured, beta + seeds_captured, not extra_turn,
+                                       ply + 1, stand_pats.get(move)) - seeds_captured
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+
+        return best_eval
+
+
+# the virtual loss given to a path while its leaf waits for a batch evaluation:
+VIRTUAL_LOSS = 1.0
+
+
+class LeafQueue:
+    """
+    Collects leaf positions and evaluates them together with a batch evaluator: a function that
+    takes a list of (board, player) pairs (compact engine boards) and returns one value per
+    position. The batch is evaluated when it is full, when the oldest queued leaf has waited
+    longer than the timeout (in seconds), or when flush() is called.
+    """
+    def __init__(self, evaluator, batch_size=16, timeout=None):
+        self.evaluator = evaluator
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.positions = []
+        self.callbacks = []
+        self.started = None
+        # statistics, to check how full the batches are:
+        self.batches = 0
+        self.evaluated = 0
+
+    @property
+    def params(self):
+        # the settings that change which leaves are evaluated together, and so the search (see
+        # results_store.agent_config):
+        return [self.batch_size, self.timeout]
+
+    def put(self, board, player, callback):
+        """Queue a position; callback(value) is called once it has been evaluated."""
+        if not self.positions:
+            self.started = time.perf_counter()
+        self.positions.append((board, player))
+        self.callbacks.append(callback)
+        if len(self.positions) >= self.batch_size or (
+                self.timeout is not None and time.perf_counter() - self.started >= self.timeout):
+            self.flush()
+
+    def flush(self):
+        """Evaluate every queued position and call their callbacks."""
+        if not self.positions:
+            return
+        positions, callbacks = self.positions, self.callbacks
+        self.positions, self.callbacks = [], []
+        self.batches += 1
+        self.evaluated += len(positions)
+        for callback, value in zip(callbacks, self.evaluator(positions)):
+            callback(value)
+
+
+def feature_evaluator(weights):
+    """
+    Create a batch evaluator from evaluation weights (see engine.FEATURE_NAMES), for use with
+    MinimaxAgent(batch_evaluator=...). The values are for the player of each (board, player) pair.
+    """
+    def evaluate_batch(positions):
+        return [sum(weight * value for weight, value in zip(weights, engine.features(board, player)))
+                for board, player in positions]
+    # (the weights identify the evaluator, see share_table and results_store.agent_config):
+    evaluate_batch.params = list(weights)
+    return evaluate_batch
+
+
+class MCTSNode:
+    """
+    A node of the MCTS tree: a position of the compact engine and the statistics of the move that
+    led to it. value_sum is counted from the point of view of the player who made that move.
+    """
+    __slots__ = ('board', 'player', 'over', 'children', 'visits', 'value_sum')
+
+    def __init__(self, board, player, over=False):
+        self.board = board
+        self.player = player
+        self.over = over
+        self.children = None
+        self.visits = 0
+        self.value_sum = 0.0
+
+    def expand(self):
+        # create one child per valid move of the player to move:
+        self.children = {}
+        for move in engine.get_valid_moves(self.board, self.player):
+            child = self.board[:]
+            _, _, over, next_player = engine.play(child, self.player, move)
+            self.children[move] = MCTSNode(child, next_player, over)
+
+
+class MCTSAgent:
+    """
+    An agent that uses Monte Carlo tree search, with a value network (trained by value_network.py)
+    to evaluate the leaves instead of random playouts.
+    """
+    def __init__(self, player, simulations=300, exploration=1.4, network=None, batch_size=1, batch_timeout=None,
+                 reuse_tree=True, clock=None):
+        self.player = player
+        self.simulations = simulations
+        self.exploration = exploration
+        # load the default checkpoint if no network is given; without it, the leaves are evaluated
+        # with the store difference:
+        if network is None:
+            import value_network
+            if os.path.exists(value_network.VALUE_NETWORK_FILE):
+                network = value_network.ValueNetwork.load()
+        self.network = network
+        # with a batch size above 1, leaves are collected and evaluated together:
+        self.queue = LeafQueue(self.evaluate_batch, batch_size, batch_timeout) if batch_size > 1 else None
+        # the tree of the previous move; its subtree for the new position is reused:
+        self.reuse_tree = reuse_tree
+        self.root = None
+        # an optional game clock (see time_control.py): with a clock, the number of simulations of
+        # every move is decided by the clock instead of being fixed:
+        self.clock = clock
+
+    def evaluate(self, node):
+        # the value of a position for its side to move, between -1 and 1:
+        if node.over:
+            return engine.result_for(node.board, node.player)
+        return self.evaluate_batch([(node.board, node.player)])[0]
+
+    def select(self, node):
+        # choose the child with the best UCT score for the player to move:
+        log_visits = math.log(node.visits + 1)
+        best_score, best_child = float('-inf'), None
+        for child in node.children.values():
+            if child.visits == 0:
+                return child
+            score = child.value_sum / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best_score, best_child = score, child
+        return best_child
+
+    def descend(self, root):
+        # walk down the tree to a leaf, expanding the nodes that have been visited before:
+        path = [root]
+        node = root
+        while not node.over:
+            if node.children is None:
+                if node.visits == 0:
                     break
+                node.expand()
+            node = self.select(node)
+            path.append(node)
+        return path
+
+    def backup(self, path, value):
+        # back up the leaf value; each node stores it for the player who moved into it:
+        leaf_player = path[-1].player
+        path[0].visits += 1
+        for parent, child in zip(path, path[1:]):
+            child.visits += 1
+            child.value_sum += value if parent.player == leaf_player else -value
+
+    def simulate(self, root):
+        path = self.descend(root)
+        self.backup(path, self.evaluate(path[-1]))
+
+    def simulate_batched(self, root):
+        # like simulate, but the leaf is queued for batch evaluation. Until its value arrives, the
+        # path gets a virtual loss, so that the next descents explore other leaves:
+        path = self.descend(root)
+        leaf = path[-1]
+        if leaf.over:
+            self.backup(path, self.evaluate(leaf))
+            return
+        for node in path:
+            node.visits += 1
+        for node in path[1:]:
+            node.value_sum -= VIRTUAL_LOSS
+        self.queue.put(leaf.board, leaf.player, lambda value: self.backup_pending(path, value))
+
+    def backup_pending(self, path, value):
+        # remove the virtual loss and back up the real value:
+        for node in path:
+            node.visits -= 1
+        for node in path[1:]:
+            node.value_sum += VIRTUAL_LOSS
+        self.backup(path, value)
+
+    def evaluate_batch(self, positions):
+        # the values of many (board, player to move) positions, for their side to move:
+        if self.network is not None:
+            return self.network.evaluate_batch(positions)
+        return [math.tanh((board[engine.STORE[player]] - board[engine.STORE[engine.OPPONENT[player]]]) / 8)
+                for board, player in positions]
+
+    def find_subtree(self, board, max_depth=4):
+        # look for the new position among the nodes of the previous tree, a few moves deep (the
+        # opponent's reply, possibly after extra turns):
+        level = [self.root]
+        for _ in range(max_depth):
+            next_level = []
+            for node in level:
+                for child in (node.children or {}).values():
+                    if child.player == self.player and child.board == board:
+                        return child
+                    next_level.append(child)
+            level = next_level
+        return None
+
+    def new_game(self):
+        # the tree of the previous game is not reused (its start position would be found again):
+        self.root = None
+
+    def make_move(self, game):
+        board = engine.board_from_dict(game.board)
+        root = self.find_subtree(board) if self.reuse_tree and self.root is not None else None
+        if root is None:
+            root = MCTSNode(board, self.player)
+            root.visits = 1
+        if root.children is None:
+            root.expand()
+        self.root = root
+        if len(root.children) == 1:
+            return engine.PIT_LABELS[next(iter(root.children))]
+
+        if self.clock is not None:
+            self.timed_simulations(root)
+        else:
+            for _ in range(self.simulations):
+                if self.queue is None:
+                    self.simulate(root)
+                else:
+                    self.simulate_batched(root)
+        if self.queue is not None:
+            self.queue.flush()
+
+        # choose the most visited move:
+        best_move = max(root.children, key=lambda move: root.children[move].visits)
+        return engine.PIT_LABELS[best_move]
 
-            return min_eval, best_move
+    def timed_simulations(self, root):
+        # run simulations until the soft time limit of the move (see time_control.allocate), or
+        # earlier once no other move can catch up with the most visited one in the time left:
+        started = time.perf_counter()
+        import time_control
+        budget = time_control.allocate(self.clock, self.player, root.board, len(root.children))
+        simulations = 0
+        while True:
+            for _ in range(CLOCK_SIMULATIONS):
+                if self.queue is None:
+                    self.simulate(root)
+                else:
+                    self.simulate_batched(root)
+            simulations += CLOCK_SIMULATIONS
+            elapsed = time.perf_counter() - started
+            if elapsed >= budget.soft:
+                return
+            visits = sorted((child.visits for child in root.children.values()), reverse=True)
+            if visits[0] - visits[1] > simulations / elapsed * (budget.soft - elapsed):
+                return
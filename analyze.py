@@ -0,0 +1,264 @@
+# import required libraries:
+# os: the default number of worker processes.
+# sys: positions can be read from stdin and results written to stdout.
+# json: results are written as JSON lines.
+# math: the size of the result cache, and the scores missing from it (NaN).
+# time: the throughput is reported at the end.
+# argparse: command line interface.
+# itertools: the input stream is cut into chunks.
+# collections: the queue of pending chunks.
+# concurrent.futures: chunks of positions are analyzed by a pool of worker processes.
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+import collections
+import concurrent.futures
+import mancala_engine as engine
+from headless import Game, create_agent, agent_argument
+from game_records import load_positions
+from search_state import EXACT
+from shared_table import SharedTable, SLOT_WORDS, namespace
+
+# the settings of this worker process (see init_worker), and its agents by side:
+_settings = {}
+_agents = {}
+
+
+def init_worker(agent_name, depth, cache=None, shared_table=None):
+    # set up a worker process; every worker keeps its own agents (and their transposition tables)
+    # for all the positions it analyzes, and may share a transposition table with the other
+    # workers (see shared_table.py). The results are cached in a SharedTable used by all the
+    # workers, in a namespace of their own (so they never mix with the search entries of the same
+    # table, or with the results of another agent or depth):
+    _settings.update(agent=agent_name, depth=depth, cache=cache, shared_table=shared_table,
+                     namespace=namespace('analysis', agent_name, depth))
+    _agents.clear()
+
+
+def get_agent(player):
+    if player not in _agents:
+        agent = create_agent(_settings['agent'], player)
+        if _settings['depth'] is not None and hasattr(agent, 'depth'):
+            agent.depth = _settings['depth']
+        if _settings['shared_table'] is not None and hasattr(agent, 'share_table'):
+            agent.share_table(_settings['shared_table'])
+        _agents[player] = agent
+    return _agents[player]
+
+
+def analyze_position(board, player):
+    """
+    Analyze one position with the worker's agent, for the side to move.
+
+    Returns:
+    dict: The best move (a pit label, or None if the game is over), the score for the side to move
+          (the minimax value, or None for agents without one), the search depth and node count.
+    """
+    if engine.finish(board[:]):
+        return {'move': None, 'score': board[engine.STORE[player]] - board[engine.STORE[engine.OPPONENT[player]]],
+                'depth': 0, 'nodes': 0}
+
+    # the result of a position is the same as the one of its mirror image with the other player to
+    # move, so the cache is keyed by the canonical position (and the moves are stored canonically).
+    # A cached result took no search, so its node count is 0:
+    cache, key = _settings['cache'], engine.canonical_key(board, player)
+    entry = cache.lookup(key, _settings['namespace']) if cache is not None else None
+    if entry is not None:
+        depth, _, score, move, _ = entry
+        if math.isnan(score):
+            score, depth = None, None
+        if player == '2' and move is not None:
+            move = engine.MIRROR_LABEL[move]
+        return {'move': move, 'score': score, 'depth': depth, 'nodes': 0, 'cached': True}
+
+    agent = get_agent(player)
+    game = Game.from_position(engine.to_bytes(board, player))
+    if hasattr(agent, 'minimax'):
+        agent.reset_stats()
+        if agent.table is not None:
+            agent.table.new_search()
+            agent.history.new_search()
+        score, move = agent.minimax(game, agent.depth, float('-inf'), float('inf'), True)
+        depth, nodes = agent.depth, agent.stats['nodes']
+    else:
+        move, score = agent.make_move(game), None
+        depth, nodes = None, getattr(agent, 'simulations', None)
+
+    # (the agents without a minimax value are stored with a NaN score and depth 0):
+    if cache is not None:
+        cache.store(key, _settings['namespace'], depth or 0, EXACT, float('nan') if score is None else score,
+                    engine.MIRROR_LABEL[move] if player == '2' else move)
+    return {'move': move, 'score': score, 'depth': depth, 'nodes': nodes, 'cached': False}
+
+
+def analyze_chunk(positions):
+    """
+    Analyze a chunk of positions in text notation (run in a worker process).
+
+    Returns:
+    list: One result dict per position, with the position itself (or an error, for invalid input or
+          a failed analysis: one bad position does not stop the run).
+    """
+    results = []
+    for text in positions:
+        try:
+            board, player = engine.from_text(text)
+        except ValueError as error:
+            results.append({'position': text, 'error': str(error)})
+            continue
+        try:
+            result = analyze_position(board, player)
+        except Exception as error:
+            results.append({'position': text, 'error': f'{type(error).__name__}: {error}'})
+            continue
+        result['position'] = text
+        results.append(result)
+    return results
+
+
+def read_positions(paths, binary=False):
+    """
+    Read positions lazily, one at a time, from text files (one position per line in text notation,
+    '-' for stdin) or, with binary, from positions files written by game_records.py.
+
+    Yields:
+    str: The positions in text notation.
+    """
+    for path in paths:
+        if binary:
+            for position, side, _, _ in load_positions(path):
+                yield engine.to_text(position, side)
+        else:
+            file = sys.stdin if path == '-' else open(path)
+            try:
+                for line in file:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        yield line
+            finally:
+                if file is not sys.stdin:
+                    file.close()
+
+
+def result_cache(cache_size, shared_table=None):
+    """
+    Get the table the workers cache their results in: the shared transposition table if there is
+    one, otherwise a SharedTable of about cache_size entries (None for a cache size of 0).
+
+    Returns:
+    tuple: (the table, whether it was created here and must be closed).
+    """
+    if not cache_size:
+        return None, False
+    if shared_table is not None:
+        return shared_table, False
+    return SharedTable(max(1, math.ceil(cache_size * SLOT_WORDS * 8 / 2 ** 20))), True
+
+
+def analyze(positions, agent_name='minimax', depth=None, workers=None, chunk_size=64, window=None,
+            cache_size=100000, ordered=True, shared_table=None):
+    """
+    Analyze a stream of positions in parallel. The positions are cut into chunks that are sent to
+    the worker processes; at most window chunks are pending at any time, so the memory use does not
+    depend on the size of the input, which is read only as fast as the workers analyze it.
+
+    Parameters:
+    positions (iterable): The positions in text notation.
+    agent_name (str): The agent to analyze with ('minimax', 'mcts', 'medium' or 'random').
+    depth (int): The search depth (for agents with a depth; default: the agent's own).
+    workers (int): The number of worker processes (default: one per core).
+    chunk_size (int): The number of positions sent to a worker at once.
+    window (int): The maximum number of pending chunks (default: 4 per worker).
+    cache_size (int): The number of results cached for all the workers (in the shared table, if
+                      there is one; 0 disables the cache).
+    ordered (bool): Whether to yield the results in input order (otherwise as they complete).
+    shared_table (SharedTable): A transposition table shared by the workers (default: none).
+
+    Yields:
+    dict: One result per position (see analyze_position), with the position.
+    """
+    workers = workers or os.cpu_count()
+    window = window or 4 * workers
+    cache, owned = result_cache(cache_size, shared_table)
+    try:
+        yield from analyze_chunks(positions, agent_name, depth, workers, chunk_size, window, ordered, cache,
+                                  shared_table)
+    finally:
+        if owned:
+            cache.close()
+
+
+def analyze_chunks(positions, agent_name, depth, workers, chunk_size, window, ordered, cache, shared_table):
+    # the work of analyze, with the result cache already set up:
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_worker,
+                                                initargs=(agent_name, depth, cache, shared_table)) as pool:
+        positions = iter(positions)
+        chunks = iter(lambda: list(itertools.islice(positions, chunk_size)), [])
+        pending = collections.deque()
+
+        def submit():
+            # send the next chunk, if any; returns False at the end of the input:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pending.append(pool.submit(analyze_chunk, chunk))
+            return True
+
+        more = True
+        while more and len(pending) < window:
+            more = submit()
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                yield from future.result()
+                if more:
+                    more = submit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze a stream of Mancala positions with an AI agent.')
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="files with one position per line in text notation ('-' for stdin, the default)")
+    parser.add_argument('--binary', action='store_true', help='the inputs are positions files from game_records.py')
+    parser.add_argument('-o', '--output', help='write the results to this file (default: stdout)')
+    parser.add_argument('--agent', default='minimax', type=agent_argument,
+                        help='random, medium, minimax or mcts (minimax options: +lmr, +probcut, +d<depth>)')
+    parser.add_argument('--depth', type=int, help='search depth')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='positions per task')
+    parser.add_argument('--window', type=int, help='maximum pending tasks (default: 4 per worker)')
+    parser.add_argument('--cache-size', type=int, default=100000,
+                        help='results cached for all the workers (0: no cache)')
+    parser.add_argument('--unordered', action='store_true', help='write the results as they complete')
+    parser.add_argument('--shared-table', type=int, default=0, metavar='MB',
+                        help='size of a transposition table shared by the workers (0: none)')
+    args = parser.parse_args()
+
+    shared = SharedTable(args.shared_table) if args.shared_table else None
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    started = time.perf_counter()
+    count = cached = 0
+    for analysis in analyze(read_positions(args.inputs, args.binary), args.agent, args.depth, args.workers,
+                            args.chunk_size, args.window, args.cache_size, not args.unordered, shared):
+        output.write(json.dumps(analysis) + '\n')
+        count += 1
+        cached += analysis.get('cached', False)
+    if output is not sys.stdout:
+        output.close()
+    elapsed = time.perf_counter() - started
+    print(f'Analyzed {count} positions ({cached} from the cache) in {elapsed:.1f} s '
+          f'({count / elapsed:.1f} positions/s)', file=sys.stderr)
+    if shared is not None:
+        print(shared.report(), file=sys.stderr)
+        shared.close()
@@ -0,0 +1,299 @@
+# import required libraries:
+# time: soak runs are limited by time.
+# json: reproducers are saved as JSON.
+# random: random boards and move sequences.
+# argparse: command line interface.
+import time
+import json
+import random
+import argparse
+import mancala_engine as engine
+import mancala_kernel
+from headless import Game
+from mancala_ai_ai import Mancala
+
+# the fields of a move result compared between the backends and the reference:
+FIELDS = ('board', 'last pit', 'captured', 'game over', 'next player')
+
+
+def reference_step(board, player, pit):
+    """
+    Play one move with the reference rules (the Mancala class in mancala_ai_ai.py).
+
+    Parameters:
+    board (list): The compact board before the move.
+    player (str): The player making the move.
+    pit (int): The index of the pit where the move starts.
+
+    Returns:
+    tuple: (board after the move, last pit index, seeds captured, whether the game is over, next player).
+    """
+    game = Mancala(verbose=False)
+    game.board = engine.board_to_dict(board)
+    game.player_turn = player
+    last_pit = game.make_move(engine.PIT_LABELS[pit])
+    before_capture = game.board[player]
+    game.check_capture(last_pit)
+    captured = game.board[player] - before_capture
+    over = game.check_game_over()
+    next_player = player if last_pit == player else engine.OPPONENT[player]
+    return engine.board_from_dict(game.board), engine.PIT_INDEX[last_pit], captured, over, next_player
+
+
+def engine_step(board, player, pit):
+    # the compact engine (mancala_engine.play):
+    board = board[:]
+    last, captured, over, next_player = engine.play(board, player, pit)
+    return board, last, captured, over, next_player
+
+
+def move_outcome_step(board, player, pit):
+    # the precomputed move tables (mancala_engine.move_outcome) only predict the last pit, the
+    # extra turn and the capture; the fields they do not compute are None and are not compared:
+    last, extra_turn, captured = engine.move_outcome(board, pit, player)
+    return None, last, captured, None, player if extra_turn else engine.OPPONENT[player]
+
+
+def kernel_step(board, player, pit):
+    # the compiled kernel (mancala_kernel, plain Python when numba is not installed):
+    board = mancala_kernel.to_kernel_board(board)
+    kernel_player = mancala_kernel.PLAYER_NUMBER[player]
+    last = mancala_kernel.sow(board, pit, kernel_player)
+    captured = mancala_kernel.capture(board, last, kernel_player)
+    over = mancala_kernel.finish(board)
+    next_player = player if last == engine.STORE[player] else engine.OPPONENT[player]
+    return [int(seeds) for seeds in board], int(last), int(captured), bool(over), next_player
+
+
+def headless_step(board, player, pit):
+    # the Game of headless.py (the board dict of the Mancala class, sown along precomputed paths):
+    game = Game()
+    game.board = engine.board_to_dict(board)
+    game.player_turn = player
+    last_pit = game.make_move(engine.PIT_LABELS[pit])
+    before_capture = game.board[player]
+    game.check_capture(last_pit)
+    captured = game.board[player] - before_capture
+    over = game.check_game_over()
+    next_player = player if last_pit == player else engine.OPPONENT[player]
+    return engine.board_from_dict(game.board), engine.PIT_INDEX[last_pit], captured, over, next_player
+
+
+def incremental_step(board, player, pit):
+    # the incremental features (mancala_engine.Position): after the move, the features kept up to
+    # date must be the ones computed from scratch, and undoing the move must restore both the board
+    # and the features; otherwise the board is reported as 'inconsistent features':
+    position = engine.Position(board)
+    before = [position.features(side) for side in '12']
+    last, captured = position.play(player, pit)
+    over = position.finish()
+    after = position.board[:]
+    consistent = all(position.features(side) == engine.features(after, side) for side in '12')
+    if over:
+        position.undo()
+    position.undo()
+    consistent = consistent and position.board == board and [position.features(side) for side in '12'] == before
+    next_player = player if last == engine.STORE[player] else engine.OPPONENT[player]
+    return after if consistent else 'inconsistent features', last, captured, over, next_player
+
+
+# the backends checked against the reference, by name. A backend takes (board, player, pit) and
+# returns the same tuple as reference_step, with None for the fields it does not compute:
+BACKENDS = {'engine': engine_step, 'move_outcome': move_outcome_step, 'kernel': kernel_step,
+            'headless': headless_step, 'incremental': incremental_step}
+
+
+def random_board(rng, total=engine.MAX_SEEDS):
+    """
+    Make a random (adversarial) position with the given number of seeds: seeds piled in a few
+    pits (long sowings with full laps), sides that are almost empty, pits with 13 or 26 seeds (a
+    last seed that lands back in the emptied pit) and empty pits to capture into.
+    """
+    board = [0] * engine.NUM_PITS
+    style = rng.randrange(4)
+    if style == 0:
+        # the standard start position:
+        return engine.new_board()
+    pits = engine.PITS['1'] + engine.PITS['2']
+    if style == 1:
+        # seeds spread over a few random pits (and the stores):
+        targets = rng.sample(range(engine.NUM_PITS), rng.randint(2, 6))
+        for _ in range(total):
+            board[rng.choice(targets)] += 1
+    elif style == 2:
+        # one side almost empty:
+        player = rng.choice('12')
+        for _ in range(rng.randint(1, 3)):
+            board[rng.choice(engine.PITS[player])] += 1
+        others = engine.PITS[engine.OPPONENT[player]] + (engine.STORE['1'], engine.STORE['2'])
+        for _ in range(total - sum(board)):
+            board[rng.choice(others)] += 1
+    else:
+        # lap-sized pits first, the rest at random:
+        for pit in rng.sample(pits, 2):
+            seeds = min(rng.choice((13, 26)), total - sum(board))
+            board[pit] += seeds
+        for _ in range(total - sum(board)):
+            board[rng.randrange(engine.NUM_PITS)] += 1
+    # a position with an empty side is already over; give each side at least one seed:
+    for player in '12':
+        if not any(board[pit] for pit in engine.PITS[player]):
+            source = max(range(engine.NUM_PITS), key=board.__getitem__)
+            board[source] -= 1
+            board[rng.choice(engine.PITS[player])] += 1
+    return board
+
+
+def choose_move(rng, board, player):
+    # mostly random moves, with a bias towards the moves most likely to break the rules code:
+    # the biggest pit (laps), extra turns and captures:
+    moves = engine.get_valid_moves(board, player)
+    roll = rng.random()
+    if roll < 0.2:
+        return max(moves, key=board.__getitem__)
+    if roll < 0.4:
+        tactical = engine.tactical_moves(board, player)
+        if tactical:
+            return rng.choice(tactical)
+    return rng.choice(moves)
+
+
+def random_case(rng, max_moves=60):
+    """
+    Make a random test case: a start position, the player to move and a sequence of moves that
+    is played until the game ends or max_moves moves have been made.
+
+    Returns:
+    dict: {'board', 'player', 'moves'}.
+    """
+    board, player = random_board(rng), rng.choice('12')
+    case = {'board': board[:], 'player': player, 'moves': []}
+    for _ in range(rng.randint(1, max_moves)):
+        pit = choose_move(rng, board, player)
+        case['moves'].append(pit)
+        _, _, over, player = engine.play(board, player, pit)
+        if over:
+            break
+    return case
+
+
+def run_case(case, backends):
+    """
+    Play the moves of a case with the reference and every backend, comparing after every move.
+    The game continues from the reference position, so a backend is checked move by move.
+
+    Returns:
+    tuple: (move number, backend, field, reference value, backend value) of the first mismatch,
+           or None if every move matches.
+    """
+    board, player = case['board'][:], case['player']
+    for number, pit in enumerate(case['moves']):
+        if pit not in engine.get_valid_moves(board, player):
+            return None
+        expected = reference_step(board, player, pit)
+        for name in backends:
+            result = BACKENDS[name](board, player, pit)
+            for field, want, got in zip(FIELDS, expected, result):
+                if got is not None and got != want:
+                    return number, name, field, want, got
+        board, player = expected[0], expected[4]
+        if expected[3]:
+            return None
+    return None
+
+
+def shrink(case, backends):
+    """
+    Shrink a failing case to a minimal reproducer: start from the position just before the
+    failing move, then remove seeds from the pits one at a time as long as the case still fails.
+
+    Returns:
+    dict: The smallest failing case found.
+    """
+    mismatch = run_case(case, backends)
+    # replay the moves before the mismatch with the reference, and keep only the failing move:
+    board, player = case['board'][:], case['player']
+    for pit in case['moves'][:mismatch[0]]:
+        board, _, _, _, player = reference_step(board, player, pit)
+    case = {'board': board, 'player': player, 'moves': [case['moves'][mismatch[0]]]}
+
+    # remove seeds (whole pits first, then one seed at a time) while the case still fails:
+    changed = True
+    while changed:
+        changed = False
+        for pit in range(engine.NUM_PITS):
+            for seeds in (0, case['board'][pit] // 2, case['board'][pit] - 1):
+                if seeds < 0 or seeds >= case['board'][pit]:
+                    continue
+                candidate = {'board': case['board'][:], 'player': case['player'], 'moves': case['moves']}
+                candidate['board'][pit] = seeds
+                if run_case(candidate, backends) is not None:
+                    case, changed = candidate, True
+                    break
+    return case
+
+
+def describe(case, backends):
+    # a readable description of a failing case:
+    number, name, field, want, got = run_case(case, backends)
+    labels = ' '.join(engine.PIT_LABELS[pit] for pit in case['moves'])
+    return (f"position {engine.to_text(case['board'], case['player'])}, moves {labels}: "
+            f"{name} gives {field} {got}, the reference gives {want} (move {number + 1})")
+
+
+def fuzz(cases=None, seconds=None, seed=None, backends=None, reproducer='fuzz_failure.json'):
+    """
+    Run random cases until the number of cases or the time limit is reached, or a mismatch is found.
+    A mismatch is shrunk, printed and saved to the reproducer file.
+
+    Returns:
+    bool: True if no mismatch was found.
+    """
+    backends = backends or list(BACKENDS)
+    seed = random.randrange(1 << 32) if seed is None else seed
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    count = moves = 0
+    print(f'fuzzing {", ".join(backends)} against the reference (seed {seed})')
+
+    while (cases is None or count < cases) and (seconds is None or time.perf_counter() - started < seconds):
+        case = random_case(rng)
+        count += 1
+        moves += len(case['moves'])
+        if run_case(case, backends) is not None:
+            case = shrink(case, backends)
+            print(f'MISMATCH after {count} cases: {describe(case, backends)}')
+            with open(reproducer, 'w') as file:
+                json.dump(case, file)
+            print(f'reproducer saved to {reproducer} (replay it with --replay {reproducer})')
+            return False
+        if seconds is not None and count % 1000 == 0:
+            elapsed = time.perf_counter() - started
+            print(f'  {count} cases, {moves} moves, {moves / elapsed:,.0f} moves/s')
+
+    elapsed = time.perf_counter() - started
+    print(f'{count} cases ({moves} moves) in {elapsed:.1f} s, no mismatches')
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fuzz the fast Mancala engines against the reference rules.')
+    parser.add_argument('--cases', type=int, default=2000, help='number of random cases (quick mode)')
+    parser.add_argument('--soak', type=float, metavar='SECONDS', help='run for this many seconds instead')
+    parser.add_argument('--seed', type=int, help='random seed (default: a new one every run)')
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS), help='backends to check (default: all)')
+    parser.add_argument('--replay', metavar='FILE', help='replay a saved reproducer instead of fuzzing')
+    parser.add_argument('-o', '--output', default='fuzz_failure.json', help='where to save a reproducer')
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay) as saved:
+            failing_case = json.load(saved)
+        checked = args.backend or list(BACKENDS)
+        ok = run_case(failing_case, checked) is None
+        print('no mismatch' if ok else describe(failing_case, checked))
+    elif args.soak:
+        ok = fuzz(seconds=args.soak, seed=args.seed, backends=args.backend, reproducer=args.output)
+    else:
+        ok = fuzz(cases=args.cases, seed=args.seed, backends=args.backend, reproducer=args.output)
+    raise SystemExit(0 if ok else 1)
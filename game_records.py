@@ -0,0 +1,303 @@
+# import required libraries:
+# json: game records are stored as one JSON object per line.
+# math: the size of the deduplication filter for a given false positive rate.
+# mmap: positions files are read back without loading them into memory.
+# argparse: command line interface for the extraction pipeline.
+# multiprocessing: shards are extracted in parallel worker processes.
+import json
+import math
+import mmap
+import argparse
+import multiprocessing
+import mancala_engine as engine
+
+# each extracted position is stored as a fixed-size row of unsigned bytes:
+# 14 seed counts, the side to move (1 or 2), the move (pit index) and the outcome (0, 1 or 2).
+# a positions file can be opened with numpy as: np.memmap(path, dtype=np.uint8).reshape(-1, ROW_SIZE)
+ROW_SIZE = engine.NUM_PITS + 3
+
+# game phases, defined by the number of seeds still in the pits (see engine.PHASES):
+PHASES = engine.PHASES
+
+# the number of bytes buffered before they are written to a positions file:
+WRITE_BUFFER_SIZE = 1 << 16
+
+# the default fraction of new positions the deduplication filter drops as false duplicates:
+DEDUP_RATE = 0.01
+
+
+def write_records(path, records):
+    """
+    Append game records to a file, one JSON object per line.
+
+    Parameters:
+    path (str): The file where the records are appended.
+    records (iterable): Dictionaries with the keys 'first' (starting player), 'moves' (a string
+                        of pit labels), 'agents' (agent names for Player 1 and 2) and 'score'.
+    """
+    with open(path, 'a') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+
+
+def read_records(paths):
+    """
+    Read game records lazily from one or more files.
+
+    Parameters:
+    paths (list): The files to read.
+
+    Yields:
+    dict: One game record per line.
+    """
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def replay(record, agent=None):
+    """
+    Replay the moves of a game record through the compact engine.
+
+    Parameters:
+    record (dict): A game record (with a 'start' position in text notation if the game did not
+                   start from the start position).
+    agent (str): If given, only yield the positions where this agent is the side to move.
+
+    Yields:
+    tuple: (position, side to move, move, outcome), where position is a tuple of 14 seed counts,
+           move is a pit index and outcome is the winner of the game (1, 2 or 0 for a tie).
+    """
+    # games from an opening suite (see openings.py) start from their opening position:
+    if 'start' in record:
+        board, _ = engine.from_text(record['start'])
+    else:
+        board = engine.new_board()
+    player = record['first']
+    agents = record.get('agents', (None, None))
+    samples = []
+
+    for label in record['moves']:
+        move = engine.PIT_INDEX[label]
+        if agent is None or agents[int(player) - 1] == agent:
+            samples.append((tuple(board), player, move))
+        _, _, over, player = engine.play(board, player, move)
+        if over:
+            break
+
+    # the outcome is only known once the whole game has been replayed (or was proven, for a game
+    # that was adjudicated before the end, see proof_search.py):
+    outcome = record['adjudicated'] if 'adjudicated' in record else engine.winner(board)
+    for position, side, move in samples:
+        yield position, side, move, outcome
+
+
+def filter_phase(samples, phase):
+    """
+    Keep only the positions of the given game phase ('opening', 'middlegame' or 'endgame').
+    """
+    low, high = PHASES[phase]
+    for sample in samples:
+        if low <= sum(sample[0]) - sample[0][6] - sample[0][13] <= high:
+            yield sample
+
+
+def filter_seeds(samples, minimum=0, maximum=48):
+    """
+    Keep only the positions where the side to move has between minimum and maximum seeds in their pits.
+    """
+    for sample in samples:
+        seeds = sum(sample[0][pit] for pit in engine.PITS[sample[1]])
+        if minimum <= seeds <= maximum:
+            yield sample
+
+
+class Deduplicator:
+    """
+    A Bloom filter over position keys. Memory use is fixed by the number of bits, no matter how
+    many positions go through it; the price is that a fraction of new positions is dropped as false
+    duplicates. After n distinct positions, with m bits and k hashes, that fraction is about
+    (1 - e^(-k n / m))^k, so the filter must be sized for the number of positions (see sized):
+    1% takes about 9.6 bits and 7 hashes per position (120 MB for 100M positions), while a filter
+    that is too small drops most new positions.
+    """
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self.table = bytearray(bits // 8 + 1)
+
+    @classmethod
+    def sized(cls, count, rate=DEDUP_RATE):
+        """
+        Create a filter for the given number of distinct positions, with (about) the given false
+        positive rate once they have all been added: m = -n ln(p) / ln(2)^2 bits, k = m/n ln(2) hashes.
+        """
+        bits = max(8, math.ceil(-count * math.log(rate) / math.log(2) ** 2))
+        return cls(bits, max(1, round(bits / max(count, 1) * math.log(2))))
+
+    def false_positive_rate(self, count):
+        """The expected fraction of new positions dropped after count distinct positions."""
+        return (1 - math.exp(-self.hashes * count / self.bits)) ** self.hashes
+
+    def add(self, key):
+        """
+        Add a key to the filter.
+
+        Returns:
+        bool: True if the key was (probably) seen before, False if it is new.
+        """
+        seen = True
+        for i in range(self.hashes):
+            # derive the probe positions from the key with the (deterministic) tuple hash, which
+            # mixes every bit of the key:
+            bit = hash((key, i)) % self.bits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.table[byte] & mask:
+                seen = False
+                self.table[byte] |= mask
+        return seen
+
+    def filter(self, samples):
+        """
+        Keep only the first occurrence of each position. Positions are compared in canonical form,
+        so a position and its mirror image with the other player to move count as the same.
+        """
+        for sample in samples:
+            if not self.add(engine.canonical_key(sample[0], sample[1])):
+                yield sample
+
+
+def shard_of(key, num_shards):
+    # the shard of a canonical position key (from the same tuple hash as the Deduplicator probes):
+    return hash((key, -1)) % num_shards
+
+
+def positions(paths, phase=None, min_seeds=0, max_seeds=48, agent=None, dedup=0, dedup_rate=DEDUP_RATE,
+              shard=0, num_shards=1):
+    """
+    The full extraction pipeline as a generator: read, replay, filter and deduplicate.
+
+    Parameters:
+    paths (list): The game record files.
+    phase (str): Keep only this game phase (default: all phases).
+    min_seeds (int): Minimum number of seeds in the pits of the side to move.
+    max_seeds (int): Maximum number of seeds in the pits of the side to move.
+    agent (str): Keep only the positions where this agent was to move.
+    dedup (int): The expected number of distinct positions, to size the deduplication filter
+                 (0 disables deduplication).
+    dedup_rate (float): The false positive rate of the deduplication filter (see Deduplicator).
+    shard (int): The shard to extract. Without deduplication, games are split between shards by their
+                 line number; with it, positions are split by their canonical key, so every
+                 occurrence of a position goes through the filter of the same shard (each shard
+                 replays all the games, and its filter is sized for its share of the positions).
+    num_shards (int): The total number of shards.
+
+    Yields:
+    tuple: (position, side to move, move, outcome).
+    """
+    def shard_samples():
+        for number, record in enumerate(read_records(paths)):
+            if dedup or number % num_shards == shard:
+                yield from replay(record, agent)
+
+    def key_shard(samples):
+        for sample in samples:
+            if shard_of(engine.canonical_key(sample[0], sample[1]), num_shards) == shard:
+                yield sample
+
+    samples = shard_samples()
+    if phase is not None:
+        samples = filter_phase(samples, phase)
+    if min_seeds > 0 or max_seeds < 48:
+        samples = filter_seeds(samples, min_seeds, max_seeds)
+    if dedup:
+        if num_shards > 1:
+            samples = key_shard(samples)
+        samples = Deduplicator.sized(math.ceil(dedup / num_shards), dedup_rate).filter(samples)
+    return samples
+
+
+def write_positions(path, samples):
+    """
+    Write positions to a binary file with fixed-size rows (see ROW_SIZE). Only a small buffer is
+    kept in memory, so any number of positions can be written.
+
+    Returns:
+    int: The number of positions written.
+    """
+    count = 0
+    buffer = bytearray()
+    with open(path, 'wb') as file:
+        for position, side, move, outcome in samples:
+            buffer.extend(position)
+            buffer.append(int(side))
+            buffer.append(move)
+            buffer.append(outcome)
+            count += 1
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+    return count
+
+
+def load_positions(path):
+    """
+    Read the positions of a binary positions file lazily, through a memory map.
+
+    Yields:
+    tuple: (position, side to move, move, outcome), as produced by replay().
+    """
+    with open(path, 'rb') as file:
+        # an empty file cannot be memory mapped:
+        if file.seek(0, 2) == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), ROW_SIZE):
+                row = data[start:start + ROW_SIZE]
+                yield tuple(row[:engine.NUM_PITS]), str(row[14]), row[15], row[16]
+
+
+def extract_shard(arguments):
+    """Extract one shard to its own file (run in a worker process)."""
+    paths, output, options, shard, num_shards = arguments
+    samples = positions(paths, shard=shard, num_shards=num_shards, **options)
+    return write_positions(f'{output}.{shard}' if num_shards > 1 else output, samples)
+
+
+def extract(paths, output, num_shards=1, **options):
+    """
+    Extract the positions of the given game records, splitting the games into shards that are
+    processed in parallel. Each shard is written to its own file (output.0, output.1, ...).
+
+    Returns:
+    int: The total number of positions written.
+    """
+    jobs = [(paths, output, options, shard, num_shards) for shard in range(num_shards)]
+    if num_shards == 1:
+        return extract_shard(jobs[0])
+    with multiprocessing.Pool(num_shards) as pool:
+        return sum(pool.map(extract_shard, jobs))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract training positions from Mancala game records.')
+    parser.add_argument('records', nargs='+', help='game record files (JSON lines)')
+    parser.add_argument('-o', '--output', required=True, help='positions file to write')
+    parser.add_argument('--phase', choices=sorted(PHASES))
+    parser.add_argument('--min-seeds', type=int, default=0)
+    parser.add_argument('--max-seeds', type=int, default=48)
+    parser.add_argument('--agent', help='keep only positions where this agent was to move')
+    parser.add_argument('--dedup', type=int, default=0, metavar='POSITIONS',
+                        help='deduplicate, with a filter sized for this many distinct positions')
+    parser.add_argument('--dedup-rate', type=float, default=DEDUP_RATE,
+                        help='fraction of new positions the filter may drop as false duplicates')
+    parser.add_argument('--shards', type=int, default=1, help='number of parallel shards')
+    args = parser.parse_args()
+
+    total = extract(args.records, args.output, args.shards, phase=args.phase, min_seeds=args.min_seeds,
+                    max_seeds=args.max_seeds, agent=args.agent, dedup=args.dedup, dedup_rate=args.dedup_rate)
+    print(f'Extracted {total} positions.')
@@ -0,0 +1,303 @@
+# import required libraries:
+# random: the starting player of a game, and the random choices of the agents under a seed.
+# mancala_engine: the pit labels, owners and opposite pits the sowing tables are built from.
+# The agents (ai_agents2.py) are only imported when the first one is created, and the modules of
+# the command line (json, argparse, subprocess) only by it, so a process that only plays games
+# imports the engine and the agents, and none of the interactive modules.
+import random
+import mancala_engine as engine
+
+AGENT_NAMES = ('random', 'medium', 'minimax', 'mcts')
+
+# the class of each agent in ai_agents2.py:
+AGENT_CLASSES = {'random': 'RandomAgent', 'medium': 'MediumAgent', 'minimax': 'MinimaxAgent', 'mcts': 'MCTSAgent'}
+
+PLAYERS = ('1', '2')
+
+# the pits of each player, and every pit (in the order of the Mancala class):
+PLAYER_PITS = {player: tuple(engine.PIT_LABELS[pit] for pit in engine.PITS[player]) for player in PLAYERS}
+PLAYER_PITS['2'] = PLAYER_PITS['2'][::-1]
+ALL_PITS = PLAYER_PITS['1'] + PLAYER_PITS['2']
+
+# the pit opposite each pit:
+OPPOSITE_PIT = {engine.PIT_LABELS[pit]: engine.PIT_LABELS[engine.OPPOSITE[pit]] for pit in range(engine.NUM_PITS)
+                if engine.OPPOSITE[pit] is not None}
+
+# the pits a move sows into, in order, for each player and starting pit: one lap of the 13 pits
+# that player sows into (the opponent's Mancala/Score is skipped), ending at the starting pit:
+LAP = engine.NUM_PITS - 1
+SOWING = {player: {engine.PIT_LABELS[pit]: tuple(engine.PIT_LABELS[index] for index in
+                                                 [(pit + step) % engine.NUM_PITS for step in range(1, engine.NUM_PITS + 1)]
+                                                 if index != engine.STORE[engine.OPPONENT[player]])
+                   for pit in engine.PITS[player]}
+          for player in PLAYERS}
+
+
+def parse_agent(difficulty):
+    """
+    Parse an agent name: a difficulty level ('random', 'medium', 'minimax' or 'mcts'), followed
+    for minimax by options separated by '+', to compare variants of the search (A/B tests):
+    'lmr' (late move reductions), 'probcut' (ProbCut, see probcut.py) and 'd<depth>' (the search
+    depth), e.g. 'minimax+lmr+d6'.
+
+    Returns:
+    tuple: The difficulty level and a dict of agent settings.
+
+    Raises:
+    ValueError: If the name is not a valid agent.
+    """
+    name, *options = difficulty.split('+')
+    if name not in AGENT_NAMES or (options and name != 'minimax'):
+        raise ValueError(f"Unknown AI agent: {difficulty}")
+    settings = {}
+    for option in options:
+        if option == 'lmr':
+            settings['reductions'] = True
+        elif option == 'probcut':
+            settings['probcut'] = True
+        elif option[:1] == 'd' and option[1:].isdigit() and int(option[1:]) > 0:
+            settings['depth'] = int(option[1:])
+        else:
+            raise ValueError(f"Unknown minimax option: {option}")
+    return name, settings
+
+
+def agent_argument(difficulty):
+    # an argparse type for agent names (the ValueError of an invalid name becomes a usage error):
+    parse_agent(difficulty)
+    return difficulty
+
+
+def is_agent(difficulty):
+    try:
+        parse_agent(difficulty)
+        return True
+    except ValueError:
+        return False
+
+
+def create_agent(difficulty, player):
+    """
+    Create an AI agent from its name (see parse_agent).
+    """
+    import ai_agents2
+    name, settings = parse_agent(difficulty)
+    return getattr(ai_agents2, AGENT_CLASSES[name])(player, **settings)
+
+
+class Game:
+    """
+    A Mancala game for AI agents only: the same board dict, player to move and methods as the
+    Mancala class of mancala_ai_ai.py, without the display, the prints or the latency recorder.
+    Moves are sown along the precomputed SOWING paths instead of pit by pit.
+
+    Like a new Mancala game, every new Game (and so every copy) draws a starting player, so a game
+    played with a given seed is the same as with statistics.run_game.
+    """
+    __slots__ = ('board', 'player_turn', 'ai_agent1', 'ai_agent2')
+
+    def __init__(self, ai_agent1=None, ai_agent2=None):
+        s = engine.STARTING_NUMBER_OF_SEEDS
+        self.board = {'1': 0, '2': 0, 'A': s, 'B': s, 'C': s, 'D': s, 'E': s,
+                      'F': s, 'G': s, 'H': s, 'I': s, 'J': s, 'K': s, 'L': s}
+        self.player_turn = random.choice(PLAYERS)
+        self.ai_agent1 = ai_agent1
+        self.ai_agent2 = ai_agent2
+
+    @classmethod
+    def from_position(cls, position, ai_agent1=None, ai_agent2=None):
+        """
+        Create a game from a position in text or bytes notation (see Mancala.to_position).
+        """
+        if isinstance(position, str):
+            board, player = engine.from_text(position)
+        else:
+            board, player = engine.from_bytes(position)
+        game = cls(ai_agent1, ai_agent2)
+        game.board = engine.board_to_dict(board)
+        game.player_turn = player
+        return game
+
+    def copy(self):
+        # (a copy is a new Game, so it draws a starting player from the global random generator, like
+        # Mancala.copy: the searches of the agents copy the game, and the random choices of the game
+        # after them depend on these draws, so a seed only gives the game of statistics.run_game if
+        # both classes draw the same number of times):
+        game = Game()
+        game.board = self.board.copy()
+        game.player_turn = self.player_turn
+        return game
+
+    def get_valid_moves(self, player):
+        board = self.board
+        return [pit for pit in PLAYER_PITS[player] if board[pit] > 0]
+
+    def make_move(self, pit):
+        # sow the seeds of the pit (whole laps first), and return the last pit sown into:
+        board = self.board
+        seeds = board[pit]
+        board[pit] = 0
+        path = SOWING[self.player_turn][pit]
+        laps, rest = divmod(seeds, LAP)
+        if laps:
+            for label in path:
+                board[label] += laps
+        for label in path[:rest]:
+            board[label] += 1
+        return path[(seeds - 1) % LAP]
+
+    def check_capture(self, last_pit):
+        board = self.board
+        if board[last_pit] == 1 and last_pit in PLAYER_PITS[self.player_turn]:
+            opposite_pit = OPPOSITE_PIT[last_pit]
+            if board[opposite_pit] > 0:
+                board[self.player_turn] += board[last_pit] + board[opposite_pit]
+                board[last_pit] = 0
+                board[opposite_pit] = 0
+
+    def change_turn(self):
+        self.player_turn = '1' if self.player_turn == '2' else '2'
+
+    def check_game_over(self):
+        # the same as Mancala.check_game_over: the remaining seeds go to their owners' Mancalas/Scores:
+        board = self.board
+        player_1_total = sum([board[pit] for pit in PLAYER_PITS['1']])
+        player_2_total = sum([board[pit] for pit in PLAYER_PITS['2']])
+        if player_1_total == 0 or player_2_total == 0:
+            board['1'] += player_1_total
+            board['2'] += player_2_total
+            for pit in ALL_PITS:
+                board[pit] = 0
+            return True
+        return False
+
+    def ask_for_ai_move(self):
+        agent = self.ai_agent1 if self.player_turn == '1' else self.ai_agent2
+        return agent.make_move(self)
+
+
+def run_game(ai_agent1, ai_agent2, record=None, seed=None, position=None, adjudicator=None):
+    """
+    Play one game between two agents, like statistics.run_game (with the same result for the same
+    seed) but without latency histograms or a game clock.
+
+    Parameters:
+    ai_agent1: The agent of Player 1.
+    ai_agent2: The agent of Player 2.
+    record (dict): Filled with the starting player ('first'), the moves, the final score (and the
+                   result, if the game was adjudicated), if given.
+    seed (int): The random seed of the game.
+    position (str): The starting position in text notation (default: the start position).
+    adjudicator (proof_search.Adjudicator): Stops the game once its result is proven, if given.
+
+    Returns:
+    int: 1 or 2 for the winner, 0 for a tie.
+    """
+    if seed is not None:
+        random.seed(seed)
+    if position is not None:
+        game = Game.from_position(position, ai_agent1, ai_agent2)
+    else:
+        game = Game(ai_agent1, ai_agent2)
+    # every game starts with empty search tables (see MinimaxAgent.new_game); there is no game clock,
+    # so the agents search to a fixed depth, and get their own clocks back at the end of the game:
+    agent_clocks = [(agent, agent.clock) for agent in (ai_agent1, ai_agent2) if hasattr(agent, 'clock')]
+    for agent in (ai_agent1, ai_agent2):
+        if hasattr(agent, 'new_game'):
+            agent.new_game()
+    for agent, _ in agent_clocks:
+        agent.clock = None
+
+    if record is not None:
+        record['first'] = game.player_turn
+        if position is not None:
+            record['start'] = position
+
+    moves = []
+    adjudicated = None
+    while not game.check_game_over():
+        if adjudicator is not None:
+            adjudicated = adjudicator.adjudicate(engine.board_from_dict(game.board), game.player_turn)
+            if adjudicated is not None:
+                break
+        move = game.ask_for_ai_move()
+        moves.append(move)
+        last_pit = game.make_move(move)
+        game.check_capture(last_pit)
+
+        if game.check_game_over():
+            break
+
+        if last_pit != game.player_turn:
+            game.change_turn()
+
+    for agent, agent_clock in agent_clocks:
+        agent.clock = agent_clock
+
+    if record is not None:
+        record['moves'] = ''.join(moves)
+        record['score'] = [game.board['1'], game.board['2']]
+        if adjudicated is not None:
+            record['adjudicated'] = adjudicated
+
+    if adjudicated is not None:
+        return adjudicated
+    if game.board['1'] > game.board['2']:
+        return 1
+    if game.board['1'] < game.board['2']:
+        return 2
+    return 0
+
+
+# the code of a worker started by --startup: import this module, create the agents and play the
+# first move of a game (the time from the start of the process to the printed move is measured):
+STARTUP_CODE = ("from headless import create_agent, Game\n"
+                "game = Game(create_agent({0!r}, '1'), create_agent({1!r}, '2'))\n"
+                "print(game.ask_for_ai_move(), flush=True)\n")
+
+
+def measure_startup(agents, runs=20):
+    """
+    Measure the time from starting a new Python process to its first move (see STARTUP_CODE), and
+    the start of a bare interpreter for comparison.
+
+    Returns:
+    dict: {'first_move', 'interpreter'}: the median times in milliseconds.
+    """
+    import os
+    import sys
+    import time
+    import subprocess
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = {'first_move': [], 'interpreter': []}
+    for _ in range(runs):
+        for name, code in (('first_move', STARTUP_CODE.format(*agents)), ('interpreter', 'pass')):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=directory, check=True, stdout=subprocess.DEVNULL)
+            times[name].append((time.perf_counter() - started) * 1000)
+    return {name: sorted(values)[len(values) // 2] for name, values in times.items()}
+
+
+if __name__ == '__main__':
+    import json
+    import argparse
+    parser = argparse.ArgumentParser(description='Play AI-vs-AI games without the interactive modules.')
+    parser.add_argument('agents', nargs=2, type=agent_argument, metavar='AGENT',
+                        help="the agents of Player 1 and Player 2: random, medium, minimax or mcts "
+                             "(minimax options: +lmr, +probcut, +d<depth>)")
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first game')
+    parser.add_argument('--startup', type=int, default=0, metavar='RUNS',
+                        help='measure the time from process start to the first move, over this many runs')
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = measure_startup(args.agents, args.startup)
+        print(f"spawn to first move: {startup['first_move']:.1f} ms "
+              f"(bare interpreter: {startup['interpreter']:.1f} ms, median of {args.startup} runs)")
+    else:
+        players = (create_agent(args.agents[0], '1'), create_agent(args.agents[1], '2'))
+        for seed in range(args.seed, args.seed + args.games):
+            record = {}
+            result = run_game(*players, record, seed)
+            print(json.dumps({'seed': seed, 'result': result, 'score': record['score'], 'moves': len(record['moves'])}))
@@ -0,0 +1,204 @@
+# import required libraries:
+# json: histograms are dumped to (and loaded from) JSON files.
+# time: moves are timed with the high-resolution performance counter.
+# argparse: command line interface to print and compare dumps.
+import json
+import time
+import argparse
+import mancala_engine as engine
+
+# the histograms have 2**SUB_BUCKET_BITS buckets for each power of two of the latency (in
+# microseconds), so every recorded value is known to within 1 / 2**(SUB_BUCKET_BITS - 1), about 3%,
+# whatever its magnitude (like an HDR histogram):
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+
+# the percentiles shown in reports:
+PERCENTILES = (0.50, 0.95, 0.99)
+
+# the labels of the pits of both players (without the Mancalas/Scores) in a labelled board dict:
+PLAYER_PIT_LABELS = 'ABCDEFGHIJKL'
+
+
+def bucket_index(value):
+    # values below SUB_BUCKETS get a bucket each; above, the bucket width doubles with every power of two:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * HALF_BUCKETS + (value >> shift)
+
+
+def bucket_limit(index):
+    # the highest value that falls in a bucket:
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // HALF_BUCKETS - 1
+    return ((index - shift * HALF_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies in microseconds with a fixed relative precision (see SUB_BUCKET_BITS).
+    Only the buckets in use are stored, so it stays small however many values are recorded.
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        value = int(seconds * 1e6)
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Return the latency (in seconds) below which the given fraction of the moves fall."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(bucket_limit(index), self.max) / 1e6
+        return self.max / 1e6
+
+    def count_above(self, seconds):
+        """Return the number of moves that took longer than the given time (within the histogram precision)."""
+        threshold = bucket_index(int(seconds * 1e6))
+        return sum(count for index, count in self.buckets.items() if index > threshold)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {'buckets': {str(index): count for index, count in sorted(self.buckets.items())},
+                'count': self.count, 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data['buckets'].items()}
+        histogram.count, histogram.total, histogram.max = data['count'], data['total'], data['max']
+        return histogram
+
+
+def game_phase(board):
+    """Return the phase ('opening', 'middlegame' or 'endgame') of a labelled board dict, as in engine.PHASES."""
+    return engine.seeds_phase(sum(board[label] for label in PLAYER_PIT_LABELS))
+
+
+def agent_settings(agent):
+    # the setting that drives an agent's thinking time, for the histogram key (with the selective
+    # search options of minimax agents, to compare them):
+    selective = ('+lmr' if getattr(agent, 'reductions', False) else '') + \
+                ('+probcut' if getattr(agent, 'probcut', None) else '')
+    clock = getattr(agent, 'clock', None)
+    if clock is not None:
+        return f'clock={clock.base:g}+{clock.increment:g}{selective}'
+    if hasattr(agent, 'depth'):
+        return f'depth={agent.depth}{selective}'
+    if hasattr(agent, 'simulations'):
+        return f'simulations={agent.simulations}'
+    return '-'
+
+
+class LatencyRecorder:
+    """
+    Times agent moves into one histogram per (agent, setting, game phase), and counts the moves
+    that exceed an optional SLA threshold (in seconds).
+    """
+    def __init__(self, sla=None):
+        self.sla = sla
+        self.histograms = {}
+
+    def time_move(self, agent, game):
+        """
+        Ask an agent for its move and record how long it took.
+
+        Returns:
+        str: The move chosen by the agent.
+        """
+        started = time.perf_counter()
+        move = agent.make_move(game)
+        self.record(agent, game, time.perf_counter() - started)
+        return move
+
+    def record(self, agent, game, seconds):
+        key = (type(agent).__name__, agent_settings(agent), game_phase(game.board))
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        self.histograms[key].record(seconds)
+
+    def report(self):
+        """Print the percentiles of every histogram, per phase and over all phases."""
+        totals = {}
+        for (name, settings, phase), histogram in self.histograms.items():
+            totals.setdefault((name, settings, 'all'), LatencyHistogram()).merge(histogram)
+        rows = sorted(self.histograms.items()) + sorted(totals.items())
+
+        header = f"{'agent':<14}{'setting':<24}{'phase':<12}{'moves':>7}"
+        header += ''.join(f"{f'p{round(q * 100)}':>10}" for q in PERCENTILES) + f"{'max':>10}"
+        if self.sla is not None:
+            header += f"  over {self.sla * 1000:g} ms"
+        print(header)
+        for (name, settings, phase), histogram in rows:
+            line = f'{name:<14}{settings:<24}{phase:<12}{histogram.count:>7}'
+            line += ''.join(f'{histogram.percentile(q) * 1000:>8.2f}ms' for q in PERCENTILES)
+            line += f'{histogram.max / 1000:>8.2f}ms'
+            if self.sla is not None:
+                violations = histogram.count_above(self.sla)
+                line += f'  {violations} ({violations / histogram.count * 100:.2f}%)'
+            print(line)
+
+    def dump(self, path):
+        """Save the histograms to a JSON file (e.g. to compare two builds with compare())."""
+        with open(path, 'w') as file:
+            json.dump({'sla': self.sla, 'histograms': [
+                {'agent': name, 'setting': settings, 'phase': phase, 'histogram': histogram.to_dict()}
+                for (name, settings, phase), histogram in sorted(self.histograms.items())]}, file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        recorder = cls(data['sla'])
+        for entry in data['histograms']:
+            key = (entry['agent'], entry['setting'], entry['phase'])
+            recorder.histograms[key] = LatencyHistogram.from_dict(entry['histogram'])
+        return recorder
+
+
+def compare(before, after):
+    """Print the change of every percentile between two recorders (e.g. loaded from two dumps)."""
+    for key in sorted(set(before.histograms) | set(after.histograms)):
+        old, new = before.histograms.get(key), after.histograms.get(key)
+        if old is None or new is None:
+            print(f"{' '.join(key)}: only in the {'second' if old is None else 'first'} dump")
+            continue
+        changes = []
+        for q in PERCENTILES + (1.0,):
+            a, b = old.percentile(q) * 1000, new.percentile(q) * 1000
+            label = 'max' if q == 1.0 else f'p{round(q * 100)}'
+            changes.append(f'{label} {a:.2f} -> {b:.2f} ms ({(b - a) / a * 100 if a else 0.0:+.1f}%)')
+        print(f"{' '.join(key)}: " + ', '.join(changes))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print or compare move latency histograms dumped by statistics.py.')
+    parser.add_argument('dumps', nargs='+', help='one dump to print, or two dumps to compare')
+    args = parser.parse_args()
+
+    if len(args.dumps) == 1:
+        LatencyRecorder.load(args.dumps[0]).report()
+    else:
+        compare(LatencyRecorder.load(args.dumps[0]), LatencyRecorder.load(args.dumps[1]))
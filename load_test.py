@@ -0,0 +1,100 @@
+# import required libraries:
+# time: measure the move latency seen by the clients.
+# random: the simulated clients play random moves.
+# asyncio: every simulated client is a coroutine.
+# argparse: command line interface.
+import time
+import random
+import asyncio
+import argparse
+import mancala_engine as engine
+from mancala_server import MancalaServer
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the (sorted) values fall."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def simulated_client(host, port, agent, games, latencies, think_time):
+    """
+    Connect to the server and play games with random moves. The latency of every AI move is
+    measured from the moment the client's previous message was sent (or the previous AI move
+    arrived) until the AI move arrives.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(line):
+        writer.write((line + '\n').encode())
+        await writer.drain()
+        return time.perf_counter()
+
+    await reader.readline()
+    for _ in range(games):
+        last_event = await send(f'NEW {agent}')
+        while True:
+            line = (await reader.readline()).decode().split()
+            if not line:
+                raise ConnectionError('server closed the connection')
+            if line[0] == 'AI':
+                now = time.perf_counter()
+                latencies.append(now - last_event)
+                last_event = now
+            elif line[0] == 'OVER':
+                break
+            elif line[0] == 'ERROR':
+                raise RuntimeError(' '.join(line))
+            elif line[0] == 'BOARD' and line[-1] == '1':
+                # our turn: think for a moment, then play a random valid move:
+                board = [int(seeds) for seeds in line[1:15]]
+                await asyncio.sleep(think_time)
+                move = random.choice(engine.get_valid_moves(board, '1'))
+                last_event = await send(f'MOVE {engine.PIT_LABELS[move]}')
+
+    await send('QUIT')
+    writer.close()
+
+
+async def run_load_test(host, port, clients, games, agent, think_time, serve, workers):
+    # optionally start the server in this process (its AI searches still run in worker processes):
+    server = None
+    if serve:
+        server = MancalaServer(host, port, workers, max_sessions=clients + 1)
+        await server.start()
+
+    latencies = []
+    started = time.perf_counter()
+    results = await asyncio.gather(*(simulated_client(host, port, agent, games, latencies, think_time)
+                                     for _ in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    if server is not None:
+        await server.shutdown()
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    latencies.sort()
+    print(f'{clients} clients x {games} games against {agent} in {elapsed:.2f} s ({len(errors)} client errors)')
+    print(f'AI moves: {len(latencies)}  throughput: {len(latencies) / elapsed:.1f} moves/s')
+    print(f'latency p50: {percentile(latencies, 0.50) * 1000:.1f} ms  '
+          f'p99: {percentile(latencies, 0.99) * 1000:.1f} ms  '
+          f'max: {(latencies[-1] if latencies else 0) * 1000:.1f} ms')
+    for error in errors[:5]:
+        print(f'  error: {error!r}')
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the Mancala server with simulated clients.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--games', type=int, default=1, help='games per client')
+    parser.add_argument('--agent', default='minimax', choices=['random', 'medium', 'minimax', 'mcts'])
+    parser.add_argument('--think-time', type=float, default=0.0, help='seconds each client waits before moving')
+    parser.add_argument('--serve', action='store_true', help='start the server in this process')
+    parser.add_argument('--workers', type=int, help='AI worker processes when using --serve')
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.host, args.port, args.clients, args.games, args.agent, args.think_time,
+                              args.serve, args.workers))
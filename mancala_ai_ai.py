@@ -1,8 +1,12 @@
 # import required libraries:
 # random: used to randomly choose the starting player.
+# mancala_engine: the compact position notation (to_position/from_position).
+# latency: per-move latency histograms of the AI agents.
 # ai_agents: custom AI agents with different levels of difficulty to play against.
 import random
-from ai_agents2 import RandomAgent, MediumAgent, MinimaxAgent
+import mancala_engine as engine
+from latency import LatencyRecorder
+from ai_agents2 import RandomAgent, MediumAgent, MinimaxAgent, MCTSAgent
 
 
 class Mancala:
@@ -52,6 +56,9 @@ class Mancala:
         # Set the verbosity for game state information
         self.verbose = verbose
 
+        # Optional LatencyRecorder that times every AI move (see latency.py)
+        self.latency = None
+
     def get_new_board(self):
         """
         Create a new game board with the starting number of seeds (4) in each pit.
@@ -265,22 +272,60 @@ class Mancala:
         new_game.player_turn = self.player_turn
         return new_game
 
+    def to_position(self, binary=False):
+        """
+        Encode the board and the player to move in the compact position notation of
+        mancala_engine: a short text (for logs and the command line) or a fixed-size bytes form
+        (to send positions between processes instead of pickling the whole game).
+
+        Parameters:
+        binary (bool): Whether to return the bytes form instead of the text.
+
+        Returns:
+        str or bytes: The encoded position.
+        """
+        board = engine.board_from_dict(self.board)
+        if binary:
+            return engine.to_bytes(board, self.player_turn)
+        return engine.to_text(board, self.player_turn)
+
+    @classmethod
+    def from_position(cls, position, ai_agent1=None, ai_agent2=None, verbose=False):
+        """
+        Create a game from a position encoded by to_position (text or bytes).
+
+        Returns:
+        Mancala: A new game with that board and player to move.
+        """
+        if isinstance(position, str):
+            board, player = engine.from_text(position)
+        else:
+            board, player = engine.from_bytes(position)
+        game = cls(ai_agent1, ai_agent2, verbose)
+        game.board = engine.board_to_dict(board)
+        game.player_turn = player
+        return game
+
     def ask_for_ai_move(self):
         """
         Asks the current player's AI agent to make a move based on the current
         game state. The AI agent's `make_move` method is called with the current
         game instance as an argument.The chosen move is then printed if the verbose attribute
         is set to True, and the move is returned as a string containing the pit label.
+        If the game has a latency recorder, the time taken by the agent is recorded.
 
         Returns:
         str: The chosen pit label for the AI agent's move.
         """
+        agent = self.ai_agent1 if self.player_turn == '1' else self.ai_agent2
+        if self.latency is not None:
+            move = self.latency.time_move(agent, self)
+        else:
+            move = agent.make_move(self)
         if self.player_turn == '1':
-            move = self.ai_agent1.make_move(self)
             if self.verbose:
                 print(f'AI Player 1 chooses move: {move}')
         elif self.player_turn == '2':
-            move = self.ai_agent2.make_move(self)
             if self.verbose:
                 print(f'AI Player 2 chooses move: {move}')
         return move
@@ -289,18 +334,18 @@ class Mancala:
 if __name__ == '__main__':
     print("Welcome to the AI vs AI Mancala game!")
     # prompt the user to choose difficulty levels for both players:
-    print("Choose the AI Agent 1: random, medium, minimax")
+    print("Choose the AI Agent 1: random, medium, minimax, mcts")
     difficulty1 = input().lower()
 
-    while difficulty1 not in ['random', 'medium', 'minimax']:
-        print("Invalid input. Please enter 'random', 'medium', 'minimax'")
+    while difficulty1 not in ['random', 'medium', 'minimax', 'mcts']:
+        print("Invalid input. Please enter 'random', 'medium', 'minimax', 'mcts'")
         difficulty1 = input().lower()
 
-    print("Choose the AI Agent 2: random, medium, minimax")
+    print("Choose the AI Agent 2: random, medium, minimax, mcts")
     difficulty2 = input().lower()
 
-    while difficulty2 not in ['random', 'medium', 'minimax']:
-        print("Invalid input. Please enter 'random', 'medium', 'minimax'")
+    while difficulty2 not in ['random', 'medium', 'minimax', 'mcts']:
+        print("Invalid input. Please enter 'random', 'medium', 'minimax', 'mcts'")
         difficulty2 = input().lower()
 
     # assign AI agents:
@@ -310,6 +355,8 @@ if __name__ == '__main__':
         ai_agent1 = MediumAgent("1")
     elif difficulty1 == 'minimax':
         ai_agent1 = MinimaxAgent("1")
+    elif difficulty1 == 'mcts':
+        ai_agent1 = MCTSAgent("1")
 
     if difficulty2 == 'random':
         ai_agent2 = RandomAgent("2")
@@ -317,9 +364,12 @@ if __name__ == '__main__':
         ai_agent2 = MediumAgent("2")
     elif difficulty2 == 'minimax':
         ai_agent2 = MinimaxAgent("2")
+    elif difficulty2 == 'mcts':
+        ai_agent2 = MCTSAgent("2")
 
     # initialize the Mancala game with the selected AI agents:
     game = Mancala(ai_agent1, ai_agent2)
+    game.latency = LatencyRecorder()
 
     # run the main game loop:
     while not game.check_game_over():
@@ -342,3 +392,7 @@ if __name__ == '__main__':
         print('Player 2 wins!')
     else:
         print('It\'s a tie!')
+
+    # show how long the agents took to move:
+    print()
+    game.latency.report()
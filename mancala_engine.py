@@ -0,0 +1,699 @@
+# a compact Mancala engine that works on plain lists instead of the labelled board dict.
+# the board is a list of 14 integers in sowing order, which is exactly the order of PIT_LABELS:
+#   index 0-5  -> pits A-F (Player 1)
+#   index 6    -> Mancala/Score of Player 1
+#   index 7-12 -> pits L-G (Player 2)
+#   index 13   -> Mancala/Score of Player 2
+# the rules are the same as the ones implemented by the Mancala classes, this module only
+# avoids the dict lookups and copies so that replays and searches can run many more positions.
+
+# a string containing all the pit labels, in sowing (counterclockwise) order:
+PIT_LABELS = 'ABCDEF1LKJIHG2'
+
+# a dictionary that maps a pit label to its index in the compact board:
+PIT_INDEX = {label: index for index, label in enumerate(PIT_LABELS)}
+
+# the number of pits (including both Mancalas/scores) in the compact board:
+NUM_PITS = 14
+
+# a constant representing the initial number of seeds in each pit:
+STARTING_NUMBER_OF_SEEDS = 4
+
+# the index of each player's Mancala/Score:
+STORE = {'1': 6, '2': 13}
+
+# the indexes of each player's pits:
+PITS = {'1': (0, 1, 2, 3, 4, 5), '2': (7, 8, 9, 10, 11, 12)}
+
+# the other player:
+OPPONENT = {'1': '2', '2': '1'}
+
+# a tuple that maps a pit index to the index of its opposite pit (None for the Mancalas/scores):
+OPPOSITE = tuple(None if index in (6, 13) else 12 - index for index in range(NUM_PITS))
+
+# a tuple that maps a pit index to the player that owns it (None for the Mancalas/scores):
+OWNER = tuple('1' if index < 6 else None if index in (6, 13) else '2' for index in range(NUM_PITS))
+
+# game phases, defined by the number of seeds still in the pits (not in the Mancalas/scores):
+PHASES = {'opening': (37, 48), 'middlegame': (13, 36), 'endgame': (0, 12)}
+
+
+def seeds_phase(seeds):
+    """Return the phase ('opening', 'middlegame' or 'endgame') of a position with this many seeds in the pits."""
+    for phase, (low, high) in PHASES.items():
+        if low <= seeds <= high:
+            return phase
+    return 'opening'
+
+
+def new_board():
+    """
+    Create a new compact board with the starting number of seeds in each pit.
+
+    Returns:
+    list: The 14 seed counts in sowing order.
+    """
+    s = STARTING_NUMBER_OF_SEEDS
+    return [s, s, s, s, s, s, 0, s, s, s, s, s, s, 0]
+
+
+def board_from_dict(board):
+    """
+    Convert a labelled board dict (as used by the Mancala classes) into a compact board.
+
+    Parameters:
+    board (dict): A dictionary mapping pit labels to seed counts.
+
+    Returns:
+    list: The 14 seed counts in sowing order.
+    """
+    return [board[label] for label in PIT_LABELS]
+
+
+def board_to_dict(board):
+    """
+    Convert a compact board back into a labelled board dict.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+
+    Returns:
+    dict: A dictionary mapping pit labels to seed counts.
+    """
+    return {label: board[index] for index, label in enumerate(PIT_LABELS)}
+
+
+def position_key(board, player):
+    """
+    Pack a position into a single integer. Each pit holds at most 48 seeds, so 6 bits per pit
+    are enough. The key is stable across processes (unlike hash() of strings), which makes it
+    usable for sharding and deduplication.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player to move ('1' or '2').
+
+    Returns:
+    int: The packed position key.
+    """
+    key = 1 if player == '2' else 0
+    for seeds in board:
+        key = (key << 6) | seeds
+    return key
+
+
+# the size of a position in its bytes form (see to_bytes): 14 seed counts and the side to move:
+POSITION_SIZE = NUM_PITS + 1
+
+
+def to_text(board, player):
+    """
+    Write a position in the compact text notation, for logs and command lines: Player 1's pits
+    (A-F), Player 1's Mancala/Score, Player 2's pits in sowing order (L-G), Player 2's
+    Mancala/Score, then the player to move. The start position is '4,4,4,4,4,4/0/4,4,4,4,4,4/0 1'.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player to move ('1' or '2').
+
+    Returns:
+    str: The position in text notation.
+    """
+    return (f"{','.join(map(str, board[0:6]))}/{board[6]}/"
+            f"{','.join(map(str, board[7:13]))}/{board[13]} {player}")
+
+
+def from_text(text):
+    """
+    Read a position written by to_text.
+
+    Returns:
+    tuple: (board, player to move).
+
+    Raises:
+    ValueError: If the text is not a valid position, or holds more seeds than a game (MAX_SEEDS:
+                the move tables, the position keys and to_bytes go no further).
+    """
+    try:
+        pits, player = text.split()
+        pits_1, store_1, pits_2, store_2 = pits.split('/')
+        board = ([int(seeds) for seeds in pits_1.split(',')] + [int(store_1)] +
+                 [int(seeds) for seeds in pits_2.split(',')] + [int(store_2)])
+    except ValueError:
+        raise ValueError(f'invalid position: {text!r}') from None
+    if len(board) != NUM_PITS or min(board) < 0 or sum(board) > MAX_SEEDS or player not in OPPONENT:
+        raise ValueError(f'invalid position: {text!r}')
+    return board, player
+
+
+def to_bytes(board, player):
+    """
+    Pack a position into POSITION_SIZE bytes: the 14 seed counts, then the player to move (1 or 2).
+    This is the form used to send positions between processes.
+
+    Returns:
+    bytes: The packed position.
+    """
+    return bytes(board) + (b'\x01' if player == '1' else b'\x02')
+
+
+def from_bytes(data):
+    """
+    Unpack a position packed by to_bytes.
+
+    Returns:
+    tuple: (board, player to move).
+
+    Raises:
+    ValueError: If the data is not a valid position (see from_text).
+    """
+    if len(data) != POSITION_SIZE or data[NUM_PITS] not in (1, 2) or sum(data[:NUM_PITS]) > MAX_SEEDS:
+        raise ValueError(f'invalid position: {bytes(data)!r}')
+    return list(data[:NUM_PITS]), '1' if data[NUM_PITS] == 1 else '2'
+
+
+# the most seeds a pit can hold (every seed of the game):
+MAX_SEEDS = 12 * STARTING_NUMBER_OF_SEEDS
+
+
+def _build_move_tables():
+    # sow every possible number of seeds from every pit on an empty board, to find out where the
+    # last seed lands, how many full laps are made and how many seeds the last pit and its opposite
+    # pit receive. None of this depends on the rest of the board:
+    landing, laps, added, opposite_added = {}, {}, {}, {}
+    for player in ('1', '2'):
+        skip = STORE[OPPONENT[player]]
+        for pit in PITS[player]:
+            for seeds in range(MAX_SEEDS + 1):
+                board = [0] * NUM_PITS
+                board[pit] = seeds
+                current, remaining = pit, seeds
+                board[pit] = 0
+                while remaining > 0:
+                    current = current + 1 if current < NUM_PITS - 1 else 0
+                    if current == skip:
+                        continue
+                    board[current] += 1
+                    remaining -= 1
+                key = player, pit, seeds
+                landing[key] = current
+                laps[key] = seeds // (NUM_PITS - 1)
+                added[key] = board[current]
+                opposite_added[key] = board[OPPOSITE[current]] if OPPOSITE[current] is not None else 0
+    return landing, laps, added, opposite_added
+
+
+# lookup tables indexed by (player, pit index, seeds in the pit), computed once at import:
+#   LANDING: the index of the pit where the last seed lands.
+#   LAPS: the number of full laps around the board.
+#   SEEDS_ADDED: the number of seeds the last pit receives during the move.
+#   OPPOSITE_SEEDS_ADDED: the number of seeds the pit opposite the last pit receives.
+LANDING, LAPS, SEEDS_ADDED, OPPOSITE_SEEDS_ADDED = _build_move_tables()
+
+
+def lands_in_store(player, pit, seeds):
+    """
+    Check in O(1) whether a move gives an extra turn (its last seed lands in the player's store).
+
+    Parameters:
+    player (str): The player making the move.
+    pit (int): The index of the pit where the move starts.
+    seeds (int): The number of seeds in that pit.
+
+    Returns:
+    bool: True if the move ends in the player's Mancala/Score.
+    """
+    return LANDING[player, pit, seeds] == STORE[player]
+
+
+def move_outcome(board, pit, player):
+    """
+    Find out in O(1), without copying the board or sowing, where a move ends and what it
+    captures. The result is the same as sow() followed by capture() on a copy of the board.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    pit (int): The index of the pit where the move starts.
+    player (str): The player making the move.
+
+    Returns:
+    tuple: (last pit index, whether the move gives an extra turn, seeds captured).
+    """
+    key = player, pit, board[pit]
+    last = LANDING[key]
+    if last == STORE[player]:
+        return last, True, 0
+    if OWNER[last] == player:
+        # the last pit captures if it holds exactly one seed after the move (the starting pit is
+        # emptied before sowing):
+        if (0 if last == pit else board[last]) + SEEDS_ADDED[key] == 1:
+            opposite_seeds = board[OPPOSITE[last]] + OPPOSITE_SEEDS_ADDED[key]
+            if opposite_seeds > 0:
+                return last, False, opposite_seeds + 1
+    return last, False, 0
+
+
+def tactical_moves(board, player):
+    """
+    Get the moves that give an extra turn or capture seeds, found with move_outcome().
+
+    Returns:
+    list: The pit indices of those moves.
+    """
+    return [pit for pit in PITS[player] if board[pit] > 0 and any(move_outcome(board, pit, player)[1:])]
+
+
+def mirror(board):
+    """
+    Swap the two sides of the board. Player 2's pits and Mancala/Score start at index 7, so
+    rotating the board by 7 pits gives the same position seen with the players swapped (the
+    sowing order and the opposite pits are preserved).
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+
+    Returns:
+    list: The mirrored board.
+    """
+    return board[7:] + board[:7]
+
+
+def mirror_pit(pit):
+    """Get the index of a pit on the mirrored board (mirroring twice gives the pit back)."""
+    return (pit + 7) % NUM_PITS
+
+
+# a dictionary that maps a pit label to the label of the same pit on the mirrored board:
+MIRROR_LABEL = {label: PIT_LABELS[mirror_pit(index)] for index, label in enumerate(PIT_LABELS)}
+
+
+def canonical(board, player):
+    """
+    Get the canonical form of a position: the board seen from the side to move, as if it were
+    Player 1. A position with Player 2 to move and its mirror image with Player 1 to move have the
+    same canonical form, so caches that store values for the side to move only need one entry
+    for both. Moves must be translated with mirror_pit when the player is '2'.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player to move.
+
+    Returns:
+    tuple: The canonical board.
+    """
+    return tuple(board) if player == '1' else tuple(board[7:] + board[:7])
+
+
+def canonical_key(board, player):
+    """
+    Pack the canonical form of a position into an integer (see canonical and position_key).
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player to move.
+
+    Returns:
+    int: The canonical position key.
+    """
+    key = 0
+    for seeds in (board if player == '1' else board[7:] + board[:7]):
+        key = (key << 6) | seeds
+    return key
+
+
+def get_valid_moves(board, player):
+    """
+    Get the valid moves for the given player: the indexes of their non-empty pits.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): '1' for Player 1, '2' for Player 2.
+
+    Returns:
+    list: A list of pit indexes.
+    """
+    return [pit for pit in PITS[player] if board[pit] > 0]
+
+
+def sow(board, pit, player):
+    """
+    Move seeds from the selected pit and distribute them counterclockwise, skipping the
+    opponent's Mancala/Score. The board is changed in place.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    pit (int): The index of the pit where the move starts.
+    player (str): The player making the move.
+
+    Returns:
+    int: The index of the last pit where a seed was placed.
+    """
+    seeds = board[pit]
+    board[pit] = 0
+    skip = STORE[OPPONENT[player]]
+
+    # every full lap puts one seed in each of the 13 pits that are not skipped:
+    laps, seeds = divmod(seeds, NUM_PITS - 1)
+    if laps:
+        for index in range(NUM_PITS):
+            if index != skip:
+                board[index] += laps
+
+    # distribute the remaining seeds one by one (after a full lap the last seed is back in the
+    # starting pit, so the remaining seeds continue from there):
+    current = pit
+    while seeds > 0:
+        current = current + 1 if current < NUM_PITS - 1 else 0
+        if current == skip:
+            continue
+        board[current] += 1
+        seeds -= 1
+
+    return current
+
+
+def capture(board, last, player):
+    """
+    If the last seed landed in an empty pit on the player's side and the opposite pit is not
+    empty, move both pits to the player's Mancala/Score. The board is changed in place.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    last (int): The index of the last pit where a seed was placed.
+    player (str): The player that made the move.
+
+    Returns:
+    int: The number of seeds captured (0 if there was no capture).
+    """
+    if OWNER[last] != player or board[last] != 1:
+        return 0
+    opposite = OPPOSITE[last]
+    if board[opposite] == 0:
+        return 0
+    captured = board[opposite] + 1
+    board[last] = 0
+    board[opposite] = 0
+    board[STORE[player]] += captured
+    return captured
+
+
+def finish(board):
+    """
+    Check if the game is over, i.e., if either player has no seeds left in their pits. If it is,
+    move the remaining seeds to each player's Mancala/Score. The board is changed in place.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+
+    Returns:
+    bool: True if the game is over, False otherwise.
+    """
+    player_1_total = board[0] + board[1] + board[2] + board[3] + board[4] + board[5]
+    player_2_total = board[7] + board[8] + board[9] + board[10] + board[11] + board[12]
+    if player_1_total == 0 or player_2_total == 0:
+        board[6] += player_1_total
+        board[13] += player_2_total
+        for index in range(NUM_PITS):
+            if index != 6 and index != 13:
+                board[index] = 0
+        return True
+    return False
+
+
+def play(board, player, pit):
+    """
+    Play a full move: sow, capture and check for the end of the game. The board is changed in place.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player making the move.
+    pit (int): The index of the pit where the move starts.
+
+    Returns:
+    tuple: (last pit index, seeds captured, whether the game is over, the next player to move).
+    """
+    last = sow(board, pit, player)
+    captured = capture(board, last, player)
+    over = finish(board)
+    next_player = player if last == STORE[player] else OPPONENT[player]
+    return last, captured, over, next_player
+
+
+def winner(board):
+    """
+    Get the result of a finished game in the same format as statistics.run_game.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+
+    Returns:
+    int: 1 if Player 1 wins, 2 if Player 2 wins, 0 for a tie.
+    """
+    if board[6] > board[13]:
+        return 1
+    elif board[6] < board[13]:
+        return 2
+    return 0
+
+
+def result_for(board, player):
+    """
+    Get the result of a finished game for the given player: 1 for a win, -1 for a loss, 0 for a tie.
+    """
+    difference = board[STORE[player]] - board[STORE[OPPONENT[player]]]
+    return 1 if difference > 0 else -1 if difference < 0 else 0
+
+
+# the names of the evaluation features returned by features(), in order:
+FEATURE_NAMES = ('store_difference', 'seeds_on_side', 'mobility', 'capture_threats',
+                 'extra_turn_moves', 'empty_pits')
+
+
+def features(board, player):
+    """
+    Compute the evaluation features of a position from the point of view of the given player.
+    Every feature is the player's value minus the opponent's value:
+        store_difference: seeds in the Mancalas/scores.
+        seeds_on_side: seeds in the pits.
+        mobility: number of valid moves.
+        capture_threats: the most seeds that can be captured with a single move.
+        extra_turn_moves: number of moves that end in the player's own Mancala/Score.
+        empty_pits: number of empty pits.
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player whose point of view is used.
+
+    Returns:
+    list: The feature values, in the order of FEATURE_NAMES.
+    """
+    values = []
+    for side in (player, OPPONENT[player]):
+        store = STORE[side]
+        seeds = mobility = empty = extra_turns = best_capture = 0
+        for pit in PITS[side]:
+            pit_seeds = board[pit]
+            if pit_seeds == 0:
+                empty += 1
+                continue
+            seeds += pit_seeds
+            mobility += 1
+            # look up where the move ends and what it captures:
+            _, extra_turn, captured = move_outcome(board, pit, side)
+            if extra_turn:
+                extra_turns += 1
+            elif captured > best_capture:
+                best_capture = captured
+        values.append((board[store], seeds, mobility, best_capture, extra_turns, empty))
+
+    own, other = values
+    return [own[0] - other[0], own[1] - other[1], own[2] - other[2],
+            own[3] - other[3], own[4] - other[4], own[5] - other[5]]
+
+
+# whether the move from a pit with a given number of seeds ends in the player's own Mancala/Score,
+# by pit index and seed count (so a pit's share of the extra_turn_moves feature only depends on its seeds):
+EXTRA_TURN = tuple(tuple(seeds > 0 and OWNER[pit] is not None and LANDING[OWNER[pit], pit, seeds] == STORE[OWNER[pit]]
+                         for seeds in range(MAX_SEEDS + 1)) for pit in range(NUM_PITS))
+
+
+def _build_capture_table():
+    # for every pit and seed count, the moves that can capture (see move_outcome): the last seed
+    # lands on the player's side and is the only seed of its pit when that pit was empty (or is
+    # the starting pit). The table holds (last pit, opposite pit, seeds added to the opposite pit):
+    table = []
+    for pit in range(NUM_PITS):
+        player = OWNER[pit]
+        row = []
+        for seeds in range(MAX_SEEDS + 1):
+            key = player, pit, seeds
+            if player is None or seeds == 0 or OWNER[LANDING[key]] != player or SEEDS_ADDED[key] != 1:
+                row.append(None)
+            else:
+                row.append((LANDING[key], OPPOSITE[LANDING[key]], OPPOSITE_SEEDS_ADDED[key]))
+        table.append(tuple(row))
+    return tuple(table)
+
+
+# the possible captures by pit index and seed count (None when the move cannot capture):
+CAPTURE = _build_capture_table()
+
+# the side (0 for Player 1, 1 for Player 2) of each pit, None for the Mancalas/scores:
+PIT_SIDE = tuple(None if owner is None else int(owner) - 1 for owner in OWNER)
+
+# the offsets of the per-side totals kept by Position (the total of a side is at offset + side):
+SEEDS, MOBILITY, EMPTY, EXTRA_TURNS = 0, 2, 4, 6
+
+
+class Position:
+    """
+    A compact board that keeps the evaluation features (see features()) up to date while moves
+    are made and undone, so that a search does not compute them from scratch at every leaf.
+    Every pit changed by a move updates the per-side totals (seeds, valid moves, empty pits and
+    extra-turn moves) by the difference it makes. The capture threats are the exception: what a
+    move captures depends on the pit where it ends and the opposite one, so a sowing changes most
+    of them, and they are looked up in CAPTURE when the features are asked for. The features of a
+    leaf therefore still cost one lookup per pit (12 in all, about a sixth of the search time), on
+    top of the dot product. play() and finish() save a copy of the board and the totals, and undo()
+    restores the position before the last of them (copying the 14 pits with a slice is cheaper in
+    Python than logging the changed pits one by one).
+    """
+    __slots__ = ('board', 'totals', 'frames')
+
+    def __init__(self, board):
+        self.board = list(board)
+        self.totals = [0] * 8
+        for player in '12':
+            for pit in PITS[player]:
+                seeds, side = self.board[pit], PIT_SIDE[pit]
+                self.totals[SEEDS + side] += seeds
+                self.totals[(MOBILITY if seeds else EMPTY) + side] += 1
+                self.totals[EXTRA_TURNS + side] += EXTRA_TURN[pit][seeds]
+        # the saved boards and totals of the play() and finish() calls not undone yet:
+        self.frames = []
+
+    def update_totals(self, before, changed):
+        # add the difference made by every changed pit to the totals of its side:
+        board, totals = self.board, self.totals
+        for index in changed:
+            side = PIT_SIDE[index]
+            if side is None:
+                continue
+            old, new = before[index], board[index]
+            totals[SEEDS + side] += new - old
+            if not old and new:
+                totals[MOBILITY + side] += 1
+                totals[EMPTY + side] -= 1
+            elif old and not new:
+                totals[MOBILITY + side] -= 1
+                totals[EMPTY + side] += 1
+            totals[EXTRA_TURNS + side] += EXTRA_TURN[index][new] - EXTRA_TURN[index][old]
+
+    def play(self, player, pit):
+        """
+        Sow and capture, like sow() and capture(), without ending the game (see finish()).
+
+        Returns:
+        tuple: (last pit index, seeds captured).
+        """
+        board = self.board
+        before = board[:]
+        self.frames.append((before, self.totals[:]))
+        seeds = board[pit]
+        board[pit] = 0
+        skip = STORE[OPPONENT[player]]
+        laps, seeds = divmod(seeds, NUM_PITS - 1)
+        if laps:
+            for index in range(NUM_PITS):
+                if index != skip:
+                    board[index] += laps
+            changed = range(NUM_PITS)
+        else:
+            changed = [pit]
+        current = pit
+        while seeds > 0:
+            current = current + 1 if current < NUM_PITS - 1 else 0
+            if current == skip:
+                continue
+            board[current] += 1
+            seeds -= 1
+            if not laps:
+                changed.append(current)
+
+        captured = 0
+        opposite = OPPOSITE[current]
+        if OWNER[current] == player and board[current] == 1 and board[opposite] > 0:
+            captured = board[opposite] + 1
+            board[current] = board[opposite] = 0
+            board[STORE[player]] += captured
+            # (the opposite pit may have been sown, and must only be counted once):
+            if not laps and opposite not in changed:
+                changed.append(opposite)
+        self.update_totals(before, changed)
+        return current, captured
+
+    def is_over(self):
+        return self.totals[SEEDS] == 0 or self.totals[SEEDS + 1] == 0
+
+    def finish(self):
+        """
+        If the game is over, move the remaining seeds to the Mancalas/Scores, like finish(). The
+        sweep is only saved (and must only be undone) when the game is over.
+
+        Returns:
+        bool: True if the game is over, False otherwise.
+        """
+        if not self.is_over():
+            return False
+        board, totals = self.board, self.totals
+        self.frames.append((board[:], totals[:]))
+        for player in '12':
+            board[STORE[player]] += totals[SEEDS + PIT_SIDE[PITS[player][0]]]
+            for pit in PITS[player]:
+                board[pit] = 0
+        # every pit is empty, so no move is left:
+        totals[:] = [0, 0, 0, 0, 6, 6, 0, 0]
+        return True
+
+    def undo(self):
+        """Restore the position before the last play() (or finish() that ended the game)."""
+        board, totals = self.frames.pop()
+        self.board[:] = board
+        self.totals[:] = totals
+
+    def captures(self, player):
+        """Get what the move from each pit of a player captures (0 for the moves that do not capture)."""
+        board = self.board
+        values = []
+        for pit in PITS[player]:
+            capture = CAPTURE[pit][board[pit]]
+            if capture is None:
+                values.append(0)
+                continue
+            last, opposite, added = capture
+            opposite_seeds = board[opposite] + added
+            values.append(opposite_seeds + 1 if opposite_seeds > 0 and (last == pit or not board[last]) else 0)
+        return values
+
+    def tactical_moves(self, player):
+        """Get the moves that give an extra turn or capture seeds (the same as tactical_moves())."""
+        board = self.board
+        return [pit for pit, captured in zip(PITS[player], self.captures(player))
+                if captured or EXTRA_TURN[pit][board[pit]]]
+
+    def features(self, player):
+        """Get the evaluation features from the point of view of a player (the same as features())."""
+        opponent = OPPONENT[player]
+        own = PIT_SIDE[PITS[player][0]]
+        other = 1 - own
+        board, totals = self.board, self.totals
+        return [board[STORE[player]] - board[STORE[opponent]],
+                totals[SEEDS + own] - totals[SEEDS + other],
+                totals[MOBILITY + own] - totals[MOBILITY + other],
+                max(self.captures(player)) - max(self.captures(opponent)),
+                totals[EXTRA_TURNS + own] - totals[EXTRA_TURNS + other],
+                totals[EMPTY + own] - totals[EMPTY + other]]
+
+    def evaluate(self, weights, player):
+        """Evaluate the position for a player: the dot product of the evaluation weights and the features."""
+        return sum(weight * value for weight, value in zip(weights, self.features(player)))
@@ -1,10 +1,131 @@
 # import required libraries:
 # sys: exit the program when Player 1 inputs 'QUIT'.
 # random: randomly choose the starting player.
+# threading: the AI ponders in a background thread while the human thinks.
+# time: the AI moves are timed for the latency report.
+# latency: per-move latency histograms of the AI agent.
 # ai_agents: custom AI agents with different levels of difficulty to play against.
 import sys
 import random
-from ai_agents import RandomAgent, MediumAgent, MinimaxAgent
+import threading
+import time
+from latency import LatencyRecorder
+from ai_agents import RandomAgent, MediumAgent, MinimaxAgent, SearchAborted
+
+
+class Ponderer:
+    """
+    Search on the human's time: while the human player chooses a move, a background thread
+    searches the AI reply to each of their likely moves. If the human plays one of them, the AI
+    answer is ready right away; otherwise the background search is stopped.
+    """
+    def __init__(self, ai_agent):
+        self.ai_agent = ai_agent
+        self.stop_event = threading.Event()
+        self.finish_current = threading.Event()
+        self.thread = None
+        # the AI moves found so far, by position, and the position being searched right now:
+        self.results = {}
+        self.current = None
+        # whether the search tables of the agent were aged for the coming AI move when pondering
+        # started (they are aged once per AI move, not once per pondered position):
+        self.aged = False
+        # statistics: how many AI moves were answered from pondering, and how many were not:
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def position_key(game):
+        return tuple(game.board[pit] for pit in game.PIT_LABELS), game.player_turn
+
+    def predict_positions(self, game):
+        """
+        Get the positions where the AI will be to move after each human move, most likely first
+        (moves that capture more seeds are tried first). Moves that give the human an extra turn
+        or end the game are skipped, since the AI does not move after them.
+        """
+        predictions = []
+        for move in game.get_valid_moves('1'):
+            new_game = game.copy()
+            last_pit = new_game.make_move(move)
+            seeds_before = new_game.board['1']
+            new_game.check_capture(last_pit)
+            if last_pit == '1' or new_game.check_game_over():
+                continue
+            new_game.change_turn()
+            predictions.append((new_game.board['1'] - seeds_before, new_game))
+        predictions.sort(key=lambda prediction: prediction[0], reverse=True)
+        return [new_game for _, new_game in predictions]
+
+    def start(self, game):
+        """Start pondering the AI replies to the human's moves in the given position."""
+        self.stop()
+        self.results = {}
+        self.ai_agent.stop_event = self.stop_event
+        if hasattr(self.ai_agent, 'new_search'):
+            self.ai_agent.new_search()
+            self.aged = True
+        self.thread = threading.Thread(target=self.run, args=(self.predict_positions(game),), daemon=True)
+        self.thread.start()
+
+    def run(self, positions):
+        search = self.ai_agent.search if self.aged else self.ai_agent.make_move
+        for game in positions:
+            if self.stop_event.is_set() or self.finish_current.is_set():
+                return
+            self.current = self.position_key(game)
+            try:
+                move = search(game)
+            except SearchAborted:
+                return
+            self.results[self.current] = move
+        self.current = None
+
+    def stop(self):
+        """Stop the background search and wait for the thread to end."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.stop_event.clear()
+        self.finish_current.clear()
+        self.current = None
+
+    def finish(self, game):
+        """
+        Stop pondering and get the AI move for the actual position, if it was pondered. If the
+        position is being searched right now, that search is allowed to finish first.
+
+        Returns:
+        str: The pondered move, or None if the position was not pondered.
+        """
+        key = self.position_key(game)
+        if key not in self.results and self.current == key and self.thread is not None:
+            self.finish_current.set()
+            self.thread.join()
+            self.thread = None
+        self.stop()
+
+        move = self.results.pop(key, None)
+        if move is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.aged = False
+        return move
+
+    def make_move(self, game):
+        """
+        Search the AI move of a position that was not pondered, without aging the search tables again
+        if that was done when pondering started for this move.
+
+        Returns:
+        str: The AI move.
+        """
+        if self.aged:
+            self.aged = False
+            return self.ai_agent.search(game)
+        return self.ai_agent.make_move(game)
 
 
 class Mancala:
@@ -30,11 +151,16 @@ class Mancala:
     # a constant representing the initial number of seeds in each pit:
     STARTING_NUMBER_OF_SEEDS = 4
 
-    def __init__(self, ai_agent=None):
+    def __init__(self, ai_agent=None, ponder=False):
         # create a new game board and assign the current player:
         self.board = self.get_new_board()
         self.player_turn = random.choice(["1", "2"])
         self.ai_agent = ai_agent
+        # if pondering is enabled, the AI searches while the human is thinking:
+        self.ponderer = Ponderer(ai_agent) if ponder and ai_agent else None
+        # the time the human waited for every AI move (including the moves found by pondering),
+        # recorded by play_game:
+        self.latency = None
 
     def get_new_board(self):
         """Create a new game board with the starting number of seeds (4) in each pit."""
@@ -278,7 +404,16 @@ class Mancala:
         ValueError: If no AI agent is defined for Player 2.
         """
         if self.ai_agent:
-            move = self.ai_agent.make_move(self)
+            started = time.perf_counter()
+            # use the pondered move if the AI already searched this position:
+            if self.ponderer:
+                move = self.ponderer.finish(self)
+                if move is None:
+                    move = self.ponderer.make_move(self)
+            else:
+                move = self.ai_agent.make_move(self)
+            if self.latency is not None:
+                self.latency.record(self.ai_agent, self, time.perf_counter() - started)
             print(f'AI Player chooses move: {move}')
             return move
         else:
@@ -293,6 +428,8 @@ class Mancala:
         str: The label of the chosen pit to move from.
         """
         if self.player_turn == '1':
+            if self.ponderer:
+                self.ponderer.start(self)
             return self.ask_for_human_move()
         else:
             return self.ask_for_ai_move()
@@ -303,6 +440,7 @@ class Mancala:
         for moves, performing the moves, checking for game over conditions, and
         announcing the winner or a tie.
         """
+        self.latency = LatencyRecorder()
         while True:
             # display the current state of the game board:
             self.display_board()
@@ -335,6 +473,10 @@ class Mancala:
         else:
             print('It\'s a tie!')
 
+        # show how long the AI took to answer:
+        print()
+        self.latency.report()
+
 
 if __name__ == '__main__':
     ai_agent = None
@@ -354,8 +496,8 @@ if __name__ == '__main__':
         else:
             print("Invalid input. Please try again.")
 
-    # initialize the Mancala game with the selected AI agent:
-    game = Mancala(ai_agent)
+    # initialize the Mancala game with the selected AI agent (pondering on the human's time):
+    game = Mancala(ai_agent, ponder=True)
 
     # start playing the game:
     game.play_game()
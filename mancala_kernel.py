@@ -0,0 +1,169 @@
+# the hot path of the compact engine (sowing, capture, end of game and a full alpha-beta search),
+# written so that Numba can compile it. When numba is installed the functions are compiled to
+# machine code (cache=True stores the compiled code next to this file, so only the very first run
+# pays for the compilation); without it they run as plain Python on lists, with identical results.
+#
+# unlike mancala_engine, the kernel works with integer players (0 for Player 1, 1 for Player 2),
+# since Numba cannot compile the string players; the board layout is the same.
+try:
+    import numpy as np
+    from numba import njit
+    JIT = True
+except ImportError:
+    np = None
+    JIT = False
+
+    def njit(*args, **kwargs):
+        # without numba, the decorator leaves the function as it is:
+        if args and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+# a value outside the range of any evaluation, used as the initial best value of a search:
+INFINITY = 1e18
+
+# the kernel player numbers of the engine players, and back:
+PLAYER_NUMBER = {'1': 0, '2': 1}
+PLAYER_NAME = ('1', '2')
+
+
+def to_kernel_board(board):
+    """Convert a compact board (list) to the kernel's board type (a numpy array when compiled)."""
+    if JIT:
+        return np.array(board, dtype=np.int64)
+    return list(board)
+
+
+@njit(cache=True)
+def sow(board, pit, player):
+    # sow the seeds of a pit (see mancala_engine.sow) and return the index of the last pit:
+    skip = 13 if player == 0 else 6
+    seeds = board[pit]
+    board[pit] = 0
+    current = pit
+    while seeds > 0:
+        current = current + 1 if current < 13 else 0
+        if current == skip:
+            continue
+        board[current] += 1
+        seeds -= 1
+    return current
+
+
+@njit(cache=True)
+def capture(board, last, player):
+    # capture (see mancala_engine.capture) and return the number of seeds captured:
+    low = 0 if player == 0 else 7
+    if low <= last < low + 6 and board[last] == 1:
+        opposite = 12 - last
+        if board[opposite] > 0:
+            captured = board[last] + board[opposite]
+            board[last] = 0
+            board[opposite] = 0
+            board[6 if player == 0 else 13] += captured
+            return captured
+    return 0
+
+
+@njit(cache=True)
+def finish(board):
+    # end the game if a side is empty (see mancala_engine.finish) and return whether it is over:
+    seeds_1 = 0
+    seeds_2 = 0
+    for pit in range(6):
+        seeds_1 += board[pit]
+        seeds_2 += board[pit + 7]
+    if seeds_1 > 0 and seeds_2 > 0:
+        return False
+    board[6] += seeds_1
+    board[13] += seeds_2
+    for pit in range(6):
+        board[pit] = 0
+        board[pit + 7] = 0
+    return True
+
+
+@njit(cache=True)
+def search(board, me, depth, alpha, beta, maximizing):
+    """
+    Alpha-beta search with the same rules and results as ai_agents2.MinimaxAgent.minimax with
+    the store difference evaluation: the seeds a move adds to the mover's store are added to the
+    value of its child (and the child's window is shifted by them), and an extra turn gives the
+    same player the next move. The board is changed (it is not copied at this level).
+
+    Parameters:
+    board: The kernel board (see to_kernel_board).
+    me (int): The kernel player of the agent (the maximizing player).
+    depth (int): The remaining search depth.
+    alpha (float), beta (float): The search window.
+    maximizing (bool): Whether the agent is to move.
+
+    Returns:
+    tuple: (value for the agent, number of nodes searched).
+    """
+    my_store = 6 if me == 0 else 13
+    their_store = 19 - my_store
+    if depth == 0 or finish(board):
+        return float(board[my_store] - board[their_store]), 1
+
+    mover = me if maximizing else 1 - me
+    store = 6 if mover == 0 else 13
+    low = 0 if mover == 0 else 7
+    nodes = 1
+    best = -INFINITY if maximizing else INFINITY
+    for pit in range(low, low + 6):
+        if board[pit] == 0:
+            continue
+        child = board.copy()
+        last = sow(child, pit, mover)
+        capture(child, last, mover)
+        extra_turn = last == store
+        # like minimax, the seeds the move adds to the mover's store (sown or captured):
+        gained = child[store] - board[store]
+        if maximizing:
+            value, child_nodes = search(child, me, depth - 1, alpha - gained, beta - gained, extra_turn)
+            value += gained
+            if value > best:
+                best = value
+            if value > alpha:
+                alpha = value
+        else:
+            value, child_nodes = search(child, me, depth - 1, alpha + gained, beta + gained, not extra_turn)
+            value -= gained
+            if value < best:
+                best = value
+            if value < beta:
+                beta = value
+        nodes += child_nodes
+        if beta <= alpha:
+            break
+    return best, nodes
+
+
+@njit(cache=True)
+def count(board, player, depth, nodes, terminals, ply):
+    # count the positions below a position (see perft.count_engine), into the nodes and terminals arrays:
+    low = 0 if player == 0 else 7
+    store = 6 if player == 0 else 13
+    for pit in range(low, low + 6):
+        if board[pit] == 0:
+            continue
+        child = board.copy()
+        last = sow(child, pit, player)
+        capture(child, last, player)
+        nodes[ply] += 1
+        if finish(child):
+            terminals[ply] += 1
+        elif ply < depth:
+            count(child, player if last == store else 1 - player, depth, nodes, terminals, ply + 1)
+
+
+def warm_up():
+    """
+    Compile (or load from the cache) every kernel function by calling it once on a small search,
+    so that the compilation does not happen during the first move of a game.
+    """
+    board = to_kernel_board([4] * 6 + [0] + [4] * 6 + [0])
+    search(board, 0, 2, -INFINITY, INFINITY, True)
+    counts = to_kernel_board([0, 0])
+    count(to_kernel_board([4] * 6 + [0] + [4] * 6 + [0]), 0, 1, counts, counts.copy(), 1)
@@ -0,0 +1,334 @@
+# import required libraries:
+# asyncio: the server handles every connection in one event loop.
+# signal: shut down gracefully on SIGINT/SIGTERM.
+# math: check that a clock is a finite number of seconds.
+# time: the deadline of a search in a worker process.
+# random: fallback moves when the AI runs out of time.
+# itertools: session ids.
+# argparse: command line interface.
+# concurrent.futures: AI searches run in a bounded pool of worker processes.
+import asyncio
+import signal
+import math
+import time
+import random
+import itertools
+import argparse
+import concurrent.futures
+import mancala_engine as engine
+from mancala_ai_ai import Mancala
+from ai_agents2 import RandomAgent, MediumAgent, MinimaxAgent, MCTSAgent, SearchTimeout
+
+# the AI agents a client can choose from (the AI always plays as Player 2):
+AGENTS = {'random': RandomAgent, 'medium': MediumAgent, 'minimax': MinimaxAgent, 'mcts': MCTSAgent}
+
+# the agents already created in this worker process, so that they are only loaded once:
+_worker_agents = {}
+
+PROTOCOL_HELP = '''Commands (one per line):
+  NEW <random|medium|minimax|mcts> [clock seconds]   start a game against the AI (you are Player 1)
+  MOVE <A-F>                                         play a move
+  QUIT                                               leave the server
+Server messages:
+  BOARD <14 seed counts in ABCDEF1LKJIHG2 order> TURN <1|2, or 0 when the game is over>
+  AI <pit> <milliseconds>
+  OVER <score 1> <score 2> <WIN|LOSS|TIE>
+  ERROR <message>'''
+
+
+def ai_move(agent_name, position, time_limit=None):
+    """
+    Choose the AI move for a position (run in a worker process).
+
+    Parameters:
+    agent_name (str): One of the AGENTS keys.
+    position (bytes): The position in the bytes form of Mancala.to_position (a few bytes instead
+                      of a pickled game).
+    time_limit (float): The seconds the search may take: a minimax search is abandoned at this
+                        deadline (the other agents do a fixed amount of work per move).
+
+    Returns:
+    str: The chosen pit label, or None if the search was abandoned.
+    """
+    if agent_name not in _worker_agents:
+        _worker_agents[agent_name] = AGENTS[agent_name]('2')
+    agent = _worker_agents[agent_name]
+    game = Mancala.from_position(position)
+    if time_limit is None or not hasattr(agent, 'deadline'):
+        return agent.make_move(game)
+    agent.deadline = time.perf_counter() + time_limit
+    try:
+        return agent.make_move(game)
+    except SearchTimeout:
+        return None
+    finally:
+        agent.deadline = None
+
+
+class Session:
+    """
+    One client connection, with its own game, agent and clocks. The game rules come from the
+    Mancala class; only the agent search is sent to the worker pool.
+    """
+    def __init__(self, server, session_id, reader, writer):
+        self.server = server
+        self.session_id = session_id
+        self.reader = reader
+        self.writer = writer
+        self.game = None
+        self.agent_name = None
+        # the remaining thinking time of each player, in seconds (None means no clock), and the
+        # event loop time when the current turn started:
+        self.clock = {'1': None, '2': None}
+        self.turn_started = 0.0
+
+    async def send(self, line):
+        # drain() waits while the client is not reading, so a slow client cannot make the
+        # server buffer an unbounded amount of output:
+        self.writer.write((line + '\n').encode())
+        await self.writer.drain()
+
+    async def send_board(self, over=False):
+        board = engine.board_from_dict(self.game.board)
+        await self.send(f"BOARD {' '.join(map(str, board))} TURN {0 if over else self.game.player_turn}")
+
+    async def run(self):
+        await self.send(f'WELCOME {self.session_id}')
+        while not self.server.closing:
+            try:
+                line = await self.read_line(self.read_timeout())
+            except asyncio.TimeoutError:
+                # the human ran out of time on their clock (otherwise the client was idle too long):
+                if self.human_to_move() and self.clock['1'] is not None:
+                    await self.finish('LOSS')
+                    continue
+                return
+            if line is None:
+                return
+            command, *args = line.split() or ['']
+            command = command.upper()
+
+            if command == 'QUIT':
+                return
+            elif command == 'HELP':
+                for help_line in PROTOCOL_HELP.splitlines():
+                    await self.send(help_line)
+            elif command == 'NEW':
+                await self.new_game(args)
+            elif command == 'MOVE':
+                await self.human_move(args)
+            else:
+                await self.send('ERROR unknown command (try HELP)')
+
+    def human_to_move(self):
+        return self.game is not None and self.game.player_turn == '1'
+
+    def read_timeout(self):
+        # wait for the client at most until the human's clock runs out:
+        if not self.human_to_move() or self.clock['1'] is None:
+            return self.server.idle_timeout
+        elapsed = asyncio.get_running_loop().time() - self.turn_started
+        return max(0.0, min(self.server.idle_timeout, self.clock['1'] - elapsed))
+
+    async def read_line(self, timeout):
+        # read one line, or return None if the client left or sent an overlong line:
+        try:
+            data = await asyncio.wait_for(self.reader.readline(), timeout)
+        except (ValueError, ConnectionError):
+            return None
+        if not data:
+            return None
+        return data.decode(errors='replace').strip()
+
+    async def new_game(self, args):
+        if not args or args[0].lower() not in AGENTS:
+            await self.send('ERROR usage: NEW <random|medium|minimax|mcts> [clock seconds]')
+            return
+        clock = self.server.default_clock
+        if len(args) > 1:
+            try:
+                clock = float(args[1])
+            except ValueError:
+                clock = None
+            if clock is None or not math.isfinite(clock) or clock <= 0:
+                await self.send('ERROR usage: NEW <random|medium|minimax|mcts> [clock seconds > 0]')
+                return
+        self.agent_name = args[0].lower()
+        self.clock = {'1': clock, '2': clock}
+        self.game = Mancala(verbose=False)
+        await self.send_board()
+        await self.play_ai_turns()
+
+    async def human_move(self, args):
+        if self.game is None:
+            await self.send('ERROR no game in progress (use NEW)')
+            return
+        if self.game.player_turn != '1':
+            await self.send('ERROR not your turn')
+            return
+        pit = args[0].upper() if args else ''
+        if pit not in self.game.PLAYER_1_PITS or self.game.board[pit] == 0:
+            await self.send('ERROR invalid move')
+            return
+
+        # the human clock runs from the last board sent until the move arrives:
+        if self.clock['1'] is not None:
+            self.clock['1'] -= asyncio.get_running_loop().time() - self.turn_started
+            if self.clock['1'] <= 0:
+                await self.finish('LOSS')
+                return
+
+        if await self.play(pit):
+            await self.play_ai_turns()
+
+    async def play(self, pit):
+        # play a move on the game; returns False if the game is over:
+        last_pit = self.game.make_move(pit)
+        self.game.check_capture(last_pit)
+        if self.game.check_game_over():
+            await self.send_board(over=True)
+            result = self.game.board['1'] - self.game.board['2']
+            await self.finish('WIN' if result > 0 else 'LOSS' if result < 0 else 'TIE')
+            return False
+        if last_pit != self.game.player_turn:
+            self.game.change_turn()
+        await self.send_board()
+        self.turn_started = asyncio.get_running_loop().time()
+        return True
+
+    async def play_ai_turns(self):
+        # let the AI play until it is the human's turn again (extra turns give it several moves):
+        loop = asyncio.get_running_loop()
+        self.turn_started = loop.time()
+        while self.game is not None and self.game.player_turn == '2':
+            started = loop.time()
+            move = await self.server.search(self.agent_name, self.game, self.move_time_limit())
+            elapsed = loop.time() - started
+            if self.clock['2'] is not None:
+                self.clock['2'] -= elapsed
+            await self.send(f'AI {move} {elapsed * 1000:.0f}')
+            if not await self.play(move):
+                return
+
+    def move_time_limit(self):
+        # the AI may use a fraction of its remaining clock on each move, and never more than the
+        # server's per-move limit:
+        if self.clock['2'] is None:
+            return self.server.move_timeout
+        return max(0.01, min(self.server.move_timeout, self.clock['2'] / 10))
+
+    async def finish(self, result):
+        await self.send(f"OVER {self.game.board['1']} {self.game.board['2']} {result}")
+        self.game = None
+
+
+class MancalaServer:
+    """
+    An asyncio server hosting many human-vs-AI sessions. AI searches are sent to a bounded
+    process pool, so they never block the event loop; at most max_pending searches are queued
+    at once (the other sessions wait), and at most max_sessions clients are connected.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, workers=None, max_sessions=500, max_pending=None,
+                 move_timeout=5.0, default_clock=None, idle_timeout=600.0):
+        self.host = host
+        self.port = port
+        self.pool = concurrent.futures.ProcessPoolExecutor(workers)
+        self.max_sessions = max_sessions
+        self.pending = asyncio.Semaphore(max_pending or 4 * (workers or 4))
+        self.move_timeout = move_timeout
+        self.default_clock = default_clock
+        self.idle_timeout = idle_timeout
+        self.sessions = set()
+        self.tasks = set()
+        self.session_ids = itertools.count(1)
+        self.closing = False
+        self.server = None
+
+    async def search(self, agent_name, game, time_limit):
+        """
+        Run an AI search in the worker pool. If it does not finish within the time limit, a random
+        valid move is played instead, so a slow search can never make the AI flag. The worker
+        abandons the search at the same limit, and its pending slot stays taken until it does (a
+        worker still busy with an abandoned search is not free for the next one).
+        """
+        position = game.to_position(binary=True)
+        await self.pending.acquire()
+        future = asyncio.get_running_loop().run_in_executor(self.pool, ai_move, agent_name, position, time_limit)
+        future.add_done_callback(lambda _: self.pending.release())
+        done, _ = await asyncio.wait({future}, timeout=time_limit)
+        move = future.result() if done else None
+        if move is None:
+            return random.choice(game.get_valid_moves(game.player_turn))
+        return move
+
+    async def handle_client(self, reader, writer):
+        session = Session(self, next(self.session_ids), reader, writer)
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                await session.send('ERROR server full, try again later')
+                return
+            self.sessions.add(session)
+            await session.run()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            self.tasks.discard(task)
+            writer.close()
+
+    async def start(self):
+        # the line limit protects the server from clients that never send a newline:
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=1024)
+        return self.server
+
+    async def shutdown(self, grace=5.0):
+        """
+        Stop accepting clients, give the running sessions some time to finish their current
+        request, then close every connection and the worker pool.
+        """
+        self.closing = True
+        self.server.close()
+        await self.server.wait_closed()
+        for session in list(self.sessions):
+            try:
+                await asyncio.wait_for(session.send('ERROR server shutting down'), grace)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            session.writer.close()
+        # the sessions end once their connection is closed; cancel the ones that are still waiting:
+        tasks = list(self.tasks)
+        if tasks:
+            _, still_running = await asyncio.wait(tasks, timeout=grace)
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f'Mancala server listening on {self.host}:{self.port}')
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+        await stop.wait()
+        print('Shutting down...')
+        await self.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve human-vs-AI Mancala games over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help='AI worker processes (default: one per core)')
+    parser.add_argument('--max-sessions', type=int, default=500)
+    parser.add_argument('--max-pending', type=int, help='maximum queued AI searches')
+    parser.add_argument('--move-timeout', type=float, default=5.0, help='maximum seconds per AI move')
+    parser.add_argument('--clock', type=float, help='default game clock per player, in seconds')
+    args = parser.parse_args()
+
+    mancala_server = MancalaServer(args.host, args.port, args.workers, args.max_sessions, args.max_pending,
+                                   args.move_timeout, args.clock)
+    asyncio.run(mancala_server.serve_forever())
@@ -0,0 +1,109 @@
+# import required libraries:
+# random: openings are made by random playouts from the start position.
+# hashlib: every opening gets a stable random seed.
+# argparse: command line interface.
+import random
+import hashlib
+import argparse
+import mancala_engine as engine
+
+
+def balance(board, player, depth, alpha=-engine.MAX_SEEDS, beta=engine.MAX_SEEDS):
+    """
+    Estimate how balanced a position is with a shallow negamax search of the store difference.
+
+    Parameters:
+    board (list): The compact board.
+    player (str): The player to move.
+    depth (int): The search depth (an extra turn counts as a move of its own).
+
+    Returns:
+    int: The store difference for the side to move after depth moves of best play.
+    """
+    opponent = engine.OPPONENT[player]
+    if depth == 0:
+        return board[engine.STORE[player]] - board[engine.STORE[opponent]]
+    best = -engine.MAX_SEEDS
+    for pit in engine.get_valid_moves(board, player):
+        child = board[:]
+        _, _, over, next_player = engine.play(child, player, pit)
+        if over:
+            value = child[engine.STORE[player]] - child[engine.STORE[opponent]]
+        elif next_player == player:
+            value = balance(child, player, depth - 1, alpha, beta)
+        else:
+            value = -balance(child, opponent, depth - 1, -beta, -alpha)
+        best = max(best, value)
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+    return best
+
+
+def generate_openings(count, min_moves=2, max_moves=8, depth=4, max_imbalance=2, seed=0):
+    """
+    Generate a suite of diverse, roughly balanced opening positions: random playouts of
+    min_moves to max_moves moves from the start position (with a random starting player), keeping
+    only positions where a shallow search finds neither side ahead by more than max_imbalance
+    seeds. Positions that are the same up to mirroring are only kept once.
+
+    Returns:
+    list: The openings in text notation.
+    """
+    rng = random.Random(seed)
+    seen = set()
+    openings = []
+    attempts = 0
+    while len(openings) < count and attempts < 1000 * count:
+        attempts += 1
+        board, player = engine.new_board(), rng.choice('12')
+        over = False
+        for _ in range(rng.randint(min_moves, max_moves)):
+            _, _, over, player = engine.play(board, player, rng.choice(engine.get_valid_moves(board, player)))
+            if over:
+                break
+        key = engine.canonical_key(board, player)
+        if over or key in seen:
+            continue
+        seen.add(key)
+        if abs(balance(board, player, depth)) <= max_imbalance:
+            openings.append(engine.to_text(board, player))
+    return openings
+
+
+def write_openings(path, openings):
+    with open(path, 'w') as file:
+        for position in openings:
+            file.write(position + '\n')
+
+
+def read_openings(path):
+    """Read openings (one position in text notation per line; lines starting with '#' are comments)."""
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip() and not line.startswith('#')]
+
+
+def opening_seed(position):
+    """
+    Return the random seed of the games played from an opening. It only depends on the position,
+    so results stored by seed (see results_store.py) do not depend on the order of the suite.
+    Opening seeds are at least 2**60, so they never collide with the game numbers used as seeds
+    for games from the start position.
+    """
+    return (1 << 60) | int.from_bytes(hashlib.sha1(position.encode()).digest()[:7], 'big')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a suite of balanced Mancala opening positions.')
+    parser.add_argument('count', type=int, help='number of openings')
+    parser.add_argument('-o', '--output', default='openings.txt')
+    parser.add_argument('--min-moves', type=int, default=2, help='minimum random moves from the start position')
+    parser.add_argument('--max-moves', type=int, default=8, help='maximum random moves from the start position')
+    parser.add_argument('--depth', type=int, default=4, help='depth of the balance search')
+    parser.add_argument('--max-imbalance', type=int, default=2, help='maximum advantage in seeds for either side')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    suite = generate_openings(args.count, args.min_moves, args.max_moves, args.depth, args.max_imbalance, args.seed)
+    write_openings(args.output, suite)
+    print(f'Wrote {len(suite)} openings to {args.output}')
@@ -0,0 +1,184 @@
+# import required libraries:
+# time: measure the number of nodes per second.
+# argparse: command line interface.
+# multiprocessing: the tree can be split at the root and counted by parallel worker processes.
+import time
+import argparse
+import multiprocessing
+import mancala_engine as engine
+import mancala_kernel
+from mancala_ai_ai import Mancala
+
+# the expected counts from the standard start position with Player 1 to move, for each depth
+# (number of moves, an extra turn counting as a move of its own): (positions, finished games).
+# Any change to the rules code (make_move/check_capture/check_game_over, or the compact engine)
+# must keep these numbers.
+EXPECTED = {
+    1: (6, 0),
+    2: (35, 0),
+    3: (185, 0),
+    4: (942, 0),
+    5: (4690, 0),
+    6: (23233, 0),
+    7: (114430, 0),
+    8: (563055, 0),
+    9: (2763490, 1),
+    10: (13519607, 31),
+    11: (65870758, 324),
+}
+
+
+def count_engine(board, player, depth, nodes, terminals, ply=1):
+    # count the positions below a position of the compact engine (mancala_engine.py):
+    for pit in engine.get_valid_moves(board, player):
+        child = board[:]
+        _, _, over, next_player = engine.play(child, player, pit)
+        nodes[ply] += 1
+        if over:
+            terminals[ply] += 1
+        elif ply < depth:
+            count_engine(child, next_player, depth, nodes, terminals, ply + 1)
+
+
+def count_reference(game, depth, nodes, terminals, ply=1):
+    # count the positions below a position of the Mancala class (mancala_ai_ai.py):
+    for move in game.get_valid_moves(game.player_turn):
+        child = game.copy()
+        last_pit = child.make_move(move)
+        child.check_capture(last_pit)
+        nodes[ply] += 1
+        if child.check_game_over():
+            terminals[ply] += 1
+            continue
+        if last_pit != child.player_turn:
+            child.change_turn()
+        if ply < depth:
+            count_reference(child, depth, nodes, terminals, ply + 1)
+
+
+# the move generators that can be counted, by name (see count_subtree):
+BACKENDS = ('engine', 'kernel', 'reference')
+
+
+def count_subtree(arguments):
+    """
+    Count the positions below a position (run in a worker process when the tree is split at the root).
+
+    Parameters:
+    arguments (tuple): (backend, compact board, player to move, depth, ply of the position).
+
+    Returns:
+    tuple: (positions, finished games), as lists indexed by ply.
+    """
+    backend, board, player, depth, ply = arguments
+    nodes, terminals = [0] * (depth + 1), [0] * (depth + 1)
+    if backend == 'engine':
+        count_engine(board, player, depth, nodes, terminals, ply)
+    elif backend == 'kernel':
+        kernel_nodes = mancala_kernel.to_kernel_board(nodes)
+        kernel_terminals = mancala_kernel.to_kernel_board(terminals)
+        mancala_kernel.count(mancala_kernel.to_kernel_board(board), mancala_kernel.PLAYER_NUMBER[player], depth,
+                             kernel_nodes, kernel_terminals, ply)
+        nodes, terminals = [int(n) for n in kernel_nodes], [int(n) for n in kernel_terminals]
+    else:
+        game = Mancala(verbose=False)
+        game.board = engine.board_to_dict(board)
+        game.player_turn = player
+        count_reference(game, depth, nodes, terminals, ply)
+    return nodes, terminals
+
+
+def perft(board, player, depth, backend='engine', workers=1):
+    """
+    Count every position reachable from a position in at most depth moves. A position where the
+    game is over is counted (as a finished game) but not searched further, and an extra turn is a
+    move of its own (the same player moves again at the next ply).
+
+    Parameters:
+    board (list): The compact board (see mancala_engine).
+    player (str): The player to move.
+    depth (int): The number of moves to search.
+    backend (str): 'engine' for the compact engine, 'kernel' for the compiled kernel (mancala_kernel)
+                   or 'reference' for the Mancala class.
+    workers (int): The number of worker processes; with more than one, the tree is split at the
+                   root and every root move is counted by a worker.
+
+    Returns:
+    tuple: (positions, finished games), lists where item d is the count at ply d (item 0 is the
+           root position itself).
+    """
+    if workers <= 1 or depth <= 1:
+        nodes, terminals = count_subtree((backend, board, player, depth, 1))
+        nodes[0] = 1
+        return nodes, terminals
+
+    # play the root moves here, and count what is below each of them in parallel:
+    nodes, terminals = [1] + [0] * depth, [0] * (depth + 1)
+    jobs = []
+    for pit in engine.get_valid_moves(board, player):
+        child = board[:]
+        _, _, over, next_player = engine.play(child, player, pit)
+        nodes[1] += 1
+        if over:
+            terminals[1] += 1
+        else:
+            jobs.append((backend, child, next_player, depth, 2))
+    with multiprocessing.Pool(workers) as pool:
+        for sub_nodes, sub_terminals in pool.imap_unordered(count_subtree, jobs):
+            for ply in range(2, depth + 1):
+                nodes[ply] += sub_nodes[ply]
+                terminals[ply] += sub_terminals[ply]
+    return nodes, terminals
+
+
+def run(board, player, depth, backend, workers):
+    """
+    Run perft and print the counts at every ply and the speed.
+
+    Returns:
+    tuple: (positions, finished games), as returned by perft().
+    """
+    started = time.perf_counter()
+    nodes, terminals = perft(board, player, depth, backend, workers)
+    elapsed = time.perf_counter() - started
+    for ply in range(1, depth + 1):
+        print(f'  depth {ply}: {nodes[ply]} positions, {terminals[ply]} finished games')
+    total = sum(nodes[1:])
+    print(f'  {backend}: {total} positions in {elapsed:.2f} s ({total / elapsed:,.0f} nodes/s)')
+    return nodes, terminals
+
+
+def verify(depth, workers):
+    """
+    Check every backend against the expected counts from the start position.
+
+    Returns:
+    bool: True if all the counts match.
+    """
+    passed = True
+    for backend in BACKENDS:
+        print(f'{backend}:')
+        nodes, terminals = run(engine.new_board(), '1', depth, backend, workers)
+        for ply in range(1, depth + 1):
+            if ply in EXPECTED and (nodes[ply], terminals[ply]) != EXPECTED[ply]:
+                print(f'  MISMATCH at depth {ply}: expected {EXPECTED[ply]}, got {(nodes[ply], terminals[ply])}')
+                passed = False
+    print('All counts match.' if passed else 'Some counts do not match!')
+    return passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count the positions reachable from a Mancala position.')
+    parser.add_argument('depth', type=int, nargs='?', default=8)
+    parser.add_argument('--backend', choices=BACKENDS, default='engine')
+    parser.add_argument('--position', help="the position in text notation, e.g. '4,4,4,4,4,4/0/4,4,4,4,4,4/0 1' "
+                                           "(default: the start position with Player 1 to move)")
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (the tree is split at the root)')
+    parser.add_argument('--verify', action='store_true',
+                        help='check every backend against the expected counts from the start position')
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if verify(min(args.depth, max(EXPECTED)), args.workers) else 1)
+    start, first = engine.from_text(args.position) if args.position else (engine.new_board(), '1')
+    run(start, first, args.depth, args.backend, args.workers)
@@ -0,0 +1,116 @@
+# import required libraries:
+# json: the fitted parameters are exported as a JSON config.
+# math: the standard deviation of the regression.
+# argparse: command line interface.
+# itertools: limit the number of positions read.
+import json
+import math
+import argparse
+import itertools
+import mancala_engine as engine
+from mancala_ai_ai import Mancala
+from ai_agents2 import MinimaxAgent, PROBCUT_FILE
+from game_records import load_positions
+
+# the shallow search that predicts a deep one is this many plies shallower:
+PROBCUT_REDUCTION = 2
+
+
+def search_values(paths, depths, limit=None, weights=True):
+    """
+    Search positions extracted by game_records.py at several depths, with the evaluation of the
+    minimax agent (without transposition table, so that every value comes from a search of its own).
+
+    Parameters:
+    paths (list): The positions files.
+    depths (list): The search depths.
+    limit (int): The maximum number of positions to search (default: all of them).
+    weights (list): The evaluation weights, None for the store difference (default: the agent's own,
+                    see ai_agents2.load_weights).
+
+    Returns:
+    list: The evaluation weights used, and one dict of values by depth per position, for the side to move.
+    """
+    def samples():
+        for path in paths:
+            yield from load_positions(path)
+
+    rows = []
+    agent = None
+    for position, side, _, _ in itertools.islice(samples(), limit):
+        agent = MinimaxAgent(side, depth=max(depths), weights=weights, table_size=0, use_kernel=False)
+        game = Mancala.from_position(engine.to_bytes(list(position), side))
+        if game.check_game_over():
+            continue
+        rows.append({depth: agent.minimax(game, depth, float('-inf'), float('inf'), True)[0] for depth in depths})
+    return (agent.weights if agent is not None else weights), rows
+
+
+def fit(pairs):
+    """
+    Fit deep = slope * shallow + intercept by least squares.
+
+    Returns:
+    tuple: (slope, intercept, standard deviation of the residuals, correlation), or None if the
+           shallow values do not vary.
+    """
+    count = len(pairs)
+    mean_x = sum(x for x, _ in pairs) / count
+    mean_y = sum(y for _, y in pairs) / count
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    if var_x == 0:
+        return None
+    slope = cov / var_x
+    intercept = mean_y - slope * mean_x
+    deviation = math.sqrt(sum((y - slope * x - intercept) ** 2 for x, y in pairs) / count)
+    correlation = cov / math.sqrt(var_x * var_y) if var_y else 0.0
+    return slope, intercept, deviation, correlation
+
+
+def fit_parameters(rows, min_depth, max_depth, reduction=PROBCUT_REDUCTION):
+    """
+    Fit the ProbCut regression of every deep depth on the depth reduction plies shallower.
+
+    Returns:
+    dict: (shallow depth, slope, intercept, deviation) by deep depth, and the correlation by deep depth.
+    """
+    parameters, correlations = {}, {}
+    for depth in range(max(min_depth, reduction + 1), max_depth + 1):
+        result = fit([(row[depth - reduction], row[depth]) for row in rows])
+        # a regression that does not grow with the shallow value cannot predict anything:
+        if result is None or result[0] <= 0:
+            continue
+        slope, intercept, deviation, correlations[depth] = result
+        parameters[depth] = (depth - reduction, slope, intercept, deviation)
+    return parameters, correlations
+
+
+def export_parameters(parameters, weights, path=PROBCUT_FILE):
+    # the parameters are only valid for the evaluation they were fitted with (see ai_agents2.load_probcut):
+    with open(path, 'w') as file:
+        json.dump({'weights': weights, 'parameters': {str(depth): list(values) for depth, values in parameters.items()}},
+                  file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fit the MinimaxAgent ProbCut parameters from recorded positions.')
+    parser.add_argument('positions', nargs='+', help='positions files written by game_records.py')
+    parser.add_argument('--limit', type=int, default=500, help='maximum number of positions to search')
+    parser.add_argument('--min-depth', type=int, default=3, help='shallowest deep search to fit')
+    parser.add_argument('--max-depth', type=int, default=7, help='deepest deep search to fit')
+    parser.add_argument('--reduction', type=int, default=PROBCUT_REDUCTION, help='plies between the two searches')
+    parser.add_argument('-o', '--output', default=PROBCUT_FILE, help='where to write the parameters')
+    args = parser.parse_args()
+
+    search_depths = sorted({depth for deep in range(args.min_depth, args.max_depth + 1)
+                            for depth in (deep, deep - args.reduction) if depth > 0})
+    evaluation, values = search_values(args.positions, search_depths, args.limit)
+    print(f'Searched {len(values)} positions at depths {search_depths}.')
+    fitted, fit_correlations = fit_parameters(values, args.min_depth, args.max_depth, args.reduction)
+    export_parameters(fitted, evaluation, args.output)
+    for deep_depth, (shallow_depth, a, b, sigma) in fitted.items():
+        print(f'depth {deep_depth} from {shallow_depth}: deep = {a:.3f} * shallow {b:+.3f}, '
+              f'deviation {sigma:.3f}, correlation {fit_correlations[deep_depth]:.3f}')
+    print(f'Parameters written to {args.output}')
@@ -0,0 +1,203 @@
+# import required libraries:
+# time: the time spent on adjudication is measured, to compare it with the moves it saves.
+# argparse: command line interface to prove positions.
+import time
+import argparse
+import mancala_engine as engine
+
+# the proof (or disproof) number of a position that cannot be proven (or disproven):
+INFINITY = 10 ** 9
+
+# the default number of positions a proof may expand:
+NODE_BUDGET = 5000
+
+# the most seeds left in the pits for a game to be adjudicated: before that, proofs rarely succeed
+# within the budget and only cost time:
+ADJUDICATION_SEEDS = 24
+
+# the number of positions kept in the proof table before the unsolved ones are dropped:
+TABLE_SIZE = 500000
+
+
+class ProofSearch:
+    """
+    Depth-first proof-number search (df-pn) over the compact engine, for questions such as "does
+    Player 1 finish the game at least 4 seeds ahead?". Instead of a value, every position gets a
+    proof number and a disproof number: the least number of positions that must still be solved to
+    prove (or disprove) it. The search always expands the position that is cheapest to solve, so a
+    forced win (or a position that is clearly not one) is found long before a full alpha-beta search
+    would finish. Positions are solved as soon as a Mancala/Score holds enough seeds to decide the
+    question, without playing to the end.
+
+    The table of proof and disproof numbers is kept between proofs (solved positions stay solved),
+    so the proofs of the positions of one game reuse each other.
+    """
+    def __init__(self, table_size=TABLE_SIZE):
+        self.table = {}
+        self.table_size = table_size
+        self.nodes = 0
+        self.player = self.margin = self.total = self.limit = None
+
+    def prove(self, board, to_move, player='1', margin=1, budget=NODE_BUDGET):
+        """
+        Find out whether a player finishes the game at least margin seeds ahead of the other with
+        best play from both sides.
+
+        Parameters:
+        board (list): The compact board.
+        to_move (str): The player to move.
+        player (str): The player who must win (not necessarily the player to move).
+        margin (int): The least difference between the players' final scores (1 to win, 0 not to lose).
+        budget (int): The most positions to expand.
+
+        Returns:
+        bool: True if proven, False if disproven, None if the budget ran out first.
+        """
+        self.player, self.margin, self.total = player, margin, sum(board)
+        result = self.decided(board)
+        if result is not None:
+            return result
+        self.limit = self.nodes + budget
+        proof, disproof = self.search(board, to_move, INFINITY, INFINITY)
+        if len(self.table) > self.table_size:
+            # solved positions stay true for every later proof; the others are only estimates:
+            self.table = {key: numbers for key, numbers in self.table.items() if 0 in numbers}
+        return True if proof == 0 else False if disproof == 0 else None
+
+    def decided(self, board):
+        # the final difference of the scores is 2 * (the player's final score) - total; the player's
+        # score can only grow, and can never be more than the seeds the other player has not taken:
+        own, other = board[engine.STORE[self.player]], board[engine.STORE[engine.OPPONENT[self.player]]]
+        if 2 * own - self.total >= self.margin:
+            return True
+        if self.total - 2 * other < self.margin:
+            return False
+        return None
+
+    def numbers(self, board, to_move, key):
+        # the proof and disproof numbers of a position: from the table, from its scores if they
+        # decide it, or else estimated from its number of moves (every move of the player who must
+        # win is a way to prove it, every move of the other a way to disprove it):
+        numbers = self.table.get(key)
+        if numbers is not None:
+            return numbers
+        result = self.decided(board)
+        if result is not None:
+            return (0, INFINITY) if result else (INFINITY, 0)
+        moves = sum(1 for pit in engine.PITS[to_move] if board[pit])
+        return (1, moves) if to_move == self.player else (moves, 1)
+
+    def search(self, board, to_move, proof_threshold, disproof_threshold):
+        """
+        Expand a position until its proof number reaches proof_threshold or its disproof number
+        reaches disproof_threshold (or the node budget is used up), then store its numbers.
+
+        Returns:
+        tuple: (proof number, disproof number).
+        """
+        self.nodes += 1
+        children = []
+        for pit in engine.get_valid_moves(board, to_move):
+            child = board[:]
+            _, _, _, next_player = engine.play(child, to_move, pit)
+            child_key = engine.position_key(child, next_player), self.player, self.margin
+            children.append((child, next_player, child_key))
+        attacking = to_move == self.player
+        key = engine.position_key(board, to_move), self.player, self.margin
+
+        while True:
+            numbers = [self.numbers(*child) for child in children]
+            # the player who must win needs one proven move, the other player needs one disproven move:
+            if attacking:
+                proof = min(child_proof for child_proof, _ in numbers)
+                disproof = min(INFINITY, sum(child_disproof for _, child_disproof in numbers))
+            else:
+                proof = min(INFINITY, sum(child_proof for child_proof, _ in numbers))
+                disproof = min(child_disproof for _, child_disproof in numbers)
+            if proof >= proof_threshold or disproof >= disproof_threshold or self.nodes >= self.limit:
+                self.table[key] = proof, disproof
+                return proof, disproof
+
+            # expand the child that is cheapest to solve, until it stops being the cheapest (its
+            # threshold is one more than the next best child's number):
+            side = 0 if attacking else 1
+            order = sorted(range(len(numbers)), key=lambda index: numbers[index][side])
+            best = order[0]
+            second = numbers[order[1]][side] if len(order) > 1 else INFINITY
+            child_proof, child_disproof = numbers[best]
+            if attacking:
+                child_proof_threshold = min(proof_threshold, second + 1)
+                child_disproof_threshold = min(INFINITY, disproof_threshold - disproof + child_disproof)
+            else:
+                child_disproof_threshold = min(disproof_threshold, second + 1)
+                child_proof_threshold = min(INFINITY, proof_threshold - proof + child_proof)
+            child, next_player, _ = children[best]
+            self.search(child, next_player, child_proof_threshold, child_disproof_threshold)
+
+
+class Adjudicator:
+    """
+    Ends AI-vs-AI games early once their result is proven: when few seeds are left in the pits,
+    a proof search checks whether the player to move wins, or else whether the other player wins,
+    with best play (a game where neither wins is a draw). The result is the one of best play, so a
+    weaker agent that would have spoiled a won position is not given the chance.
+    """
+    def __init__(self, budget=NODE_BUDGET, max_seeds=ADJUDICATION_SEEDS):
+        self.budget = budget
+        self.max_seeds = max_seeds
+        self.search = ProofSearch()
+        # statistics: positions checked, games adjudicated and the time spent on it:
+        self.attempts = 0
+        self.adjudicated = 0
+        self.seconds = 0.0
+
+    def adjudicate(self, board, player):
+        """
+        Check whether the result of a game is decided.
+
+        Parameters:
+        board (list): The compact board.
+        player (str): The player to move.
+
+        Returns:
+        int: The result, as returned by statistics.run_game (1 or 2 for the winner, 0 for a draw),
+             or None if it is not proven.
+        """
+        if sum(board) - board[engine.STORE['1']] - board[engine.STORE['2']] > self.max_seeds:
+            return None
+        started = time.perf_counter()
+        self.attempts += 1
+        opponent = engine.OPPONENT[player]
+        result = None
+        wins = self.search.prove(board, player, player, 1, self.budget)
+        if wins:
+            result = int(player)
+        elif wins is not None:
+            loses = self.search.prove(board, player, opponent, 1, self.budget)
+            if loses is not None:
+                result = int(opponent) if loses else 0
+        self.seconds += time.perf_counter() - started
+        if result is not None:
+            self.adjudicated += 1
+        return result
+
+    def report(self):
+        return (f"Adjudicated {self.adjudicated} games ({self.attempts} positions checked, "
+                f"{self.search.nodes} proof nodes, {self.seconds:.2f} s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prove or disprove that a player wins a Mancala position by a margin.')
+    parser.add_argument('positions', nargs='+', help="positions in text notation, e.g. '0,0,3,1,0,2/20/1,0,0,2,1,0/18 1'")
+    parser.add_argument('--player', choices=['1', '2'], help='the player who must win (default: the player to move)')
+    parser.add_argument('--margin', type=int, default=1, help='the least final difference of the scores')
+    parser.add_argument('--budget', type=int, default=100000, help='the most positions to expand')
+    args = parser.parse_args()
+
+    prover = ProofSearch()
+    for text in args.positions:
+        position, side = engine.from_text(text)
+        started, nodes = time.perf_counter(), prover.nodes
+        proven = prover.prove(position, side, args.player or side, args.margin, args.budget)
+        answer = {True: 'proven', False: 'disproven', None: 'unknown (budget exhausted)'}[proven]
+        print(f'{text}: {answer} in {prover.nodes - nodes} nodes, {time.perf_counter() - started:.3f} s')
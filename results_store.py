@@ -0,0 +1,211 @@
+# import required libraries:
+# json: agent configurations are stored (and hashed) as JSON.
+# sqlite3: the results are kept in an SQLite database file.
+# hashlib: agent configurations are identified by a hash.
+# argparse: command line interface for the summary queries.
+import json
+import sqlite3
+import hashlib
+import argparse
+
+# the attributes of an agent that depend on its seat rather than its configuration:
+SEAT_ATTRIBUTES = ('player', 'opponent', 'kernel_player')
+# the attributes of an agent that only hold search state (of the running search, or shared with other
+# processes; whether an agent uses a shared table is part of its configuration, see agent_config):
+SEARCH_ATTRIBUTES = ('deadline', 'shared_namespace', 'quiescence_left', 'quiescence_cuts', 'stats')
+# the attributes of an agent that only choose how the same search is computed, with the same values
+# (use_kernel depends on whether numba is installed; the kernel leaves the table and the history
+# below the root empty, so it may choose another move among equally good ones):
+ENGINE_ATTRIBUTES = ('incremental', 'use_kernel')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS configs (
+    hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    player_1 TEXT NOT NULL,
+    player_2 TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    result INTEGER NOT NULL,
+    score_1 INTEGER NOT NULL,
+    score_2 INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    adjudicated INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (player_1, player_2, seed)
+);
+CREATE INDEX IF NOT EXISTS games_by_player_2 ON games (player_2, player_1);
+'''
+
+
+def agent_config(name, agent, adjudicate=0):
+    """
+    Describe the configuration of an agent: its name, class and every setting that changes how it
+    plays (plain attributes such as the depth, lists and dicts such as the evaluation weights and the
+    ProbCut parameters, and a digest of the parameters of its value network or leaf queue).
+    Attributes that only depend on the seat, and the search state, are left out.
+
+    Parameters:
+    name (str): The agent name (e.g. 'minimax').
+    agent: The agent.
+    adjudicate (int): The node budget of the adjudication of its games (see proof_search.py), or 0
+                      if they are played to the end: adjudicated games end earlier, with the result
+                      of best play, so they are kept apart from the others.
+
+    Returns:
+    dict: The configuration, ready to be hashed.
+    """
+    config = {'name': name, 'class': type(agent).__name__}
+    for attribute, value in sorted(vars(agent).items()):
+        if attribute in SEAT_ATTRIBUTES or attribute in SEARCH_ATTRIBUTES or attribute in ENGINE_ATTRIBUTES:
+            continue
+        if attribute == 'shared_table':
+            # the results with a shared table are not reproducible (they depend on what the other
+            # workers stored), so they are kept apart from the ones without:
+            if value is not None:
+                config[attribute] = True
+        elif attribute == 'clock':
+            # an agent on a game clock is described by its time control (and left as it was without one):
+            if value is not None:
+                config[attribute] = [value.base, value.increment]
+        elif value is None or isinstance(value, (int, float, str, bool)):
+            config[attribute] = value
+        elif isinstance(value, (list, tuple, dict)):
+            # (as sorted JSON, so that equal settings give the same hash whatever their order):
+            config[attribute] = json.loads(json.dumps(value, sort_keys=True))
+        elif hasattr(value, 'params'):
+            config[attribute] = hashlib.sha1(json.dumps(value.params).encode()).hexdigest()
+    table = getattr(agent, 'table', None)
+    if table is not None:
+        config['table_size'] = table.capacity
+    if adjudicate:
+        config['adjudicate'] = adjudicate
+    return config
+
+
+def config_hash(config):
+    """Return the hash that identifies an agent configuration."""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ResultStore:
+    """
+    An SQLite database of game results, keyed by the configuration hash of the agent in each seat
+    and the seed of the game. Games already stored for a pairing are skipped on reruns, new games
+    are appended, and the summaries are computed by the database from the stored results.
+    """
+    def __init__(self, path):
+        # the connection may be used from several threads (e.g. the tournament coordinator), which
+        # must not use it at the same time:
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # the write-ahead log makes appending results cheap, and lets summaries run during a tournament:
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        # (databases created before games could be adjudicated get the column, with every game finished):
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(games)')}
+        if 'adjudicated' not in columns:
+            with self.connection:
+                self.connection.execute('ALTER TABLE games ADD COLUMN adjudicated INTEGER NOT NULL DEFAULT 0')
+
+    def add_config(self, name, agent, adjudicate=0):
+        """
+        Store the configuration of an agent (if it is new), with the adjudication budget of its
+        games (see agent_config).
+
+        Returns:
+        str: The configuration hash, used to store and query its games.
+        """
+        config = agent_config(name, agent, adjudicate)
+        key = config_hash(config)
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO configs VALUES (?, ?, ?)',
+                                    (key, name, json.dumps(config, sort_keys=True)))
+        return key
+
+    def played_seeds(self, player_1, player_2):
+        """Return the set of seeds already played by a pairing of configuration hashes."""
+        rows = self.connection.execute('SELECT seed FROM games WHERE player_1 = ? AND player_2 = ?',
+                                       (player_1, player_2))
+        return {seed for seed, in rows}
+
+    def seed_results(self, player_1, player_2):
+        """Return the result (1, 2 or 0) of every game stored for a pairing, by seed."""
+        rows = self.connection.execute('SELECT seed, result FROM games WHERE player_1 = ? AND player_2 = ?',
+                                       (player_1, player_2))
+        return dict(rows.fetchall())
+
+    def add_results(self, player_1, player_2, results):
+        """
+        Append game results (dicts with 'seed', 'result', 'score', 'moves' and, for the games stopped
+        by an adjudicator, 'adjudicated': True). A game that is already stored is ignored, so results
+        can be added more than once.
+
+        Returns:
+        int: The number of new games stored.
+        """
+        with self.connection:
+            cursor = self.connection.executemany(
+                'INSERT OR IGNORE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((player_1, player_2, result['seed'], result['result'], result['score'][0], result['score'][1],
+                  result['moves'], int(bool(result.get('adjudicated')))) for result in results))
+        return cursor.rowcount
+
+    def summary(self, player_1=None, player_2=None):
+        """
+        Summarize the stored games by pairing, optionally only for the given configurations.
+
+        Returns:
+        list: One dict per pairing with the names and hashes of both agents, the number of games,
+              wins of each player, draws, the number of adjudicated games, and the average score
+              margin (Player 1 minus Player 2) and game length in moves of the games played to the
+              end (None if there are none: an adjudicated game stops with a partial score).
+        """
+        conditions, parameters = [], []
+        for column, value in (('player_1', player_1), ('player_2', player_2)):
+            if value is not None:
+                conditions.append(f'g.{column} = ?')
+                parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self.connection.execute(f'''
+            SELECT g.player_1, c1.name, g.player_2, c2.name, COUNT(*),
+                   SUM(g.result = 1), SUM(g.result = 2), SUM(g.result = 0),
+                   SUM(g.adjudicated), AVG(CASE WHEN NOT g.adjudicated THEN g.score_1 - g.score_2 END),
+                   AVG(CASE WHEN NOT g.adjudicated THEN g.moves END)
+            FROM games g JOIN configs c1 ON c1.hash = g.player_1 JOIN configs c2 ON c2.hash = g.player_2
+            {where}
+            GROUP BY g.player_1, g.player_2
+            ORDER BY c1.name, c2.name''', parameters)
+        keys = ('player_1', 'name_1', 'player_2', 'name_2', 'games', 'wins_1', 'wins_2', 'draws', 'adjudicated',
+                'margin', 'moves')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+def print_summary(rows):
+    for row in rows:
+        games = row['games']
+        print(f"{row['name_1']} ({row['player_1']}) vs {row['name_2']} ({row['player_2']}): {games} games")
+        print(f"  Player 1 wins: {row['wins_1']} ({row['wins_1'] / games * 100:.2f}%)  "
+              f"Player 2 wins: {row['wins_2']} ({row['wins_2'] / games * 100:.2f}%)  "
+              f"Draws: {row['draws']} ({row['draws'] / games * 100:.2f}%)")
+        if row['adjudicated']:
+            print(f"  Adjudicated: {row['adjudicated']} (left out of the averages)")
+        if row['margin'] is not None:
+            print(f"  average margin (Player 1 - Player 2): {row['margin']:+.2f}  "
+                  f"average length: {row['moves']:.1f} moves")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize the game results stored by statistics.py and tournament.py.')
+    parser.add_argument('database')
+    parser.add_argument('--player-1', help='only the games with this configuration hash as Player 1')
+    parser.add_argument('--player-2', help='only the games with this configuration hash as Player 2')
+    args = parser.parse_args()
+
+    store = ResultStore(args.database)
+    print_summary(store.summary(args.player_1, args.player_2))
+    store.close()
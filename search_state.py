@@ -0,0 +1,126 @@
+# import required libraries:
+# os: check whether a saved state file exists.
+# pickle: save and reload the search state between runs (imported by save_states and load_states
+# only, since every agent imports this module for its tables).
+import os
+
+# the kinds of values stored in the transposition table:
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    A table of searched positions, kept between moves (and games) instead of being cleared.
+    Each entry remembers the generation (search number) when it was last stored; entries that
+    have not been used for max_age searches are dropped once the table is over capacity, so the
+    table is aged rather than cleared.
+
+    Entries are (depth, flag, value, best move, generation), where value is from the point of view
+    of the side to move in the position, so that they do not depend on which agent stored them.
+    """
+    def __init__(self, capacity=1000000, max_age=8):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.entries = {}
+        self.generation = 0
+        # statistics:
+        self.lookups = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Start a new search (one per move): age the table and prune it if it is too big."""
+        self.generation += 1
+        if len(self.entries) > self.capacity:
+            self.prune()
+
+    def prune(self):
+        # drop the entries that are too old; if that is not enough, keep the newest and deepest half:
+        oldest = self.generation - self.max_age
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[4] >= oldest}
+        if len(self.entries) > self.capacity:
+            ranked = sorted(self.entries.items(), key=lambda item: (item[1][4], item[1][0]), reverse=True)
+            self.entries = dict(ranked[:self.capacity // 2])
+
+    def lookup(self, key):
+        """
+        Get the entry for a position.
+
+        Returns:
+        tuple: (depth, flag, value, best move, generation), or None if the position is not stored.
+        """
+        self.lookups += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key, depth, flag, value, move):
+        # keep a deeper entry from the current search rather than replacing it with a shallower one:
+        entry = self.entries.get(key)
+        if entry is not None and entry[4] == self.generation and entry[0] > depth:
+            return
+        self.entries[key] = (depth, flag, value, move, self.generation)
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class HistoryTable:
+    """
+    The history heuristic: moves that caused cutoffs get a score (depth squared), and moves are
+    searched in order of decreasing score. Scores are halved at every new search, so that old
+    information fades out instead of being thrown away.
+    """
+    def __init__(self):
+        self.scores = {}
+
+    def new_search(self):
+        self.scores = {key: score // 2 for key, score in self.scores.items() if score > 1}
+
+    def add(self, player, move, depth):
+        self.scores[player, move] = self.scores.get((player, move), 0) + depth * depth
+
+    def order(self, player, moves, first=None, tactical=()):
+        """
+        Sort the moves by history score, with the given move (e.g. from the table) first and the
+        tactical moves (extra turns and captures) before the quiet ones.
+        """
+        scores = self.scores
+        ordered = sorted(moves, key=lambda move: (move in tactical, scores.get((player, move), 0)), reverse=True)
+        if first in ordered:
+            ordered.remove(first)
+            ordered.insert(0, first)
+        return ordered
+
+
+def save_states(path, agents):
+    """
+    Save the search state of the given agents (one per seat) to a file. Agents without a search
+    state (get_state) are skipped.
+
+    Parameters:
+    path (str): The file to write.
+    agents (dict): The agents by seat, e.g. {'1': ai_agent1, '2': ai_agent2}.
+    """
+    import pickle
+    states = {seat: agent.get_state() for seat, agent in agents.items() if hasattr(agent, 'get_state')}
+    with open(path, 'wb') as file:
+        pickle.dump(states, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_states(path, agents):
+    """
+    Load the search state saved by save_states into the given agents, if the file exists.
+
+    Returns:
+    bool: True if a state file was loaded.
+    """
+    if not os.path.exists(path):
+        return False
+    import pickle
+    with open(path, 'rb') as file:
+        states = pickle.load(file)
+    for seat, agent in agents.items():
+        if seat in states and hasattr(agent, 'set_state'):
+            agent.set_state(states[seat])
+    return True
@@ -0,0 +1,174 @@
+# import required libraries:
+# json: the settings of an evaluation are written out to compute its namespace.
+# zlib: the namespace is a checksum of those settings.
+# multiprocessing: the striped locks, and the shared memory block every worker process maps.
+import json
+import zlib
+import multiprocessing
+from multiprocessing import shared_memory
+import mancala_engine as engine
+
+# the block is read and written as 64-bit words. An entry takes a slot of SLOT_WORDS words: the low
+# 64 bits of the canonical position key; the high bits of the key with the namespace and an in-use
+# bit; the value for the side to move (a float); and the depth, the kind of value
+# (search_state.EXACT, LOWER_BOUND or UPPER_BOUND) and the canonical move as a pit index (NO_MOVE
+# for none), packed together:
+SLOT_WORDS = 4
+KEY_MASK = (1 << 64) - 1
+IN_USE = 1 << 63
+NO_MOVE = 255
+
+# each bucket has two slots: the first keeps the deepest entry, the second the most recent other
+# one (so deep entries survive, and new positions still find room):
+BUCKET_WORDS = 2 * SLOT_WORDS
+
+# the counters of each stripe, at the start of the block:
+LOOKUPS, HITS, STORES = 0, 1, 2
+COUNTER_WORDS = 3
+
+# the number of locks; a bucket is guarded by the lock of its stripe (bucket number modulo STRIPES),
+# so processes only wait for each other when they use buckets of the same stripe:
+STRIPES = 64
+
+
+def namespace(*settings):
+    """
+    Get the namespace of an evaluation: entries are only shared between searches with the same
+    settings (e.g. evaluation weights and selective search options), whose values agree.
+
+    Returns:
+    int: A 16-bit number derived from the settings.
+    """
+    return zlib.crc32(json.dumps(settings, sort_keys=True, default=str).encode()) & 0xFFFF
+
+
+class SharedTable:
+    """
+    A transposition table in shared memory, for the worker processes of one machine: every worker
+    reads and writes the same fixed-size block, so a position searched by one of them (e.g. an
+    opening) is not searched again by the others. Memory use is fixed when the table is created,
+    and the counters of lookups, hits and stores are kept in the block, for all the workers.
+
+    The table is created once by the parent process and given to the workers through the
+    initializer of their pool (the locks can only be passed when a process is started); a copy
+    unpickled in a worker maps the same block. Only the table that created the block unlinks it.
+    """
+    def __init__(self, megabytes=64, stripes=STRIPES):
+        self.stripes = stripes
+        self.header_words = stripes * COUNTER_WORDS
+        self.buckets = max(1, (megabytes * 2 ** 17 - self.header_words) // BUCKET_WORDS)
+        self.memory = shared_memory.SharedMemory(create=True, size=8 * (self.header_words + self.buckets * BUCKET_WORDS))
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)]
+        self.owner = True
+        self.map()
+
+    def map(self):
+        # the same memory seen as unsigned 64-bit words, and as floats (for the values):
+        self.words = self.memory.buf.cast('Q')
+        self.values = self.memory.buf.cast('d')
+
+    def __getstate__(self):
+        return {'name': self.memory.name, 'stripes': self.stripes, 'buckets': self.buckets, 'locks': self.locks}
+
+    def __setstate__(self, state):
+        self.stripes, self.buckets, self.locks = state['stripes'], state['buckets'], state['locks']
+        self.header_words = self.stripes * COUNTER_WORDS
+        self.memory = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # unmap the block (and remove it, in the process that created it):
+        self.words.release()
+        self.values.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def locate(self, key, namespace):
+        # the stripe and the first word of the bucket of a position (the hash of a tuple of ints is
+        # the same in every process, unlike the hash of strings):
+        bucket = hash((key, namespace)) % self.buckets
+        return bucket % self.stripes, self.header_words + bucket * BUCKET_WORDS
+
+    def lookup(self, key, namespace=0):
+        """
+        Get the entry for a position, like search_state.TranspositionTable.lookup.
+
+        Parameters:
+        key (int): The canonical position key (see engine.canonical_key).
+        namespace (int): The namespace of the evaluation (see namespace()).
+
+        Returns:
+        tuple: (depth, flag, value, canonical best move label, 0), or None if the position is not stored.
+        """
+        stripe, slot = self.locate(key, namespace)
+        low, high = key & KEY_MASK, IN_USE | namespace << 32 | key >> 64
+        words, counters = self.words, stripe * COUNTER_WORDS
+        with self.locks[stripe]:
+            words[counters + LOOKUPS] += 1
+            if words[slot] != low or words[slot + 1] != high:
+                slot += SLOT_WORDS
+                if words[slot] != low or words[slot + 1] != high:
+                    return None
+            words[counters + HITS] += 1
+            value, packed = self.values[slot + 2], words[slot + 3]
+        move = packed & 0xFF
+        return packed >> 16, packed >> 8 & 0xFF, value, None if move == NO_MOVE else engine.PIT_LABELS[move], 0
+
+    def store(self, key, namespace, depth, flag, value, move):
+        """
+        Store the result of a search, keeping the deeper entry when the position is already stored.
+
+        Parameters:
+        key (int): The canonical position key.
+        namespace (int): The namespace of the evaluation.
+        depth (int): The search depth.
+        flag (int): The kind of value (search_state.EXACT, LOWER_BOUND or UPPER_BOUND).
+        value (float): The value for the side to move.
+        move (str): The canonical best move label (or None).
+        """
+        stripe, slot = self.locate(key, namespace)
+        low, high = key & KEY_MASK, IN_USE | namespace << 32 | key >> 64
+        packed = depth << 16 | flag << 8 | (NO_MOVE if move is None else engine.PIT_INDEX[move])
+        words = self.words
+        with self.locks[stripe]:
+            words[stripe * COUNTER_WORDS + STORES] += 1
+            first_depth = words[slot + 3] >> 16
+            if words[slot] == low and words[slot + 1] == high:
+                if depth < first_depth:
+                    return
+            elif depth >= first_depth:
+                # the deeper entry takes the first slot, and the one it replaces the second:
+                words[slot + SLOT_WORDS:slot + 2 * SLOT_WORDS] = words[slot:slot + SLOT_WORDS]
+            else:
+                slot += SLOT_WORDS
+            words[slot], words[slot + 1], words[slot + 3] = low, high, packed
+            self.values[slot + 2] = value
+
+    def stats(self):
+        """
+        Get the counters of all the workers.
+
+        Returns:
+        dict: {'lookups', 'hits', 'stores', 'hit_rate', 'entries' (the capacity), 'bytes'}.
+        """
+        words = self.words
+        lookups, hits, stores = (sum(words[stripe * COUNTER_WORDS + counter] for stripe in range(self.stripes))
+                                 for counter in (LOOKUPS, HITS, STORES))
+        return {'lookups': lookups, 'hits': hits, 'stores': stores, 'hit_rate': hits / lookups if lookups else 0.0,
+                'entries': 2 * self.buckets, 'bytes': self.memory.size}
+
+    def hit_rate(self):
+        return self.stats()['hit_rate']
+
+    def report(self):
+        stats = self.stats()
+        return (f"shared table: {stats['bytes'] / 2 ** 20:.0f} MB ({stats['entries']} entries), "
+                f"{stats['lookups']} lookups, {stats['hit_rate'] * 100:.1f}% hits, {stats['stores']} stores")
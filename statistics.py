@@ -1,12 +1,66 @@
-from ai_agents2 import RandomAgent, MediumAgent, MinimaxAgent
+import json
+import math
+import random
+import mancala_engine as engine
 from mancala_ai_ai import Mancala
+from search_state import save_states, load_states
+from results_store import ResultStore, print_summary
+from openings import read_openings, opening_seed
+from latency import LatencyRecorder
+from time_control import GameClock, parse_time_control
+from proof_search import Adjudicator
+from headless import is_agent, create_agent
 
+# the number of games played between two writes to the results database:
+RESULTS_BATCH_SIZE = 100
 
-def run_game(ai_agent1, ai_agent2):
-    game = Mancala(ai_agent1, ai_agent2, verbose=False)  # Set verbose to False
 
+def run_game(ai_agent1, ai_agent2, record=None, seed=None, position=None, latency=None, clock=None,
+             adjudicator=None):
+    # with a seed, the starting player and the random choices of the agents depend only on the seed:
+    if seed is not None:
+        random.seed(seed)
+    # the game starts from the given position (in text notation), or from the start position:
+    if position is not None:
+        game = Mancala.from_position(position, ai_agent1, ai_agent2)
+    else:
+        game = Mancala(ai_agent1, ai_agent2, verbose=False)  # Set verbose to False
+    # with a latency recorder, every move of the agents is timed:
+    game.latency = latency
+    # every game starts with empty search tables (see MinimaxAgent.new_game); the agents that manage
+    # their time play on the game clock (and without one, to a fixed depth) and get their own clocks
+    # back at the end of the game. A player who runs out of time loses:
+    agent_clocks = [(agent, agent.clock) for agent in (ai_agent1, ai_agent2) if hasattr(agent, 'clock')]
+    for agent in (ai_agent1, ai_agent2):
+        if hasattr(agent, 'new_game'):
+            agent.new_game()
+    for agent, _ in agent_clocks:
+        agent.clock = clock
+
+    # if a record dict is given, fill it with the starting player, the moves and the final score:
+    if record is not None:
+        record['first'] = game.player_turn
+        record['moves'] = ''
+        if position is not None:
+            record['start'] = position
+
+    adjudicated = None
     while not game.check_game_over():
-        move = game.ask_for_ai_move()
+        # with an adjudicator (see proof_search.py), the game stops once its result is proven:
+        if adjudicator is not None:
+            adjudicated = adjudicator.adjudicate(engine.board_from_dict(game.board), game.player_turn)
+            if adjudicated is not None:
+                break
+        if clock is not None:
+            clock.start()
+            move = game.ask_for_ai_move()
+            clock.stop(game.player_turn)
+            if clock.flagged is not None:
+                break
+        else:
+            move = game.ask_for_ai_move()
+        if record is not None:
+            record['moves'] += move
         last_pit = game.make_move(move)
         game.check_capture(last_pit)
 
@@ -16,6 +70,24 @@ def run_game(ai_agent1, ai_agent2):
         if last_pit != game.player_turn:
             game.change_turn()
 
+    if record is not None:
+        record['score'] = [game.board['1'], game.board['2']]
+        if clock is not None:
+            record['clock'] = [clock.remaining['1'], clock.remaining['2']]
+            if clock.flagged is not None:
+                record['flagged'] = clock.flagged
+        # (the score of an adjudicated game is the one when it was stopped):
+        if adjudicated is not None:
+            record['adjudicated'] = adjudicated
+
+    for agent, agent_clock in agent_clocks:
+        agent.clock = agent_clock
+
+    if adjudicated is not None:
+        return adjudicated
+    # a player who ran out of time loses, whatever the score:
+    if clock is not None and clock.flagged is not None:
+        return 2 if clock.flagged == '1' else 1
     if game.board['1'] > game.board['2']:
         return 1
     elif game.board['1'] < game.board['2']:
@@ -24,46 +96,238 @@ def run_game(ai_agent1, ai_agent2):
         return 0
 
 
+def print_clock_results(time_control, names, flags, time_left):
+    """Print the games lost on time and the time left at the end of the games, for both agents."""
+    base, increment = time_control
+    print(f"Game clock {base:g}+{increment:g} s:")
+    for number, (name, lost, remaining) in enumerate(zip(names, flags, time_left), 1):
+        if remaining:
+            print(f"  Agent {number} ({name} AI): {lost} games lost on time, time left at the end: "
+                  f"average {sum(remaining) / len(remaining):.2f} s, minimum {min(remaining):.2f} s")
+
+
+def paired_score(result, swapped):
+    # the score of Agent 1 in a game (1 for a win, 0.5 for a draw), in either seat:
+    return 0.5 if result == 0 else 1.0 if result == (2 if swapped else 1) else 0.0
+
+
+def print_paired_results(difficulty1, difficulty2, scores, pair_scores):
+    """
+    Print the results of paired games from the point of view of Agent 1, with a 95% confidence
+    interval computed from the pair scores: both games of a pair start from the same opening, so
+    the advantage of the opening cancels out and the interval is narrower than for unpaired games.
+    """
+    wins, draws = scores.count(1.0), scores.count(0.5)
+    losses = len(scores) - wins - draws
+    mean = sum(scores) / len(scores)
+    pairs = [sum(pair) / len(pair) for pair in pair_scores.values()]
+    if len(pairs) > 1:
+        variance = sum((pair - mean) ** 2 for pair in pairs) / (len(pairs) - 1)
+        margin = 1.96 * math.sqrt(variance / len(pairs))
+    else:
+        margin = float('nan')
+    print(f"Results of {len(scores)} games ({len(pairs)} openings from both seats, stored games included):")
+    print(f"Agent 1 ({difficulty1} AI) wins: {wins}")
+    print(f"Agent 2 ({difficulty2} AI) wins: {losses}")
+    print(f"Draws: {draws}")
+    print(f"Agent 1 ({difficulty1} AI) score: {mean * 100:.2f}% +/- {margin * 100:.2f}% (95% confidence)")
+
+
 def main():
     # prompt the user to choose difficulty levels for both players:
-    print("Choose the AI Agent 1: random, medium, minimax")
+    print("Choose the AI Agent 1: random, medium, minimax, mcts (minimax options: +lmr, +probcut, +d<depth>)")
     difficulty1 = input().lower()
 
-    while difficulty1 not in ['random', 'medium', 'minimax']:
-        print("Invalid input. Please enter 'random', 'medium', 'minimax'")
+    while not is_agent(difficulty1):
+        print("Invalid input. Please enter 'random', 'medium', 'minimax', 'mcts' (e.g. 'minimax+lmr+d6')")
         difficulty1 = input().lower()
 
-    print("Choose the AI Agent 2: random, medium, minimax")
+    print("Choose the AI Agent 2: random, medium, minimax, mcts (minimax options: +lmr, +probcut, +d<depth>)")
     difficulty2 = input().lower()
 
-    while difficulty2 not in ['random', 'medium', 'minimax']:
-        print("Invalid input. Please enter 'random', 'medium', 'minimax'")
+    while not is_agent(difficulty2):
+        print("Invalid input. Please enter 'random', 'medium', 'minimax', 'mcts' (e.g. 'minimax+lmr+d6')")
         difficulty2 = input().lower()
 
     print("Enter the number of games to be played:")
     num_games = int(input())
 
+    print("Enter a file to save the game records to (leave empty to skip):")
+    records_file = input().strip()
+
+    print("Enter a file to keep the agents' search state in between runs (leave empty to skip):")
+    state_file = input().strip()
+
+    print("Enter a results database to store the games in and skip the ones already played (leave empty to skip):")
+    results_database = input().strip()
+
+    print("Enter an openings file to play each opening from both seats (leave empty to start every game from the start position):")
+    openings_file = input().strip()
+
+    print("Enter a move time limit in milliseconds to count the slower moves (leave empty to skip):")
+    sla = input().strip()
+
+    print("Enter a file to dump the move latency histograms to (leave empty to skip):")
+    latency_file = input().strip()
+
+    print("Enter a game clock as base+increment in seconds, e.g. 30+0.1 (leave empty to search to a fixed depth):")
+    time_control = input().strip()
+    while time_control:
+        try:
+            time_control = parse_time_control(time_control)
+            break
+        except ValueError:
+            print("Invalid input. Please enter a game clock such as 30+0.1, or leave it empty")
+            time_control = input().strip()
+
+    print("Enter a node budget to stop games once a proof search finds their result (leave empty to play every game to the end):")
+    proof_budget = input().strip()
+    while proof_budget and not (proof_budget.isdigit() and int(proof_budget) > 0):
+        print("Invalid input. Please enter a positive number of nodes, or leave it empty")
+        proof_budget = input().strip()
+    adjudicator = Adjudicator(int(proof_budget)) if proof_budget else None
+
     # assign AI agents based on the chosen difficulty levels:
-    if difficulty1 == 'random':
-        ai_agent1 = RandomAgent("1")
-    elif difficulty1 == 'medium':
-        ai_agent1 = MediumAgent("1")
-    elif difficulty1 == 'minimax':
-        ai_agent1 = MinimaxAgent("1")
-
-    if difficulty2 == 'random':
-        ai_agent2 = RandomAgent("2")
-    elif difficulty2 == 'medium':
-        ai_agent2 = MediumAgent("2")
-    elif difficulty2 == 'minimax':
-        ai_agent2 = MinimaxAgent("2")
+    ai_agent1 = create_agent(difficulty1, "1")
+    ai_agent2 = create_agent(difficulty2, "2")
+
+    # with a game clock, the agents that manage their time get one (a new clock is started for every
+    # game, see run_game); their time control is part of their configuration in the results database:
+    if time_control:
+        for agent in (ai_agent1, ai_agent2):
+            if hasattr(agent, 'clock'):
+                agent.clock = GameClock(*time_control)
+
+    # the games to play, as (Player 1 agent, Player 2 agent, start position, seed, whether the seats
+    # are swapped). With openings, the games are played in pairs: every opening is played once with
+    # each agent in each seat, with the same seed:
+    if openings_file:
+        openings = read_openings(openings_file)[:(num_games + 1) // 2]
+        swapped_agent1 = create_agent(difficulty2, "1")
+        swapped_agent2 = create_agent(difficulty1, "2")
+        games = []
+        for position in openings:
+            games.append((ai_agent1, ai_agent2, position, opening_seed(position), False))
+            games.append((swapped_agent1, swapped_agent2, position, opening_seed(position), True))
+    else:
+        games = [(ai_agent1, ai_agent2, None, None, False)] * num_games
+    num_games = len(games)
+
+    # reload the transposition tables and history scores of a previous run (of the agents in both
+    # seats, and with openings of the swapped agents too); with a state file, the agents keep them
+    # from game to game as well (so the games no longer only depend on their seeds):
+    agents = {'1': ai_agent1, '2': ai_agent2}
+    if openings_file:
+        agents.update({'swapped 1': swapped_agent1, 'swapped 2': swapped_agent2})
+    if state_file:
+        for agent in agents.values():
+            if hasattr(agent, 'keep_tables'):
+                agent.keep_tables = True
+        if load_states(state_file, agents):
+            print(f"Loaded the search state from {state_file}")
+
+    # with openings: the score of Agent 1 in every game, and in every pair of games:
+    scores = []
+    pair_scores = {}
+
+    # with a results database, game number n from the start position is played with seed n, and the
+    # games whose seed is already stored for their pairing of agent configurations are skipped. With
+    # openings, the stored games of the suite count in the paired results, so a pair is completed by
+    # playing only its missing game, and the results cover the whole suite:
+    store = None
+    if results_database:
+        store = ResultStore(results_database)
+        configs = {id(agent): store.add_config(name, agent, adjudicator.budget if adjudicator else 0) for agent, name in (
+            (ai_agent1, difficulty1), (ai_agent2, difficulty2))}
+        if openings_file:
+            configs[id(swapped_agent1)] = configs[id(ai_agent2)]
+            configs[id(swapped_agent2)] = configs[id(ai_agent1)]
+        else:
+            games = [(agent1, agent2, None, number, False) for number, (agent1, agent2, _, _, _) in enumerate(games)]
+        played = {pairing: store.seed_results(*pairing) for pairing in
+                  {(configs[id(game[0])], configs[id(game[1])]) for game in games}}
+        new_games = []
+        for game in games:
+            _, _, position, seed, swapped = game
+            result = played[configs[id(game[0])], configs[id(game[1])]].get(seed)
+            if result is None:
+                new_games.append(game)
+            elif openings_file:
+                score = paired_score(result, swapped)
+                scores.append(score)
+                pair_scores.setdefault(position, []).append(score)
+        games = new_games
+        print(f"{num_games - len(games)} games already stored in {results_database}, playing {len(games)} new games")
 
     # Run the specified number of games
     results = {'1': 0, '2': 0, '0': 0}
+    # every record is appended to the records file as soon as its game ends, so memory use does not
+    # grow with the number of games (see game_records.write_records for the format):
+    records = open(records_file, 'a') if records_file else None
+    new_results = {}
+    latency = LatencyRecorder(float(sla) / 1000 if sla else None)
+    # with a game clock: the games lost on time, and the time left at the end of every game, by agent:
+    flags = [0, 0]
+    time_left = [[], []]
 
-    for _ in range(num_games):
-        result = run_game(ai_agent1, ai_agent2)
+    for agent1, agent2, position, seed, swapped in games:
+        names = [difficulty2, difficulty1] if swapped else [difficulty1, difficulty2]
+        record = {'agents': names} if records_file or store is not None else None
+        clock = GameClock(*time_control) if time_control else None
+        result = run_game(agent1, agent2, record, seed, position, latency, clock, adjudicator)
         results[str(result)] += 1
+        if clock is not None:
+            # the agent (0 for Agent 1, 1 for Agent 2) in the seat of each player:
+            seats = {'1': 1, '2': 0} if swapped else {'1': 0, '2': 1}
+            for player, agent in seats.items():
+                time_left[agent].append(clock.remaining[player])
+            if clock.flagged is not None:
+                flags[seats[clock.flagged]] += 1
+        if openings_file:
+            score = paired_score(result, swapped)
+            scores.append(score)
+            pair_scores.setdefault(position, []).append(score)
+        if records is not None:
+            records.write(json.dumps(record) + '\n')
+        if store is not None:
+            pairing = configs[id(agent1)], configs[id(agent2)]
+            new_results.setdefault(pairing, []).append({'seed': seed, 'result': result, 'score': record['score'],
+                                                        'moves': len(record['moves']),
+                                                        'adjudicated': 'adjudicated' in record})
+            if len(new_results[pairing]) >= RESULTS_BATCH_SIZE:
+                store.add_results(*pairing, new_results.pop(pairing))
+
+    if records is not None:
+        records.close()
+
+    if state_file:
+        save_states(state_file, agents)
+
+    # the move latencies of both agents, by search setting and game phase:
+    latency.report()
+    if latency_file:
+        latency.dump(latency_file)
+    if time_control:
+        print_clock_results(time_control, (difficulty1, difficulty2), flags, time_left)
+    if adjudicator is not None:
+        print(adjudicator.report())
+
+    if openings_file and scores:
+        print_paired_results(difficulty1, difficulty2, scores, pair_scores)
+
+    # the summary of every game stored for this pairing comes from the database:
+    if store is not None:
+        for pairing, pending_results in new_results.items():
+            store.add_results(*pairing, pending_results)
+        config1, config2 = configs[id(ai_agent1)], configs[id(ai_agent2)]
+        print_summary(store.summary(config1, config2))
+        if openings_file:
+            print_summary(store.summary(config2, config1))
+        store.close()
+        return
+
+    if openings_file:
+        return
 
     print(f"Results after playing {num_games} games:")
     print(f"Player 1 ({difficulty1} AI) wins: {results['1']}")
@@ -0,0 +1,63 @@
+# import required libraries:
+# os: the fuzz reproducer is written to a temporary directory.
+# tempfile: a temporary directory for the fuzz reproducer.
+# unittest: the test cases (they also run under pytest).
+import os
+import tempfile
+import unittest
+import mancala_engine as engine
+import perft
+import fuzz
+
+# the deepest perft checked by the tests (the expected counts of perft.EXPECTED):
+PERFT_DEPTH = 6
+
+# the fuzz run of the tests (every backend of fuzz.BACKENDS, the Game of headless.py included): a
+# fixed seed, so a failure is reproduced by running the tests again:
+FUZZ_SEED = 2024
+FUZZ_CASES = 1000
+
+
+class PerftTest(unittest.TestCase):
+    def test_expected_counts(self):
+        for backend in perft.BACKENDS:
+            with self.subTest(backend=backend):
+                nodes, terminals = perft.perft(engine.new_board(), '1', PERFT_DEPTH, backend)
+                for ply in range(1, PERFT_DEPTH + 1):
+                    self.assertEqual((nodes[ply], terminals[ply]), perft.EXPECTED[ply], f'depth {ply}')
+
+
+class PositionTest(unittest.TestCase):
+    def test_round_trip(self):
+        board = engine.new_board()
+        for player in ('1', '2'):
+            self.assertEqual(engine.from_text(engine.to_text(board, player)), (board, player))
+            self.assertEqual(engine.from_bytes(engine.to_bytes(board, player)), (board, player))
+
+    def test_too_many_seeds(self):
+        # a pit (or a board) with more seeds than a game is rejected, since the move tables and the
+        # position keys only go up to MAX_SEEDS:
+        for text in ('49,0,0,0,0,0/0/0,0,0,0,0,0/0 1', '60,0,0,0,0,0/0/1,0,0,0,0,0/0 1',
+                     '300,0,0,0,0,0/0/0,0,0,0,0,0/0 2', '4,4,4,4,4,4/1/4,4,4,4,4,4/0 1'):
+            with self.assertRaises(ValueError):
+                engine.from_text(text)
+        self.assertEqual(engine.from_text('48,0,0,0,0,0/0/0,0,0,0,0,0/0 1')[0][0], 48)
+        with self.assertRaises(ValueError):
+            engine.from_bytes(bytes([49] + [0] * (engine.NUM_PITS - 1)) + b'\x01')
+
+    def test_invalid_bytes(self):
+        data = engine.to_bytes(engine.new_board(), '1')
+        for invalid in (data[:-1], data + b'\x01', data[:-1] + b'\x00', data[:-1] + b'\x03', b''):
+            with self.assertRaises(ValueError):
+                engine.from_bytes(invalid)
+
+
+class FuzzTest(unittest.TestCase):
+    def test_quick_fuzz(self):
+        with tempfile.TemporaryDirectory() as directory:
+            reproducer = os.path.join(directory, 'fuzz_failure.json')
+            self.assertTrue(fuzz.fuzz(cases=FUZZ_CASES, seed=FUZZ_SEED, reproducer=reproducer))
+
+
+if __name__ == '__main__':
+    unittest.main()
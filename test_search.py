@@ -0,0 +1,111 @@
+# import required libraries:
+# random: the test positions are random playouts with a fixed seed.
+# unittest: the test cases (they also run under pytest).
+import random
+import unittest
+import mancala_engine as engine
+from headless import Game
+from ai_agents2 import MinimaxAgent
+
+# the number of test positions, and the depth of the selective search checks:
+POSITIONS = 40
+DEPTH = 6
+
+# the evaluation of the tests: the store difference, whatever the tuned weights in the working tree
+# (the ProbCut parameters of probcut_parameters.json are fitted for it):
+WEIGHTS = None
+
+
+def random_positions(count, seed=0):
+    """Return positions reached by random playouts from the start position (games not over)."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, player = engine.new_board(), rng.choice('12')
+        over = False
+        for _ in range(rng.randint(2, 24)):
+            _, _, over, player = engine.play(board, player, rng.choice(engine.get_valid_moves(board, player)))
+            if over:
+                break
+        if not over:
+            positions.append(Game.from_position(engine.to_text(board, player)))
+    return positions
+
+
+def brute_force(agent, game, depth, maximizing_player):
+    # the minimax value without pruning, tables or move ordering (seeds captured on the way count
+    # like in MinimaxAgent.minimax):
+    if depth == 0 or game.check_game_over():
+        return agent.evaluate(game)
+    player = agent.player if maximizing_player else agent.opponent
+    values = []
+    for move in game.get_valid_moves(player):
+        child = game.copy()
+        child.player_turn = player
+        before = child.board[player]
+        last_pit = child.make_move(move)
+        child.check_capture(last_pit)
+        captured = child.board[player] - before
+        extra_turn = last_pit == player
+        value = brute_force(agent, child, depth - 1, extra_turn if maximizing_player else not extra_turn)
+        values.append(value + captured if maximizing_player else value - captured)
+    return max(values) if maximizing_player else min(values)
+
+
+def search(game, depth, **settings):
+    """Search a position with a new agent for its side to move; returns (value, move, stats)."""
+    agent = MinimaxAgent(game.player_turn, depth, weights=WEIGHTS, **settings)
+    value, move = agent.minimax(game.copy(), depth, float('-inf'), float('inf'), True)
+    return value, move, agent.stats
+
+
+class SearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.positions = random_positions(POSITIONS)
+        cls.plain = [search(game, DEPTH) for game in cls.positions]
+
+    def test_plain_search_matches_brute_force(self):
+        for game in self.positions[:10]:
+            agent = MinimaxAgent(game.player_turn, 4, weights=WEIGHTS)
+            value, _ = agent.minimax(game.copy(), 4, float('-inf'), float('inf'), True)
+            self.assertEqual(value, brute_force(agent, game.copy(), 4, True))
+
+    def check_selective(self, counters, **settings):
+        # A/B check of a selective search against the plain one on the same positions: its counters
+        # fire, it searches fewer nodes in total, and it finds the plain value in most positions:
+        results = [search(game, DEPTH, **settings) for game in self.positions]
+        for counter in counters:
+            self.assertGreater(sum(stats[counter] for _, _, stats in results), 0, counter)
+        nodes = sum(stats['nodes'] for _, _, stats in results)
+        plain_nodes = sum(stats['nodes'] for _, _, stats in self.plain)
+        self.assertLess(nodes, plain_nodes)
+        same = sum(value == plain_value for (value, _, _), (plain_value, _, _) in zip(results, self.plain))
+        self.assertGreaterEqual(same, 0.75 * len(self.positions))
+
+    def test_late_move_reductions(self):
+        self.check_selective(('reductions', 'researches'), reductions=True)
+
+    def test_probcut(self):
+        self.check_selective(('probcuts',), probcut=True)
+
+    def test_lmr_and_probcut(self):
+        self.check_selective(('reductions', 'researches', 'probcuts'), reductions=True, probcut=True)
+
+    def test_probcut_returns_the_window_bound(self):
+        # a ProbCut cut returns beta (or alpha for the minimizing player), never a value outside the window:
+        cuts = 0
+        for game, (value, _, _) in zip(self.positions, self.plain):
+            agent = MinimaxAgent(game.player_turn, DEPTH, weights=WEIGHTS, probcut=True)
+            depth = max(agent.probcut)
+            for maximizing_player in (True, False):
+                alpha, beta = value - 2, value + 2
+                cut = agent.probcut_cut(game.copy(), depth, alpha, beta, maximizing_player)
+                if cut is not None:
+                    cuts += 1
+                    self.assertEqual(cut, beta if maximizing_player else alpha)
+        self.assertGreater(cuts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# import required libraries:
+# socket: find a free port for the test server.
+# asyncio: the server and its clients run in one event loop.
+# unittest: the test cases (they also run under pytest).
+import socket
+import asyncio
+import unittest
+import load_test
+import mancala_server
+from mancala_ai_ai import Mancala
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.port = free_port()
+        self.server = mancala_server.MancalaServer('127.0.0.1', self.port, workers=1, max_pending=1)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.shutdown(grace=1.0)
+
+    async def test_invalid_clock(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        await reader.readline()
+        for clock in ('abc', '-5', 'nan', 'inf', '0'):
+            writer.write(f'NEW random {clock}\n'.encode())
+            self.assertTrue((await reader.readline()).startswith(b'ERROR usage'))
+        # the session is still alive after the errors:
+        writer.write(b'NEW random 60\n')
+        self.assertTrue((await reader.readline()).startswith(b'BOARD'))
+        writer.write(b'QUIT\n')
+        writer.close()
+
+    async def test_search_timeout(self):
+        # a search over its time limit gets a random move, and keeps its pending slot until the worker
+        # has abandoned it:
+        self.server.pool.submit(mancala_server.ai_move, 'random', Mancala(verbose=False).to_position(binary=True)).result()
+        game = Mancala(verbose=False)
+        game.player_turn = '2'
+        move = await self.server.search('minimax', game, 0.0)
+        self.assertIn(move, game.get_valid_moves('2'))
+        await asyncio.wait_for(self.server.pending.acquire(), 5.0)
+        self.server.pending.release()
+
+    def test_ai_move_deadline(self):
+        game = Mancala(verbose=False)
+        game.player_turn = '2'
+        position = game.to_position(binary=True)
+        self.assertIsNone(mancala_server.ai_move('minimax', position, 0.0))
+        self.assertIn(mancala_server.ai_move('minimax', position, 5.0), game.get_valid_moves('2'))
+
+    async def test_load_test(self):
+        errors = await load_test.run_load_test('127.0.0.1', self.port, clients=3, games=1, agent='medium',
+                                               think_time=0.0, serve=False, workers=None)
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
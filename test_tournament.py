@@ -0,0 +1,30 @@
+# import required libraries:
+# unittest: the test cases (they also run under pytest).
+import unittest
+from tournament import Coordinator
+
+
+def game_result(seed):
+    return {'seed': seed, 'result': 1, 'score': [30, 18], 'moves': 40, 'adjudicated': False}
+
+
+class CoordinatorTest(unittest.TestCase):
+    def test_result_after_the_last_retry(self):
+        # a game that failed on its last attempt is completed by a late result of its worker, and
+        # counted once: the tournament is not finished while another game is still being played:
+        coordinator = Coordinator(('random', 'random'), 2, batch_size=1, max_attempts=1)
+        with coordinator.lock:
+            self.assertEqual(coordinator.lease('a'), [0])
+            self.assertEqual(coordinator.lease('b'), [1])
+        coordinator.release_worker('a')
+        self.assertEqual(coordinator.failed, 1)
+        coordinator.ingest([game_result(0)])
+        self.assertEqual((coordinator.completed, coordinator.failed), (1, 0))
+        self.assertFalse(coordinator.finished.is_set())
+        coordinator.ingest([game_result(1), game_result(0)])
+        self.assertEqual((coordinator.completed, coordinator.failed, coordinator.duplicates), (2, 0, 1))
+        self.assertTrue(coordinator.finished.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# import required libraries:
+# time: the clock measures real (wall clock) time.
+# collections: the time budget of a move is a named tuple.
+import time
+import collections
+import mancala_engine as engine
+
+# the time (in seconds) kept back on every move for the work done around the search (building the
+# game copy, recording the move, switching turns), so that the clock never runs out:
+MOVE_OVERHEAD = 0.01
+
+# the least number of moves the remaining time is shared between (see moves_to_go):
+MIN_MOVES_TO_GO = 6
+
+# how much more (or less) time a move gets in each phase of the game: the middlegame has the most
+# tactics (captures and chains of extra turns), the first moves and the endgame are simpler:
+PHASE_FACTOR = {'opening': 0.8, 'middlegame': 1.3, 'endgame': 1.0}
+
+# the share of its normal time a move gets once the game is decided (a store holds more than half
+# of the seeds, so the winner is known):
+DECIDED_FACTOR = 0.25
+
+# the hard limit of a move is at most this many times its normal (soft) time, and never more than
+# this share of the remaining time:
+HARD_FACTOR = 4.0
+MAX_SHARE = 0.4
+
+# a time budget in seconds: the search should not start a new iteration after soft, and must stop at hard:
+Budget = collections.namedtuple('Budget', ('soft', 'hard'))
+
+
+class GameClock:
+    """
+    A game clock with a base time per player and a Fischer increment, both in seconds: the time a
+    player uses on each move is taken from their remaining time, then the increment is added. A
+    player whose time runs out during a move has flagged (lost on time).
+    """
+    def __init__(self, base, increment=0.0):
+        self.base = base
+        self.increment = increment
+        self.remaining = {'1': base, '2': base}
+        self.flagged = None
+        self.started = None
+
+    def start(self):
+        """Start the clock of the player to move."""
+        self.started = time.perf_counter()
+
+    def stop(self, player):
+        """
+        Stop the clock of the player who just moved.
+
+        Returns:
+        float: The time used on the move, in seconds.
+        """
+        used = time.perf_counter() - self.started
+        self.remaining[player] -= used
+        if self.remaining[player] < 0:
+            if self.flagged is None:
+                self.flagged = player
+        else:
+            self.remaining[player] += self.increment
+        return used
+
+
+def parse_time_control(text):
+    """
+    Parse a time control written as 'base+increment' in seconds (e.g. '60+0.5', or '60' without
+    an increment).
+
+    Returns:
+    tuple: (base, increment).
+    """
+    base, _, increment = text.partition('+')
+    base, increment = float(base), float(increment or 0)
+    if base <= 0 or increment < 0:
+        raise ValueError(f'Invalid time control: {text}')
+    return base, increment
+
+
+def seeds_in_pits(board):
+    return sum(board[pit] for side in engine.PITS.values() for pit in side)
+
+
+def moves_to_go(board):
+    # a rough estimate of the moves a player still has to make: about one for every 3 seeds left in
+    # the pits (a move sows a few seeds into the stores, and the game ends when a side is empty):
+    return max(MIN_MOVES_TO_GO, seeds_in_pits(board) // 3)
+
+
+def allocate(clock, player, board, num_moves):
+    """
+    Decide how much time a move may take: the remaining time is shared between the moves still to
+    go (plus most of the increment), then weighted by the complexity of the position (the phase of
+    the game and the number of legal moves). Decided games get less time.
+
+    Parameters:
+    clock (GameClock): The game clock.
+    player (str): The player to move.
+    board (list): The compact board.
+    num_moves (int): The number of legal moves.
+
+    Returns:
+    Budget: The soft and hard time limits of the move, in seconds.
+    """
+    available = max(0.0, clock.remaining[player] - MOVE_OVERHEAD)
+    normal = available / moves_to_go(board) + 0.8 * clock.increment
+    factor = PHASE_FACTOR[engine.seeds_phase(seeds_in_pits(board))] * (0.6 + 0.1 * num_moves)
+    if max(board[engine.STORE['1']], board[engine.STORE['2']]) > engine.MAX_SEEDS // 2:
+        factor *= DECIDED_FACTOR
+    hard = min(HARD_FACTOR * normal * factor, MAX_SHARE * available)
+    return Budget(min(normal * factor, hard), hard)
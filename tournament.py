@@ -0,0 +1,408 @@
+# import required libraries:
+# os: the process id identifies a worker.
+# sys: progress is written on one line of stderr.
+# time: leases expire after a timeout, and the progress shows the speed.
+# json: game results can be saved as JSON lines.
+# socket: the host name identifies a worker.
+# argparse: command line interface.
+# threading: the coordinator serves every worker connection in its own thread.
+# collections: the queue of games to retry.
+# multiprocessing: local worker processes, and the connection between coordinator and workers.
+import os
+import sys
+import time
+import json
+import socket
+import argparse
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from headless import create_agent, run_game, agent_argument
+from results_store import ResultStore, print_summary
+from shared_table import SharedTable
+from proof_search import Adjudicator
+
+# the key used to authenticate the workers (override it with --authkey on a shared network):
+DEFAULT_AUTHKEY = b'mancala'
+
+# the transposition table shared by the worker processes of this machine, if any (see init_worker):
+_shared_table = None
+
+
+def init_worker(table):
+    # set up a local worker process with the shared table (it can only be passed when the process starts):
+    global _shared_table
+    _shared_table = table
+
+
+def play_game(agents, seed, cache, adjudicate=0):
+    """
+    Play one game with its own random seed (so the starting player and the random choices of the
+    agents depend only on the seed).
+
+    Parameters:
+    agents (list): The difficulty levels of Player 1 and Player 2.
+    seed (int): The random seed of the game.
+    cache (dict): The agents already created by this worker, reused between games.
+    adjudicate (int): The node budget of the proof search that stops a game once its result is
+                      proven (see proof_search.py), or 0 to play every game to the end.
+
+    Returns:
+    dict: {'seed', 'result' (1, 2 or 0 for a tie), 'score', 'moves', 'adjudicated'}.
+    """
+    key = tuple(agents)
+    if key not in cache:
+        cache[key] = (create_agent(agents[0], '1'), create_agent(agents[1], '2'))
+        for agent in cache[key]:
+            if _shared_table is not None and hasattr(agent, 'share_table'):
+                agent.share_table(_shared_table)
+    # the adjudicator keeps its proof table between the games of this worker:
+    adjudicator = None
+    if adjudicate:
+        if ('adjudicator', adjudicate) not in cache:
+            cache[('adjudicator', adjudicate)] = Adjudicator(adjudicate)
+        adjudicator = cache[('adjudicator', adjudicate)]
+    record = {}
+    result = run_game(*cache[key], record, seed, adjudicator=adjudicator)
+    return {'seed': seed, 'result': result, 'score': record['score'], 'moves': len(record['moves']),
+            'adjudicated': 'adjudicated' in record}
+
+
+class Coordinator:
+    """
+    Hands out games to workers and collects their results. Games are identified by their index
+    (the seed is base_seed + index); workers lease a batch of games at a time, and a lease that is
+    not completed in time, or whose worker disconnects, goes back into the queue to be retried on
+    another worker. Results are ingested at most once per game, so a game that was retried and
+    then reported twice is only counted once.
+
+    With a results database (see results_store.py), the games already stored for the pairing are
+    not played again, and every new result is stored as it arrives.
+    """
+    def __init__(self, agents, num_games, base_seed=0, batch_size=10, lease_timeout=300.0, max_attempts=3,
+                 output=None, database=None, adjudicate=0, shared_table=None):
+        self.agents = agents
+        self.num_games = num_games
+        self.base_seed = base_seed
+        self.batch_size = batch_size
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.adjudicate = adjudicate
+        self.output = open(output, 'a') if output else None
+
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        # the next game that was never handed out, the games to hand out again, and the games leased
+        # out (game -> (worker, deadline)); a game is done once its bit is set in the done bitmap, and
+        # has failed once it was handed out max_attempts times without a result (until a late result
+        # of one of its workers arrives after all):
+        self.next_game = 0
+        self.retry = collections.deque()
+        self.leases = {}
+        self.attempts = collections.Counter()
+        self.done = bytearray(num_games // 8 + 1)
+        self.completed = 0
+        self.failed = 0
+        self.failed_games = set()
+        self.duplicates = 0
+        self.adjudicated = 0
+        self.results = {'1': 0, '2': 0, '0': 0}
+        self.workers = set()
+        self.started = time.perf_counter()
+
+        self.store = None
+        self.skipped = 0
+        if database:
+            self.store = ResultStore(database)
+            # (the agents are configured like the ones of the workers, with the shared table if any):
+            players = create_agent(agents[0], '1'), create_agent(agents[1], '2')
+            for agent in players:
+                if shared_table is not None and hasattr(agent, 'share_table'):
+                    agent.share_table(shared_table)
+            self.configs = (self.store.add_config(agents[0], players[0], adjudicate),
+                            self.store.add_config(agents[1], players[1], adjudicate))
+            for seed in self.store.played_seeds(*self.configs):
+                game = seed - base_seed
+                if 0 <= game < num_games:
+                    self.done[game >> 3] |= 1 << (game & 7)
+                    self.skipped += 1
+            self.check_finished()
+
+    def is_done(self, game):
+        return self.done[game >> 3] & (1 << (game & 7))
+
+    def lease(self, worker):
+        # hand out the games to retry first, then new ones (must be called with the lock held):
+        now = time.monotonic()
+        games = []
+        while len(games) < self.batch_size:
+            if self.retry:
+                game = self.retry.popleft()
+                if self.is_done(game):
+                    continue
+            elif self.next_game < self.num_games:
+                game = self.next_game
+                self.next_game += 1
+                if self.is_done(game):
+                    continue
+            else:
+                break
+            self.leases[game] = (worker, now + self.lease_timeout)
+            self.attempts[game] += 1
+            games.append(game)
+        return games
+
+    def release(self, game):
+        # give a game that was not completed back to the queue, unless it has failed too often
+        # (must be called with the lock held):
+        del self.leases[game]
+        if self.attempts[game] >= self.max_attempts:
+            self.failed += 1
+            self.failed_games.add(game)
+            self.check_finished()
+        else:
+            self.retry.append(game)
+
+    def release_worker(self, worker):
+        # the worker is gone: every game it was playing is retried elsewhere:
+        with self.lock:
+            for game in [game for game, (owner, _) in self.leases.items() if owner == worker]:
+                self.release(game)
+
+    def expire_leases(self):
+        with self.lock:
+            now = time.monotonic()
+            for game in [game for game, (_, deadline) in self.leases.items() if deadline < now]:
+                self.release(game)
+
+    def ingest(self, results):
+        # add the results of a batch, ignoring games that are already done (e.g. a retried game
+        # whose first worker turned out to be only slow); a game that had failed is completed after
+        # all, and no longer counts as failed:
+        with self.lock:
+            new_results = []
+            for result in results:
+                game = result['seed'] - self.base_seed
+                if not 0 <= game < self.num_games or self.is_done(game):
+                    self.duplicates += 1
+                    continue
+                new_results.append(result)
+                if game in self.failed_games:
+                    self.failed_games.discard(game)
+                    self.failed -= 1
+                self.done[game >> 3] |= 1 << (game & 7)
+                self.leases.pop(game, None)
+                self.attempts.pop(game, None)
+                self.completed += 1
+                self.results[str(result['result'])] += 1
+                self.adjudicated += result.get('adjudicated', False)
+                if self.output is not None:
+                    self.output.write(json.dumps(result) + '\n')
+            if self.store is not None and new_results:
+                self.store.add_results(*self.configs, new_results)
+            self.check_finished()
+
+    def check_finished(self):
+        if self.completed + self.failed + self.skipped >= self.num_games:
+            self.finished.set()
+
+    def serve(self, connection):
+        """
+        Serve one worker connection. Requests are ('lease', worker) and ('results', worker, results);
+        replies are ('games', agents, seeds, adjudicate), ('wait', seconds) or ('done',).
+        """
+        worker = None
+        try:
+            while True:
+                message = connection.recv()
+                worker = message[1]
+                if message[0] == 'results':
+                    self.ingest(message[2])
+                    continue
+                with self.lock:
+                    self.workers.add(worker)
+                    games = self.lease(worker)
+                if games:
+                    connection.send(('games', self.agents, [self.base_seed + game for game in games], self.adjudicate))
+                elif self.finished.is_set():
+                    connection.send(('done',))
+                    return
+                else:
+                    # every game is handed out; wait in case a lease expires:
+                    connection.send(('wait', 1.0))
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+            if worker is not None:
+                self.release_worker(worker)
+                with self.lock:
+                    self.workers.discard(worker)
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.completed / elapsed if elapsed else 0.0
+        remaining = self.num_games - self.completed - self.failed - self.skipped
+        eta = remaining / rate if rate else float('inf')
+        return (f"{self.completed + self.skipped}/{self.num_games} games  {rate:.1f} games/s  ETA {eta:.0f} s  "
+                f"workers {len(self.workers)}  leased {len(self.leases)}  retries {len(self.retry)}  "
+                f"failed {self.failed}  P1 {self.results['1']}  P2 {self.results['2']}  draws {self.results['0']}")
+
+    def run(self, address, authkey=DEFAULT_AUTHKEY):
+        """
+        Accept workers on the given (host, port) address until every game is done or has failed,
+        printing the progress every second.
+
+        Returns:
+        dict: The number of Player 1 wins, Player 2 wins and draws ('1', '2', '0').
+        """
+        listener = Listener(address, authkey=authkey)
+
+        def accept():
+            while not self.finished.is_set():
+                try:
+                    connection = listener.accept()
+                except (OSError, EOFError, multiprocessing.AuthenticationError):
+                    continue
+                threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        while not self.finished.wait(1.0):
+            self.expire_leases()
+            sys.stderr.write('\r' + self.progress())
+            sys.stderr.flush()
+        sys.stderr.write('\r' + self.progress() + '\n')
+        # give the connected workers a moment to receive 'done', then stop:
+        time.sleep(min(2.0, self.lease_timeout))
+        listener.close()
+        if self.output is not None:
+            self.output.close()
+        if self.store is not None:
+            self.store.close()
+        return self.results
+
+
+def work(address, authkey=DEFAULT_AUTHKEY, retry_connect=30.0):
+    """
+    A worker: lease games from the coordinator, play them and report the results, until the
+    coordinator has no games left.
+
+    Returns:
+    int: The number of games played.
+    """
+    deadline = time.monotonic() + retry_connect
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            # the coordinator may not be listening yet:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    cache = {}
+    played = 0
+    with connection:
+        while True:
+            try:
+                connection.send(('lease', worker))
+                reply = connection.recv()
+            except (EOFError, OSError):
+                # the coordinator is gone (it stops once every game is done):
+                return played
+            if reply[0] == 'done':
+                return played
+            if reply[0] == 'wait':
+                time.sleep(reply[1])
+                continue
+            _, agents, seeds, adjudicate = reply
+            results = [play_game(agents, seed, cache, adjudicate) for seed in seeds]
+            connection.send(('results', worker, results))
+            played += len(results)
+
+
+def work_process(arguments):
+    # run a worker in a local process:
+    address, authkey = arguments
+    return work(address, authkey)
+
+
+def start_workers(address, authkey, processes, table=None):
+    """
+    Start local worker processes, sharing a transposition table if one is given (see shared_table.py).
+
+    Returns:
+    multiprocessing.Pool: The pool (join it when the run is over).
+    """
+    pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(table,))
+    pool.map_async(work_process, [(address, authkey)] * processes)
+    pool.close()
+    return pool
+
+
+def print_results(agents, results):
+    total = sum(results.values())
+    print(f"Results after playing {total} games:")
+    print(f"Player 1 ({agents[0]} AI) wins: {results['1']}")
+    print(f"Player 2 ({agents[1]} AI) wins: {results['2']}")
+    print(f"Draws: {results['0']}")
+    if total:
+        print(f"Player 1 ({agents[0]} AI) win percentage: {results['1'] / total * 100:.2f}%")
+        print(f"Player 2 ({agents[1]} AI) win percentage: {results['2'] / total * 100:.2f}%")
+        print(f"Draw percentage: {results['0'] / total * 100:.2f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play AI-vs-AI games on workers across several machines.')
+    parser.add_argument('mode', choices=['coordinate', 'work', 'local'],
+                        help='coordinate: hand out the games; work: play games for a coordinator; '
+                             'local: both, with worker processes on this machine')
+    parser.add_argument('--host', default='127.0.0.1', help='coordinator address (0.0.0.0 to accept remote workers)')
+    parser.add_argument('--port', type=int, default=6100)
+    parser.add_argument('--authkey', default=DEFAULT_AUTHKEY.decode())
+    parser.add_argument('--agents', nargs=2, default=['minimax', 'random'], type=agent_argument, metavar='AGENT',
+                        help="the agents of Player 1 and Player 2: random, medium, minimax or mcts "
+                             "(minimax options: +lmr, +probcut, +d<depth>)")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first game')
+    parser.add_argument('--batch-size', type=int, default=10, help='games per lease')
+    parser.add_argument('--lease-timeout', type=float, default=300.0, help='seconds before a lease is retried')
+    parser.add_argument('--max-attempts', type=int, default=3, help='attempts before a game is given up')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='local worker processes')
+    parser.add_argument('-o', '--output', help='append every game result to this file (JSON lines)')
+    parser.add_argument('--database', help='results database: skip the games already stored, store the new ones')
+    parser.add_argument('--shared-table', type=int, default=0, metavar='MB',
+                        help='size of a transposition table shared by the local worker processes (0: none); '
+                             'the games played with it are not reproducible from their seeds')
+    parser.add_argument('--adjudicate', type=int, default=0, metavar='NODES',
+                        help='stop games once a proof search of this many nodes finds their result (0: never)')
+    args = parser.parse_args()
+
+    server_address = (args.host, args.port)
+    key = args.authkey.encode()
+    shared = SharedTable(args.shared_table) if args.shared_table and args.mode != 'coordinate' else None
+    if args.mode == 'work':
+        if args.processes > 1:
+            start_workers(server_address, key, args.processes, shared).join()
+        else:
+            init_worker(shared)
+            work(server_address, key)
+    else:
+        workers = start_workers(server_address, key, args.processes, shared) if args.mode == 'local' else None
+        coordinator = Coordinator(args.agents, args.games, args.seed, args.batch_size, args.lease_timeout,
+                                  args.max_attempts, args.output, args.database, args.adjudicate, shared)
+        print_results(args.agents, coordinator.run(server_address, key))
+        if args.adjudicate:
+            print(f"Adjudicated games: {coordinator.adjudicated}")
+        if args.database:
+            store = ResultStore(args.database)
+            print_summary(store.summary(*coordinator.configs))
+            store.close()
+        if workers is not None:
+            workers.join()
+    if shared is not None:
+        print(shared.report())
+        shared.close()
@@ -0,0 +1,248 @@
+# import required libraries:
+# os: the number of positions in a positions file (from its size).
+# json: the tuned weights are exported as a JSON config.
+# math: the sigmoid used by the loss (without numpy).
+# argparse: command line interface.
+# itertools: positions are read in chunks, up to a limit.
+# numpy (optional): when installed, the loss and the gradient are computed on whole chunks at once
+# (like mancala_kernel, everything also runs in plain Python, with the same results).
+import os
+import json
+import math
+import argparse
+import itertools
+import mancala_engine as engine
+from ai_agents2 import WEIGHTS_FILE
+from game_records import load_positions, ROW_SIZE
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the starting weights: only the store difference counts, like the original evaluation:
+INITIAL_WEIGHTS = [1.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+
+# the number of positions in each chunk of the training set:
+CHUNK_SIZE = 65536
+
+# the number of positions whose chunks are kept in memory (about 450 MB with numpy); the chunks of
+# the positions after them are computed again on every pass over the training set:
+MAX_CACHED_ROWS = 1 << 23
+
+# the inverse of the golden ratio, for the search of the scale:
+GOLDEN = (math.sqrt(5) - 1) / 2
+
+
+def sigmoid(x):
+    # clamp x so that math.exp does not overflow on extreme evaluations:
+    return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, x))))
+
+
+class TrainingSet:
+    """
+    The training rows of positions extracted by game_records.py, iterated as (features, targets)
+    chunks, once for every pass of the loss or the gradient. The features are computed from the
+    point of view of the side to move, and the target is 1 for a win of the side to move, 0.5 for a
+    tie and 0 for a loss (with numpy, a features matrix and a targets vector per chunk; lists of
+    feature tuples and targets without numpy).
+
+    The chunks of the first cached_rows positions are kept in memory once computed. The others are
+    computed again from the memory-mapped positions files on every pass, so memory use stays bounded
+    whatever the number of positions, and a pass over them costs the feature computation again.
+    """
+    def __init__(self, paths, limit=None, chunk_size=CHUNK_SIZE, cached_rows=MAX_CACHED_ROWS):
+        self.paths = paths
+        self.chunk_size = chunk_size
+        self.cached_rows = cached_rows
+        self.rows = sum(os.path.getsize(path) // ROW_SIZE for path in paths)
+        if limit is not None:
+            self.rows = min(self.rows, limit)
+        self.cache = []
+        # whether the chunks read so far all fit in the cache, and whether it holds every chunk:
+        self.caching = True
+        self.complete = False
+
+    def __len__(self):
+        return self.rows
+
+    def samples(self):
+        for path in self.paths:
+            yield from load_positions(path)
+
+    def __iter__(self):
+        yield from self.cache
+        if self.complete:
+            return
+        cached = sum(len(targets) for _, targets in self.cache)
+        rows = itertools.islice(self.samples(), cached, self.rows)
+        while True:
+            features, targets = [], []
+            for position, side, _, outcome in itertools.islice(rows, self.chunk_size):
+                features.append(engine.features(list(position), side))
+                targets.append(0.5 if outcome == 0 else 1.0 if str(outcome) == side else 0.0)
+            if not targets:
+                self.complete = self.caching
+                return
+            if np is not None:
+                chunk = (np.array(features, dtype=np.float64), np.array(targets, dtype=np.float64))
+            else:
+                chunk = (features, targets)
+            if self.caching and cached + len(targets) <= self.cached_rows:
+                self.cache.append(chunk)
+                cached += len(targets)
+            else:
+                self.caching = False
+            yield chunk
+
+
+def evaluate_chunk(features, weights):
+    """Return the evaluation of every position of a chunk for the given weights."""
+    if np is not None:
+        return features @ np.array(weights, dtype=np.float64)
+    return [sum(weight * value for weight, value in zip(weights, values)) for values in features]
+
+
+def loss(chunks, weights, scale):
+    """
+    The Texel loss: the mean squared error between the game results and the win probabilities
+    predicted by the evaluation, sigmoid(scale * evaluation).
+    """
+    total = 0.0
+    for features, targets in chunks:
+        values = evaluate_chunk(features, weights)
+        if np is not None:
+            predictions = 1.0 / (1.0 + np.exp(-np.clip(scale * values, -50.0, 50.0)))
+            total += float(np.sum((targets - predictions) ** 2))
+        else:
+            total += sum((target - sigmoid(scale * value)) ** 2 for target, value in zip(targets, values))
+    return total / len(chunks)
+
+
+def fit_scale(chunks, weights, low=0.001, high=10.0, iterations=40):
+    """
+    Find the scale that minimizes the loss for fixed weights, with a golden-section search (the
+    loss is unimodal in the scale). Every step is a pass over the training set, so that the
+    evaluations of all the positions are never held in memory at once.
+    """
+    left, right = high - GOLDEN * (high - low), low + GOLDEN * (high - low)
+    left_loss, right_loss = loss(chunks, weights, left), loss(chunks, weights, right)
+    for _ in range(iterations):
+        if left_loss < right_loss:
+            high, right, right_loss = right, left, left_loss
+            left = high - GOLDEN * (high - low)
+            left_loss = loss(chunks, weights, left)
+        else:
+            low, left, left_loss = left, right, right_loss
+            right = low + GOLDEN * (high - low)
+            right_loss = loss(chunks, weights, right)
+    return (low + high) / 2
+
+
+def coordinate_descent(chunks, weights=None, step=0.5, min_step=0.01, verbose=True):
+    """
+    Texel-style tuning: try to move each weight up or down by a step and keep the change if the
+    loss improves; halve the step when no weight can be improved. The store difference weight is
+    kept at 1, so the evaluation stays in units of seeds (the scale of the loss absorbs the rest).
+
+    Returns:
+    list: The weights.
+    """
+    weights = list(weights or INITIAL_WEIGHTS)
+    scale = fit_scale(chunks, weights)
+    best = loss(chunks, weights, scale)
+
+    while step >= min_step:
+        improved = False
+        for i in range(1, len(weights)):
+            for delta in (step, -step):
+                weights[i] += delta
+                current = loss(chunks, weights, scale)
+                if current < best:
+                    best = current
+                    improved = True
+                    break
+                weights[i] -= delta
+        if not improved:
+            step /= 2
+            # refit the scale now and then, since it depends on the weights:
+            scale = fit_scale(chunks, weights)
+            best = loss(chunks, weights, scale)
+        if verbose:
+            print(f'step {step:.4f}  loss {best:.6f}  weights {[round(w, 3) for w in weights]}')
+
+    return weights
+
+
+def gradient(chunks, weights):
+    # the gradient of the cross-entropy loss (summed over the positions):
+    total = [0.0] * len(weights)
+    for features, targets in chunks:
+        values = evaluate_chunk(features, weights)
+        if np is not None:
+            errors = 1.0 / (1.0 + np.exp(-np.clip(values, -50.0, 50.0))) - targets
+            total = [t + g for t, g in zip(total, (errors @ features).tolist())]
+        else:
+            for row, target, value in zip(features, targets, values):
+                error = sigmoid(value) - target
+                for i, feature in enumerate(row):
+                    total[i] += error * feature
+    return total
+
+
+def logistic_regression(chunks, learning_rate=0.01, epochs=200, verbose=True):
+    """
+    Fit the weights by logistic regression (gradient descent on the cross-entropy loss, where the
+    target of a tie is 0.5). The result is normalized so that the store difference weight is 1.
+
+    Returns:
+    list: The weights.
+
+    Raises:
+    ValueError: If the fitted store difference weight is not positive (the weights cannot be
+                normalized without changing the sign or the scale of the evaluation).
+    """
+    weights = list(INITIAL_WEIGHTS)
+    count = len(chunks)
+
+    for epoch in range(epochs):
+        weights = [weight - learning_rate * g / count for weight, g in zip(weights, gradient(chunks, weights))]
+        if verbose and epoch % 20 == 0:
+            print(f'epoch {epoch}  loss {loss(chunks, weights, 1.0):.6f}')
+
+    if weights[0] <= 0:
+        raise ValueError(f'the fitted store difference weight is {weights[0]:.6f}, not positive: '
+                         f'the weights cannot be normalized (try more positions or another learning rate)')
+    return [weight / weights[0] for weight in weights]
+
+
+def export_weights(weights, path=WEIGHTS_FILE):
+    """Write the weights as the config loaded by MinimaxAgent at startup."""
+    with open(path, 'w') as file:
+        json.dump({'features': list(engine.FEATURE_NAMES), 'weights': weights}, file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tune the MinimaxAgent evaluation weights.')
+    parser.add_argument('positions', nargs='+', help='positions files written by game_records.py')
+    parser.add_argument('--method', choices=['coordinate', 'logistic'], default='coordinate')
+    parser.add_argument('--limit', type=int, help='maximum number of positions to use')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='positions per chunk')
+    parser.add_argument('--cached-rows', type=int, default=MAX_CACHED_ROWS,
+                        help='positions whose features are kept in memory (the others are recomputed on every pass)')
+    parser.add_argument('-o', '--output', default=WEIGHTS_FILE, help='where to write the weights')
+    args = parser.parse_args()
+
+    training_set = TrainingSet(args.positions, args.limit, args.chunk_size, args.cached_rows)
+    print(f"Training on {len(training_set)} positions ({'numpy' if np is not None else 'plain Python'}).")
+    if args.method == 'coordinate':
+        tuned_weights = coordinate_descent(training_set)
+    else:
+        try:
+            tuned_weights = logistic_regression(training_set)
+        except ValueError as error:
+            raise SystemExit(f'Error: {error}')
+
+    export_weights(tuned_weights, args.output)
+    for name, weight in zip(engine.FEATURE_NAMES, tuned_weights):
+        print(f'{name}: {weight:.3f}')
+    print(f'Weights written to {args.output}')
@@ -0,0 +1,265 @@
+# import required libraries:
+# os: locate the default checkpoint next to this file.
+# json: checkpoints are stored as JSON.
+# math: tanh activations.
+# random: weight initialization and exploration during self-play.
+# argparse: command line interface for training.
+# multiprocessing: self-play games are played by parallel worker processes.
+# (argparse and multiprocessing are only imported for training, so that MCTSAgent can load a
+# checkpoint without them.)
+import os
+import json
+import math
+import random
+import mancala_engine as engine
+
+# the default checkpoint file, loaded by MCTSAgent in ai_agents2.py:
+VALUE_NETWORK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'value_network.json')
+
+# the number of inputs of the network: the 14 seed counts seen from the side to move:
+NUM_INPUTS = engine.NUM_PITS
+
+
+def encode(board, player):
+    """
+    Encode a position as network inputs, from the point of view of the side to move: the side to
+    move's pits and Mancala/Score come first, then the opponent's. Seed counts are scaled to [0, 1].
+
+    Parameters:
+    board (list): The 14 seed counts in sowing order.
+    player (str): The player to move.
+
+    Returns:
+    list: The 14 network inputs.
+    """
+    return [seeds / 48 for seeds in engine.canonical(board, player)]
+
+
+class ValueNetwork:
+    """
+    A tiny multilayer perceptron (one hidden tanh layer, tanh output) that estimates the expected
+    result of a position for the side to move, between -1 (loss) and 1 (win). It is written in pure
+    Python so that it runs anywhere on the CPU without extra dependencies.
+
+    All parameters are stored in one flat list, in the order: hidden weights (hidden x inputs),
+    hidden biases, output weights, output bias.
+    """
+    def __init__(self, hidden=16, params=None, seed=None):
+        self.hidden = hidden
+        if params is None:
+            rng = random.Random(seed)
+            scale = 1 / math.sqrt(NUM_INPUTS)
+            params = ([rng.uniform(-scale, scale) for _ in range(hidden * NUM_INPUTS)] + [0.0] * hidden +
+                      [rng.uniform(-scale, scale) for _ in range(hidden)] + [0.0])
+        self.params = params
+
+    def forward(self, inputs):
+        """
+        Evaluate the network on one input vector.
+
+        Returns:
+        tuple: (output value, hidden activations).
+        """
+        params, n, h = self.params, NUM_INPUTS, self.hidden
+        activations = []
+        output = params[h * n + 2 * h]
+        for j in range(h):
+            row = j * n
+            total = params[h * n + j]
+            for i in range(n):
+                total += params[row + i] * inputs[i]
+            activation = math.tanh(total)
+            activations.append(activation)
+            output += params[h * n + h + j] * activation
+        return math.tanh(output), activations
+
+    def evaluate(self, board, player):
+        """Estimate the result of a position for the side to move."""
+        return self.forward(encode(board, player))[0]
+
+    def evaluate_batch(self, positions):
+        """
+        Estimate the results of many positions with one call, so that search and self-play code
+        can collect positions and evaluate them together.
+
+        Parameters:
+        positions (list): (board, player to move) pairs.
+
+        Returns:
+        list: The value of each position for its side to move.
+        """
+        forward = self.forward
+        return [forward(encode(board, player))[0] for board, player in positions]
+
+    def gradient(self, inputs):
+        """
+        Compute the output and its gradient with respect to every parameter.
+
+        Returns:
+        tuple: (output value, gradient as a flat list in the same order as params).
+        """
+        params, n, h = self.params, NUM_INPUTS, self.hidden
+        output, activations = self.forward(inputs)
+        d_output = 1 - output * output
+
+        gradient = [0.0] * len(params)
+        for j in range(h):
+            d_hidden = d_output * params[h * n + h + j] * (1 - activations[j] * activations[j])
+            row = j * n
+            for i in range(n):
+                gradient[row + i] = d_hidden * inputs[i]
+            gradient[h * n + j] = d_hidden
+            gradient[h * n + h + j] = d_output * activations[j]
+        gradient[h * n + 2 * h] = d_output
+        return output, gradient
+
+    def save(self, path=VALUE_NETWORK_FILE):
+        """Save the network as a JSON checkpoint."""
+        with open(path, 'w') as file:
+            json.dump({'hidden': self.hidden, 'params': self.params}, file)
+
+    @classmethod
+    def load(cls, path=VALUE_NETWORK_FILE):
+        """Load a network from a JSON checkpoint."""
+        with open(path) as file:
+            checkpoint = json.load(file)
+        return cls(checkpoint['hidden'], checkpoint['params'])
+
+
+def self_play(arguments):
+    """
+    Play self-play games with the current network (run in a worker process). All the games of a
+    worker are played in lockstep, so the children of every game's current position are evaluated
+    together in one batch. Moves are chosen greedily by the network, with some random exploration.
+
+    Parameters:
+    arguments (tuple): (network parameters, hidden size, number of games, exploration rate, seed).
+
+    Returns:
+    list: One (trajectory, result) pair per game, where the trajectory is the list of
+          (network inputs, player to move) of every position where a move was made and the result
+          is the final result for Player 1 (1, -1 or 0).
+    """
+    params, hidden, num_games, epsilon, seed = arguments
+    network = ValueNetwork(hidden, params)
+    rng = random.Random(seed)
+
+    games = [{'board': engine.new_board(), 'player': rng.choice('12'), 'trajectory': []}
+             for _ in range(num_games)]
+    finished = []
+
+    while games:
+        # expand every game's current position and collect the children that need the network:
+        batch, expansions = [], []
+        for game in games:
+            board, player = game['board'], game['player']
+            children = []
+            for move in engine.get_valid_moves(board, player):
+                child = board[:]
+                _, _, over, next_player = engine.play(child, player, move)
+                children.append((move, child, over, next_player))
+                if not over:
+                    batch.append((child, next_player))
+            expansions.append(children)
+        values = iter(network.evaluate_batch(batch))
+
+        active = []
+        for game, children in zip(games, expansions):
+            player = game['player']
+            best_move, best_value = None, -2.0
+            for move, child, over, next_player in children:
+                if over:
+                    value = engine.result_for(child, player)
+                else:
+                    # the network evaluates for the side to move, which is the opponent unless it is an extra turn:
+                    value = next(values)
+                    if next_player != player:
+                        value = -value
+                if value > best_value:
+                    best_move, best_value = move, value
+            if rng.random() < epsilon:
+                best_move = rng.choice(children)[0]
+
+            game['trajectory'].append((encode(game['board'], player), player))
+            _, _, over, game['player'] = engine.play(game['board'], player, best_move)
+            if over:
+                result = engine.winner(game['board'])
+                finished.append((game['trajectory'], 1 if result == 1 else -1 if result == 2 else 0))
+            else:
+                active.append(game)
+        games = active
+
+    return finished
+
+
+def td_lambda(network, trajectory, result, alpha=0.01, lam=0.7):
+    """
+    Update the network with TD(lambda) on one self-play game. Values are compared from Player 1's
+    point of view, so extra turns (the same player moving twice) need no special handling.
+
+    Parameters:
+    network (ValueNetwork): The network to update in place.
+    trajectory (list): (network inputs, player to move) pairs, in game order.
+    result (int): The final result for Player 1 (1, -1 or 0).
+    alpha (float): The learning rate.
+    lam (float): The trace decay parameter lambda.
+    """
+    params = network.params
+    traces = [0.0] * len(params)
+
+    for t, (inputs, player) in enumerate(trajectory):
+        sign = 1 if player == '1' else -1
+        value, gradient = network.gradient(inputs)
+        value *= sign
+
+        if t + 1 < len(trajectory):
+            next_inputs, next_player = trajectory[t + 1]
+            target = network.forward(next_inputs)[0] * (1 if next_player == '1' else -1)
+        else:
+            target = result
+
+        error = target - value
+        for i, g in enumerate(gradient):
+            traces[i] = lam * traces[i] + sign * g
+            params[i] += alpha * error * traces[i]
+
+
+def train(network, iterations=50, games_per_worker=16, workers=None, epsilon=0.1, alpha=0.01, lam=0.7,
+          checkpoint=VALUE_NETWORK_FILE, seed=0):
+    """
+    Train the network by self-play: in each iteration, the workers play games with the current
+    network, and the network is then updated with TD(lambda) on every game. A checkpoint is saved
+    after every iteration.
+    """
+    import multiprocessing
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        for iteration in range(iterations):
+            jobs = [(network.params, network.hidden, games_per_worker, epsilon, seed + iteration * workers + w)
+                    for w in range(workers)]
+            results = [game for games in pool.map(self_play, jobs) for game in games]
+            for trajectory, result in results:
+                td_lambda(network, trajectory, result, alpha, lam)
+            network.save(checkpoint)
+
+            wins = sum(1 for _, result in results if result == 1)
+            print(f'iteration {iteration + 1}/{iterations}: {len(results)} games, '
+                  f'Player 1 won {wins}, checkpoint saved to {checkpoint}')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Train the Mancala value network by self-play.')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--games', type=int, default=16, help='games per worker per iteration')
+    parser.add_argument('--workers', type=int, help='number of self-play processes (default: one per core)')
+    parser.add_argument('--hidden', type=int, default=16, help='number of hidden units')
+    parser.add_argument('--epsilon', type=float, default=0.1, help='exploration rate')
+    parser.add_argument('--alpha', type=float, default=0.01, help='learning rate')
+    parser.add_argument('--lam', type=float, default=0.7, help='TD(lambda) trace decay')
+    parser.add_argument('--resume', action='store_true', help='continue from the existing checkpoint')
+    parser.add_argument('-o', '--output', default=VALUE_NETWORK_FILE)
+    args = parser.parse_args()
+
+    value_network = ValueNetwork.load(args.output) if args.resume else ValueNetwork(args.hidden, seed=0)
+    train(value_network, args.iterations, args.games, args.workers, args.epsilon, args.alpha, args.lam, args.output)